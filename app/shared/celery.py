@@ -6,4 +6,11 @@ def get_celery_binding(broker_url: str) -> Celery:
         broker_url=broker_url,
         broker_connection_retry=False,
         broker_connection_retry_on_startup=False,
+        # publishing blocks until the broker confirmed the message.
+        broker_transport_options={"confirm_publish": True},
     )
+
+
+def model_queue(model: str) -> str:
+    """Name of the queue for jobs that request a specific whisper model."""
+    return f"whisper.{model}"
@@ -0,0 +1,29 @@
+"""add_job_list_indexes
+
+Revision ID: 5d2c8a1f4b7e
+Revises: 0eee2b7913b7
+Create Date: 2026-10-18 10:12:43.281904
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d2c8a1f4b7e"
+down_revision = "0eee2b7913b7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_jobs_created_at_id", "jobs", ["created_at", "id"], unique=False)
+    op.create_index(
+        "ix_jobs_status_created_at_id",
+        "jobs",
+        ["status", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_status_created_at_id", table_name="jobs")
+    op.drop_index("ix_jobs_created_at_id", table_name="jobs")
@@ -0,0 +1,29 @@
+"""add_lookup_indexes
+
+Revision ID: 9b4e7c3a2d61
+Revises: 5d2c8a1f4b7e
+Create Date: 2026-10-18 11:40:05.614377
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9b4e7c3a2d61"
+down_revision = "5d2c8a1f4b7e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_artifacts_job_id"), "artifacts", ["job_id"], unique=False)
+    op.create_index(
+        "ix_jobs_type_created_at_id",
+        "jobs",
+        ["type", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_type_created_at_id", table_name="jobs")
+    op.drop_index(op.f("ix_artifacts_job_id"), table_name="artifacts")
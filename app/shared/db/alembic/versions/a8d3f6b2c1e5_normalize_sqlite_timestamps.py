@@ -0,0 +1,34 @@
+"""normalize_sqlite_timestamps
+
+Revision ID: a8d3f6b2c1e5
+Revises: e7a2c4f1d9b3
+Create Date: 2026-10-19 09:12:44.208315
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a8d3f6b2c1e5"
+down_revision = "e7a2c4f1d9b3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # SQLite compares timestamps as strings. rows written by the server default
+    # lack the microseconds of bound parameters, add them so jobs are ordered
+    # and paginated correctly.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    for table in ("jobs", "artifacts"):
+        for column in ("created_at", "updated_at"):
+            op.execute(
+                f"UPDATE {table} SET {column} = {column} || '.000000' "
+                f"WHERE length({column}) = 19"
+            )
+
+
+def downgrade() -> None:
+    # both formats are read alike.
+    pass
@@ -0,0 +1,93 @@
+"""encode_artifact_data
+
+Revision ID: c3f1a9e2b8d4
+Revises: 9b4e7c3a2d61
+Create Date: 2026-10-18 14:05:51.902318
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from app.shared.db.artifact_encoding import decode, encode
+
+# revision identifiers, used by Alembic.
+revision = "c3f1a9e2b8d4"
+down_revision = "9b4e7c3a2d61"
+branch_labels = None
+depends_on = None
+
+# rows are converted in batches to bound memory usage.
+BATCH_SIZE = 500
+
+artifacts = sa.table(
+    "artifacts",
+    sa.column("id", sa.VARCHAR(length=36)),
+    sa.column("data", sa.JSON(none_as_null=True)),
+    sa.column("encoding", sa.SmallInteger()),
+    sa.column("payload", sa.LargeBinary()),
+)
+
+
+def upgrade() -> None:
+    op.add_column("artifacts", sa.Column("encoding", sa.SmallInteger(), nullable=True))
+    op.add_column("artifacts", sa.Column("payload", sa.LargeBinary(), nullable=True))
+
+    conn = op.get_bind()
+    last_id = ""
+
+    while True:
+        rows = conn.execute(
+            sa.select(artifacts.c.id, artifacts.c.data)
+            .where(artifacts.c.id > last_id)
+            .order_by(artifacts.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+
+        if not rows:
+            break
+
+        for id, data in rows:
+            encoding, payload = encode(data)
+            conn.execute(
+                artifacts.update()
+                .where(artifacts.c.id == id)
+                .values(encoding=encoding, payload=payload)
+            )
+
+        last_id = rows[-1].id
+
+    with op.batch_alter_table("artifacts") as batch_op:
+        batch_op.drop_column("data")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "artifacts", sa.Column("data", sa.JSON(none_as_null=True), nullable=True)
+    )
+
+    conn = op.get_bind()
+    last_id = ""
+
+    while True:
+        rows = conn.execute(
+            sa.select(artifacts.c.id, artifacts.c.encoding, artifacts.c.payload)
+            .where(artifacts.c.id > last_id)
+            .order_by(artifacts.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+
+        if not rows:
+            break
+
+        for id, encoding, payload in rows:
+            conn.execute(
+                artifacts.update()
+                .where(artifacts.c.id == id)
+                .values(data=decode(encoding, payload))
+            )
+
+        last_id = rows[-1].id
+
+    with op.batch_alter_table("artifacts") as batch_op:
+        batch_op.drop_column("payload")
+        batch_op.drop_column("encoding")
@@ -0,0 +1,27 @@
+"""add_job_outbox
+
+Revision ID: e7a2c4f1d9b3
+Revises: c3f1a9e2b8d4
+Create Date: 2026-10-18 17:22:09.481736
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e7a2c4f1d9b3"
+down_revision = "c3f1a9e2b8d4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # existing jobs were published when they were created.
+    op.add_column("jobs", sa.Column("publish_after", sa.DateTime(), nullable=True))
+    op.create_index("ix_jobs_publish_after", "jobs", ["publish_after"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_publish_after", table_name="jobs")
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("publish_after")
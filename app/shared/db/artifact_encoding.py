@@ -0,0 +1,252 @@
+"""
+Compact storage format of artifact data.
+
+Every artifact row stores its encoding next to the encoded payload, so
+rows written with an older encoding stay readable.
+
+* `json`: zlib compressed JSON, used for any data.
+* `packed_transcript`: zlib compressed columns of a `RawTranscript` list.
+  Numbers are stored as little-endian arrays, texts and tokens as one
+  array each with the length per segment. Smaller than JSON, because keys
+  are not repeated and tokens are not stored as decimal strings.
+* `chunked`: a sequence of chunks, each encoded on its own. Used while a
+  transcript is written, new segments are appended as a chunk without
+  encoding the stored segments again.
+"""
+import enum
+import json
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from typing import AbstractSet, Any, Iterable
+
+COMPRESSION_LEVEL = 6
+
+# columns of a packed transcript, in storage order.
+INT_FIELDS = ("id", "seek")
+FLOAT_FIELDS = (
+    "start",
+    "end",
+    "temperature",
+    "avg_logprob",
+    "compression_ratio",
+    "no_speech_prob",
+)
+TRANSCRIPT_FIELDS = frozenset((*INT_FIELDS, *FLOAT_FIELDS, "text", "tokens"))
+# order of keys in decoded segments, as returned by whisper.
+KEY_ORDER = ("id", "seek", "start", "end", "text", "tokens", *FLOAT_FIELDS[2:])
+
+# length of a chunk's payload and its encoding.
+CHUNK_HEADER = struct.Struct("<IB")
+
+# unsigned 32 bit integers and 64 bit floats, floats are stored losslessly.
+INT_TYPE = "L" if array("I").itemsize < 4 else "I"
+FLOAT_TYPE = "d"
+
+
+class ArtifactEncoding(enum.IntEnum):
+    """Storage format of an artifact's data."""
+
+    json = 1
+    packed_transcript = 2
+    chunked = 3
+
+
+def encode(data: Any) -> tuple[ArtifactEncoding | None, bytes | None]:
+    """Encode artifact data with the most compact encoding that fits it."""
+    if data is None:
+        return None, None
+
+    if _is_transcript(data):
+        return ArtifactEncoding.packed_transcript, zlib.compress(
+            _pack_transcript(data), COMPRESSION_LEVEL
+        )
+
+    return ArtifactEncoding.json, zlib.compress(
+        json.dumps(data, separators=(",", ":")).encode(), COMPRESSION_LEVEL
+    )
+
+
+def encode_chunk(data: list[dict[str, Any]]) -> bytes:
+    """Encode segments as a chunk, to be appended to a `chunked` payload."""
+    encoding, payload = encode(data)
+    assert encoding is not None and payload is not None
+    return CHUNK_HEADER.pack(len(payload), encoding) + payload
+
+
+def decode(
+    encoding: int | None,
+    payload: bytes | None,
+    fields: Iterable[str] | None = None,
+    start: float | None = None,
+    end: float | None = None,
+) -> Any:
+    """
+    Decode artifact data. For transcripts, only the segments that overlap
+    the time range from `start` to `end` and only keys in `fields` are
+    returned if set. Packed transcripts skip decoding everything else.
+    """
+    if payload is None:
+        return None
+
+    if encoding == ArtifactEncoding.chunked:
+        return _decode_chunks(payload, fields, start, end)
+
+    body = zlib.decompress(payload)
+    keys = TRANSCRIPT_FIELDS if fields is None else set(fields)
+
+    if encoding == ArtifactEncoding.packed_transcript:
+        return _unpack_transcript(body, keys, start, end)
+
+    if encoding == ArtifactEncoding.json:
+        data = json.loads(body)
+
+        if isinstance(data, list) and all(
+            isinstance(segment, dict) and "start" in segment and "end" in segment
+            for segment in data
+        ):
+            return [
+                {k: v for k, v in segment.items() if fields is None or k in keys}
+                for segment in data
+                if _overlaps(segment["start"], segment["end"], start, end)
+            ]
+
+        return data
+
+    raise ValueError(f"unknown artifact encoding {encoding}.")
+
+
+def _decode_chunks(
+    payload: bytes,
+    fields: Iterable[str] | None,
+    start: float | None,
+    end: float | None,
+) -> list[dict[str, Any]]:
+    # decoded once per chunk.
+    fields = None if fields is None else list(fields)
+    view = memoryview(payload)
+    offset = 0
+    segments: list[dict[str, Any]] = []
+
+    while offset < len(view):
+        length, encoding = CHUNK_HEADER.unpack_from(view, offset)
+        offset += CHUNK_HEADER.size
+        chunk = bytes(view[offset : offset + length])
+        offset += length
+
+        segments.extend(decode(encoding, chunk, fields, start, end))
+
+    return segments
+
+
+def _overlaps(
+    segment_start: float, segment_end: float, start: float | None, end: float | None
+) -> bool:
+    return (start is None or segment_end > start) and (
+        end is None or segment_start < end
+    )
+
+
+def _is_transcript(data: Any) -> bool:
+    return (
+        isinstance(data, list)
+        and len(data) > 0
+        and all(
+            isinstance(segment, dict)
+            and segment.keys() == TRANSCRIPT_FIELDS
+            and all(
+                isinstance(segment[key], int) and 0 <= segment[key] < 2**32
+                for key in INT_FIELDS
+            )
+            and all(
+                isinstance(segment[key], (int, float))
+                and not isinstance(segment[key], bool)
+                for key in FLOAT_FIELDS
+            )
+            and isinstance(segment["text"], str)
+            and isinstance(segment["tokens"], list)
+            and all(isinstance(t, int) and 0 <= t < 2**32 for t in segment["tokens"])
+            for segment in data
+        )
+    )
+
+
+def _to_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, body: memoryview) -> array:
+    values = array(typecode)
+    values.frombytes(body)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _pack_transcript(segments: list[dict[str, Any]]) -> bytes:
+    texts = [segment["text"].encode() for segment in segments]
+
+    columns = [
+        *(array(INT_TYPE, [s[key] for s in segments]) for key in INT_FIELDS),
+        *(array(FLOAT_TYPE, [s[key] for s in segments]) for key in FLOAT_FIELDS),
+        array(INT_TYPE, [len(text) for text in texts]),
+        array(INT_TYPE, [len(s["tokens"]) for s in segments]),
+        array(INT_TYPE, [token for s in segments for token in s["tokens"]]),
+    ]
+
+    return b"".join(
+        [struct.pack("<I", len(segments)), *map(_to_bytes, columns), *texts]
+    )
+
+
+def _unpack_transcript(
+    body: bytes, fields: AbstractSet[str], start: float | None, end: float | None
+) -> list[dict[str, Any]]:
+    view = memoryview(body)
+    (count,) = struct.unpack_from("<I", view)
+    offset = 4
+
+    def read(typecode: str, length: int) -> array:
+        nonlocal offset
+        size = length * array(typecode).itemsize
+        values = _from_bytes(typecode, view[offset : offset + size])
+        offset += size
+        return values
+
+    columns: dict[str, Any] = {}
+
+    for key in INT_FIELDS:
+        columns[key] = read(INT_TYPE, count)
+    for key in FLOAT_FIELDS:
+        columns[key] = read(FLOAT_TYPE, count)
+
+    text_lengths = read(INT_TYPE, count)
+    token_counts = read(INT_TYPE, count)
+    tokens = read(INT_TYPE, sum(token_counts))
+
+    rows = [
+        i
+        for i in range(count)
+        if _overlaps(columns["start"][i], columns["end"][i], start, end)
+    ]
+
+    if "text" in fields:
+        text_offsets = list(accumulate(text_lengths, initial=offset))
+        columns["text"] = {
+            i: bytes(view[text_offsets[i] : text_offsets[i + 1]]).decode() for i in rows
+        }
+
+    if "tokens" in fields:
+        token_offsets = list(accumulate(token_counts, initial=0))
+        columns["tokens"] = {
+            i: tokens[token_offsets[i] : token_offsets[i + 1]].tolist() for i in rows
+        }
+
+    keys = [key for key in KEY_ORDER if key in fields]
+
+    return [{key: columns[key][i] for key in keys} for i in rows]
@@ -1,11 +1,23 @@
 from typing import Any
 
-from sqlalchemy import Engine, create_engine, event
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+# async drivers for the drivers of sync database urls.
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
 
-def make_engine(database_url: str):
-    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+
+def make_engine(database_url: str, **kwargs: Any):
+    """`kwargs` are passed to the engine, for example pool sizes."""
+    if make_url(database_url).database in (None, "", ":memory:"):
+        # in-memory databases use a single connection without a pool.
+        kwargs = {}
+
+    engine = create_engine(
+        database_url, connect_args={"check_same_thread": False}, **kwargs
+    )
 
     @event.listens_for(engine, "connect")
     def set_sqlite_pragma(conn: Any, _: Any) -> None:
@@ -16,6 +28,43 @@ def make_engine(database_url: str):
     return engine
 
 
-def make_session_local(engine: Engine):
-    session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def make_session_local(engine: Engine, **kwargs: Any):
+    session_local = sessionmaker(
+        autocommit=False, autoflush=False, bind=engine, **kwargs
+    )
     return session_local
+
+
+def make_async_engine(database_url: str, **kwargs: Any) -> AsyncEngine:
+    """
+    Create an engine with the async driver for `database_url`.
+    `kwargs` are passed to the engine, for example pool sizes.
+    """
+    url = make_url(database_url)
+    url = url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            # in-memory databases use a single connection without a pool.
+            kwargs = {}
+        elif "poolclass" not in kwargs:
+            # aiosqlite does not pool file connections by default, sqlite does.
+            kwargs["poolclass"] = AsyncAdaptedQueuePool
+
+    engine = create_async_engine(url, **kwargs)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragma(conn: Any, _: Any) -> None:
+        if url.get_backend_name() == "sqlite":
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.close()
+
+    return engine
+
+
+def make_async_session_local(engine: AsyncEngine):
+    # attributes are not reloaded after a commit, that would require awaiting.
+    return async_sessionmaker(
+        autocommit=False, autoflush=False, bind=engine, expire_on_commit=False
+    )
@@ -1,14 +1,35 @@
 import enum
 import uuid
+from datetime import datetime, timezone
+from typing import Any, Iterable
 
 from pydantic import BaseModel, Field
-from sqlalchemy import JSON, VARCHAR, Column, DateTime, Enum, ForeignKey, String, func
+from sqlalchemy import (
+    JSON,
+    VARCHAR,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    LargeBinary,
+    SmallInteger,
+    String,
+    func,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, declarative_base, declarative_mixin, declared_attr
 
+from app.shared.db.artifact_encoding import decode, encode
+
 Base = declarative_base()
 
 
+def utcnow() -> datetime:
+    """Timestamps are stored as naive UTC."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 # Enums
 
 
@@ -29,6 +50,22 @@ class JobStatus(str, enum.Enum):
     success = "success"
 
 
+class WhisperModel(str, enum.Enum):
+    """Whisper model sizes, see https://github.com/openai/whisper#available-models-and-languages"""
+
+    tiny_en = "tiny.en"
+    tiny = "tiny"
+    base_en = "base.en"
+    base = "base"
+    small_en = "small.en"
+    small = "small"
+    medium_en = "medium.en"
+    medium = "medium"
+    large_v1 = "large-v1"
+    large_v2 = "large-v2"
+    large = "large"
+
+
 class ArtifactType(str, enum.Enum):
     raw_transcript = "transcript_raw"
     language_detection = "language_detection"
@@ -48,6 +85,14 @@ class JobConfig(BaseModel):
         ),
     )
 
+    model: WhisperModel | None = Field(
+        default=None,
+        description=(
+            "Whisper model used to process the job. "
+            "Defaults to the model configured on the worker."
+        ),
+    )
+
 
 class JobMeta(BaseModel):
     """(JSON) Metadata relating to a job's execution."""
@@ -62,11 +107,53 @@ class JobMeta(BaseModel):
         description="Will contain a descriptive error message if processing failed.",
     )
 
+    speech_ratio: float | None = Field(
+        default=None,
+        description=(
+            "Share of the media that contains speech. "
+            "Only set if voice activity detection is enabled."
+        ),
+    )
+
     task_id: uuid.UUID | None = Field(
         default=None,
         description="Internal celery id of this job submission.",
     )
 
+    seek: int | None = Field(
+        default=None,
+        description=(
+            "Position up to which the media has been transcribed, in 10ms frames. "
+            "Set while processing, a retried job resumes from here."
+        ),
+    )
+
+    batch_id: uuid.UUID | None = Field(
+        default=None,
+        description="Id of the job this job was processed in a batch with.",
+    )
+
+    fingerprint: str | None = Field(
+        default=None,
+        description="SHA-256 hash of the processed media file.",
+    )
+
+    processed_with: str | None = Field(
+        default=None,
+        description=(
+            "Model and settings the job was processed with, as JSON. "
+            "Artifacts are only reused from jobs that were processed alike."
+        ),
+    )
+
+    duplicate_of: uuid.UUID | None = Field(
+        default=None,
+        description=(
+            "Id of a finished job with identical media and settings. "
+            "If set, its artifacts were reused instead of processing the media."
+        ),
+    )
+
 
 class RawTranscript(BaseModel):
     """(JSON) A single transcript passage returned by whisper."""
@@ -97,13 +184,17 @@ ArtifactData = list[RawTranscript] | LanguageDetection | None
 class WithStandardFields:
     """Mixin that adds standard fields (id, created_at, updated_at)."""
 
+    # set in python, so stored timestamps have the format of bound parameters.
+    # SQLite compares them as strings, `func.now()` leaves out microseconds.
     @declared_attr
     def created_at(cls) -> Mapped[DateTime]:
-        return Column(DateTime, server_default=func.now(), nullable=False)
+        return Column(
+            DateTime, default=utcnow, server_default=func.now(), nullable=False
+        )
 
     @declared_attr
     def updated_at(cls) -> Mapped[DateTime | None]:
-        return Column(DateTime, onupdate=func.now())
+        return Column(DateTime, onupdate=utcnow)
 
     @declared_attr
     def id(cls) -> Mapped[UUID]:
@@ -120,6 +211,18 @@ class Job(Base, WithStandardFields):
     config = Column(JSON(none_as_null=True))
     meta = Column(JSON(none_as_null=True))
     type = Column(Enum(JobType), nullable=False)
+    # set while the job's task is not confirmed by the broker, see `outbox`.
+    # the task is (re-)published once this time has passed.
+    publish_after = Column(DateTime)
+
+    # jobs are listed newest first, paginated by (created_at, id).
+    # the filtered indexes also serve lookups by status or type alone.
+    __table_args__ = (
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ix_jobs_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_jobs_type_created_at_id", "type", "created_at", "id"),
+        Index("ix_jobs_publish_after", "publish_after"),
+    )
 
 
 class Artifact(Base, WithStandardFields):
@@ -129,7 +232,43 @@ class Artifact(Base, WithStandardFields):
         VARCHAR(36),
         ForeignKey("jobs.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
     )
 
-    data = Column(JSON(none_as_null=True))
+    # data is stored encoded, see `artifact_encoding`.
+    encoding = Column(SmallInteger)
+    payload = Column(LargeBinary)
     type = Column(Enum(ArtifactType), nullable=False)
+
+    def __init__(self, data: Any = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        if data is not None:
+            self.data = data
+
+    @property
+    def data(self) -> Any:
+        """The artifact's data, decoded on first access."""
+        cached = self.__dict__.get("_decoded")
+
+        if cached is None or cached[0] is not self.payload:
+            cached = (self.payload, decode(self.encoding, self.payload))  # type: ignore
+            self.__dict__["_decoded"] = cached
+
+        return cached[1]
+
+    @data.setter
+    def data(self, value: Any) -> None:
+        self.encoding, self.payload = encode(value)  # type: ignore
+        self.__dict__["_decoded"] = (self.payload, value)
+
+    def select_data(
+        self,
+        fields: Iterable[str] | None = None,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> Any:
+        """
+        Decode part of a transcript, see `artifact_encoding.decode`.
+        Other data is returned as is.
+        """
+        return decode(self.encoding, self.payload, fields, start, end)  # type: ignore
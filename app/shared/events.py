@@ -0,0 +1,77 @@
+import uuid
+from typing import Any
+
+from kombu import Connection, Exchange
+from kombu.pools import producers
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.shared.db.models as models
+from app.shared.logger import logger
+
+# job changes are broadcast to all web processes, messages are not persisted.
+EXCHANGE = Exchange("whisperbox.events", type="fanout", durable=False)
+
+
+class JobEvent(BaseModel):
+    """A change of a job's status or meta, such as its progress."""
+
+    id: uuid.UUID
+    status: models.JobStatus
+    meta: models.JobMeta | None = None
+    # set once the job was deleted, no events follow.
+    deleted: bool = False
+    model_config = ConfigDict(from_attributes=True)
+
+
+class EventPublisher:
+    """Publishes job events to the broker. Delivery is best effort."""
+
+    def __init__(self, broker_url: str) -> None:
+        self.connection = Connection(broker_url)
+
+    def publish(self, job_event: JobEvent) -> None:
+        try:
+            with producers[self.connection].acquire(block=True, timeout=1) as producer:
+                producer.publish(
+                    job_event.model_dump(mode="json"),
+                    exchange=EXCHANGE,
+                    declare=[EXCHANGE],
+                    delivery_mode=1,
+                    serializer="json",
+                )
+        except Exception as e:
+            logger.warn(f"[{job_event.id}]: failed to publish job event: {e}")
+
+
+def record_job_change(session: Session, job: models.Job) -> None:
+    """
+    Publish an event for `job` with the next commit of `session`. For changes
+    made with bulk updates, which are not seen by `publish_job_changes`.
+    """
+    session.info.setdefault("job_events", {})[job.id] = JobEvent.model_validate(job)
+
+
+def publish_job_changes(
+    session_local: sessionmaker[Session], publisher: EventPublisher
+) -> None:
+    """Publish an event for every job whose changes are committed by a session."""
+
+    @event.listens_for(session_local, "after_flush")
+    def collect(session: Session, _: Any) -> None:
+        # attributes of committed objects are expired, read them before the commit.
+        pending = session.info.setdefault("job_events", {})
+
+        for obj in [*session.new, *session.dirty]:
+            if isinstance(obj, models.Job) and obj.id:
+                pending[obj.id] = JobEvent.model_validate(obj)
+
+    @event.listens_for(session_local, "after_commit")
+    def publish(session: Session) -> None:
+        for job_event in session.info.pop("job_events", {}).values():
+            publisher.publish(job_event)
+
+    @event.listens_for(session_local, "after_rollback")
+    def discard(session: Session) -> None:
+        session.info.pop("job_events", None)
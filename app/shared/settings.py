@@ -1,3 +1,7 @@
+import os
+import tempfile
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -7,7 +11,113 @@ class Settings(BaseSettings):
     DATABASE_URI: str
     ENVIRONMENT: str
 
+    # connections of the web server's database pool, per process.
+    # up to `DATABASE_MAX_OVERFLOW` more are opened under load.
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    # endpoints run queries with the sync driver in the thread pool by default.
+    # if enabled, they use the async driver, `aiosqlite` for SQLite or `asyncpg`
+    # for PostgreSQL. with SQLite, the sync driver is faster.
+    DATABASE_ASYNC: bool = False
+
+    # tasks of new jobs are published by a background dispatcher per web process,
+    # in batches of up to `OUTBOX_BATCH_SIZE`. it checks for unpublished jobs
+    # every `OUTBOX_POLL_INTERVAL` seconds, tasks that were not confirmed by
+    # the broker are re-published after `OUTBOX_RETRY_INTERVAL` seconds.
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL: float = 5
+    OUTBOX_RETRY_INTERVAL: float = 30
+
     TASK_SOFT_TIME_LIMIT: int = 3 * 60 * 60
     TASK_HARD_TIME_LIMIT: int = 4 * 60 * 60
 
     ENABLE_SHARING: bool = False
+
+    # job event streams send a comment after this many seconds without events,
+    # so proxies do not close idle connections.
+    EVENTS_KEEPALIVE_INTERVAL: float = 15
+
+    # rendered transcript exports are kept in memory of each web process.
+    EXPORT_CACHE_MAX_BYTES: int = 64 * 1024**2
+
+    # responses for finished jobs are kept in memory of each web process
+    # and may be reused by clients, both for `RESPONSE_CACHE_MAX_AGE` seconds.
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024**2
+    RESPONSE_CACHE_MAX_AGE: int = 60
+
+    # on-disk cache for downloaded media, shared by all worker processes.
+    # set `MEDIA_CACHE_MAX_BYTES` to 0 to disable caching.
+    MEDIA_CACHE_DIR: str = os.path.join(tempfile.gettempdir(), "whisperbox-media")
+    MEDIA_CACHE_MAX_BYTES: int = 20 * 1024**3
+
+    # media is downloaded in parallel parts if the remote server supports ranges.
+    DOWNLOAD_CONNECTIONS: int = 4
+    DOWNLOAD_PART_SIZE: int = 16 * 1024**2
+
+    # pipe media from the HTTP response directly into ffmpeg instead of
+    # downloading it to disk first. media is not cached in this mode.
+    STREAM_MEDIA: bool = False
+
+    # language detection jobs are processed in batches of up to this many jobs.
+    # a batch waits up to `LANGUAGE_DETECTION_BATCH_WAIT` seconds to fill up.
+    # 1 processes every job on its own.
+    LANGUAGE_DETECTION_BATCH_SIZE: int = 1
+    LANGUAGE_DETECTION_BATCH_WAIT: float = 0
+
+    # number of 30 second windows decoded per forward pass of the model.
+    # 1 uses whisper's sequential transcription loop.
+    WHISPER_BATCH_SIZE: int = 1
+
+    # recordings longer than this many seconds are split at silence and
+    # `LONG_AUDIO_PROCESSES` chunks are transcribed at once on CPU, in threads
+    # of the task's process that share the model's weights.
+    # 0 disables long audio mode.
+    LONG_AUDIO_MIN_DURATION: int = 0
+    LONG_AUDIO_CHUNK_DURATION: int = 10 * 60
+    # defaults to one chunk per two available cores.
+    LONG_AUDIO_PROCESSES: int = 0
+
+    # segments are stored while a job is processed, at most every
+    # `PARTIAL_RESULTS_INTERVAL` seconds, as each 30-second window of audio
+    # (or each chunk in long audio mode) is decoded.
+    PARTIAL_RESULTS_INTERVAL: float = 5
+
+    # skip silent parts of recordings before running the model.
+    # audio quieter than `VAD_THRESHOLD_DB` dBFS is considered silent.
+    VAD_ENABLED: bool = False
+    VAD_THRESHOLD_DB: float = -45
+
+    # apply dynamic int8 quantization to the linear layers of the model on CPU.
+    # the quantized weights are cached next to the downloaded models.
+    WHISPER_QUANTIZE: bool = False
+
+    # load the model in the worker's parent process before the pool is forked.
+    # children share the memory-mapped weights instead of loading a copy each.
+    # only supported by the `local` strategy on CPU.
+    WHISPER_PRELOAD: bool = False
+    # created once the worker is ready to process jobs, removed on shutdown.
+    WORKER_READY_FILE: str = os.path.join(
+        tempfile.gettempdir(), "whisperbox-worker-ready"
+    )
+
+    # models that are requested by jobs are loaded on demand. the least recently
+    # used models are unloaded once their estimated size exceeds this budget.
+    # 0 keeps a single model in memory.
+    MODEL_REGISTRY_MAX_BYTES: int = 0
+    # models this worker serves jobs for, defaults to all models.
+    WORKER_MODELS: list[str] = []
+
+    # number of pool processes started by `app.worker.launcher`, each pinned to
+    # its own share of the physical cores. defaults to one per four cores.
+    WORKER_PROCESSES: int = 0
+    # the cores of each pool process, set by the launcher. a core is the list
+    # of its logical cpus. a pool process runs on the share of its index.
+    WORKER_CPU_SHARES: list[list[list[int]]] = []
+    # size of torch's thread pools in worker processes. defaults to the cores
+    # of a process's share, 0 keeps torch's default of one thread per core.
+    WORKER_THREADS: int = 0
+
+    # inference engine used by workers. `ctranslate2` runs an int8 version of
+    # the model on CPU and requires the `ctranslate2` extra to be installed.
+    WHISPER_STRATEGY: Literal["local", "ctranslate2"] = "local"
+    CTRANSLATE2_COMPUTE_TYPE: str = "int8"
@@ -1,18 +1,35 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.pool import NullPool
 from sqlalchemy_utils import create_database, database_exists, drop_database
 
 import app.shared.db.models as models
-from app.shared.db.base import make_engine, make_session_local
+from app.shared.db.base import (
+    make_async_engine,
+    make_async_session_local,
+    make_engine,
+    make_session_local,
+)
 from app.shared.settings import Settings
-from app.web.injections.db import get_session
+from app.web.db import ThreadedSessionMaker
+from app.web.injections.db import get_session_local
 from app.web.injections.settings import get_settings
 from app.web.main import app_factory
+from app.web.outbox import OutboxDispatcher
+from app.web.task_queue import TaskQueue
 
 
 @pytest.fixture()
-def settings():
-    return Settings(_env_file=".env.test")  # type: ignore
+def settings(tmp_path):
+    # a file, so the web app's async engine shares the database with the tests.
+    return Settings(
+        _env_file=".env.test",  # type: ignore
+        DATABASE_URI=f"sqlite:///{tmp_path / 'whisperbox-test.sqlite'}",
+    )
 
 
 @pytest.fixture()
@@ -45,10 +62,34 @@ def db_session(test_db):
 
 
 @pytest.fixture()
-def app(db_session, settings):
-    app = app_factory()
+def outbox(test_db, settings):
+    outbox = OutboxDispatcher(
+        TaskQueue(settings.BROKER_URL),
+        make_session_local(make_engine(settings.DATABASE_URI)),
+        batch_size=2,
+        poll_interval=0.1,
+        retry_interval=0.5,
+    )
+    yield outbox
+    outbox.stop()
+
+
+@pytest.fixture(params=[False, True], ids=["sync", "async"])
+def app(request, test_db, settings, outbox):
+    # connections are not pooled, every test client request runs in a new event loop.
+    if request.param:
+        engine = make_async_engine(settings.DATABASE_URI, poolclass=NullPool)
+        session_local = make_async_session_local(engine)
+    else:
+        sync_engine = make_engine(settings.DATABASE_URI, poolclass=NullPool)
+        session_local = ThreadedSessionMaker(
+            make_session_local(sync_engine, expire_on_commit=False),
+            max_sessions=settings.DATABASE_POOL_SIZE,
+        )
+
+    app = app_factory(outbox)
     app.dependency_overrides[get_settings] = lambda: settings
-    app.dependency_overrides[get_session] = lambda: db_session
+    app.dependency_overrides[get_session_local] = lambda: session_local
     return app
 
 
@@ -79,3 +120,104 @@ def mock_artifact(db_session, mock_job):
     db_session.add(artifact)
     db_session.commit()
     return artifact
+
+
+class MediaServer(ThreadingHTTPServer):
+    """Local HTTP stand-in for remote media hosts."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), MediaRequestHandler)
+        self.files: dict[str, bytes] = {}
+        self.requests: list[tuple[str, str | None]] = []
+        # whether byte ranges are supported.
+        self.accept_ranges = True
+        # number of range requests that drop the connection mid-body.
+        self.failures = 0
+        # number of range responses that are complete but shorter than requested.
+        self.short_parts = 0
+        # whether range responses leave out the size of the file.
+        self.unknown_size = False
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    server: MediaServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        byte_range = self.headers.get("Range")
+        self.server.requests.append((self.path, byte_range))
+
+        body = self.server.files.get(self.path)
+
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = f'"{hashlib.sha256(body).hexdigest()}"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        if_range = self.headers.get("If-Range")
+
+        if (
+            self.server.accept_ranges
+            and byte_range
+            and (if_range is None or if_range == etag)
+        ):
+            start, end = [int(x) for x in byte_range[len("bytes=") :].split("-")]
+            end = min(end, len(body) - 1)
+
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            if self.server.short_parts > 0 and start > 0:
+                self.server.short_parts -= 1
+                end = start + (end - start) // 2
+
+            size = "*" if self.server.unknown_size else len(body)
+
+            self.send_response(206)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+
+            if self.server.failures > 0:
+                self.server.failures -= 1
+                self.wfile.write(body[start : start + (end - start) // 2])
+                self.close_connection = True
+                return
+
+            self.wfile.write(body[start : end + 1])
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        ...
+
+
+@pytest.fixture()
+def media_server():
+    server = MediaServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -1,3 +1,7 @@
+from datetime import datetime
+
+import pytest
+
 import app.shared.db.models as models
 from app.shared.settings import Settings
 from app.web.injections.settings import get_settings
@@ -15,6 +19,33 @@ def test_create_job_pass(client, auth_headers: dict[str, str]):
     assert isinstance(res.json()["id"], str)
 
 
+def test_create_job_with_model(client, auth_headers: dict[str, str]):
+    res = client.post(
+        "/api/v1/jobs",
+        headers=auth_headers,
+        json={
+            "url": "https://example.com",
+            "type": models.JobType.transcript,
+            "model": "tiny",
+        },
+    )
+    assert res.status_code == 201
+    assert res.json()["config"] == {"language": None, "model": "tiny"}
+
+
+def test_create_job_unknown_model(client, auth_headers: dict[str, str]):
+    res = client.post(
+        "/api/v1/jobs",
+        headers=auth_headers,
+        json={
+            "url": "https://example.com",
+            "type": models.JobType.transcript,
+            "model": "huge",
+        },
+    )
+    assert res.status_code == 422
+
+
 def test_create_job_missing_body(client, auth_headers: dict[str, str]):
     res = client.post("/api/v1/jobs", headers=auth_headers, json={})
     assert res.status_code == 422
@@ -29,6 +60,58 @@ def test_create_job_malformed_url(client, auth_headers: dict[str, str]):
     assert res.status_code == 422
 
 
+# POST /api/v1/jobs/batch
+# ---
+def test_create_jobs_pass(client, auth_headers: dict[str, str]):
+    res = client.post(
+        "/api/v1/jobs/batch",
+        headers=auth_headers,
+        json=[
+            {"url": f"https://example.com/{i}.mp3", "type": models.JobType.transcript}
+            for i in range(3)
+        ],
+    )
+    assert res.status_code == 201
+
+    body = res.json()
+    assert body["errors"] == []
+    assert [job["url"] for job in body["jobs"]] == [
+        f"https://example.com/{i}.mp3" for i in range(3)
+    ]
+    assert all(job["created_at"] for job in body["jobs"])
+
+    res_jobs = client.get("/api/v1/jobs", headers=auth_headers)
+    assert len(res_jobs.json()) == 3
+
+
+def test_create_jobs_invalid_items(client, auth_headers: dict[str, str]):
+    res = client.post(
+        "/api/v1/jobs/batch",
+        headers=auth_headers,
+        json=[
+            {"url": "example.com", "type": models.JobType.transcript},
+            {"url": "https://example.com", "type": models.JobType.translation},
+            "https://example.com",
+        ],
+    )
+    assert res.status_code == 201
+
+    body = res.json()
+    assert len(body["jobs"]) == 1
+    assert body["jobs"][0]["type"] == models.JobType.translation
+    assert [error["index"] for error in body["errors"]] == [0, 2]
+    assert body["errors"][0]["errors"][0]["loc"] == ["url"]
+
+
+def test_create_jobs_too_many(client, auth_headers: dict[str, str]):
+    res = client.post(
+        "/api/v1/jobs/batch",
+        headers=auth_headers,
+        json=[{}] * 10_001,
+    )
+    assert res.status_code == 422
+
+
 # GET /api/v1/jobs
 # ---
 def test_get_jobs_pass(client, auth_headers: dict[str, str], mock_job: models.Job):
@@ -40,6 +123,92 @@ def test_get_jobs_pass(client, auth_headers: dict[str, str], mock_job: models.Jo
     assert res.status_code == 200
 
 
+@pytest.fixture()
+def many_jobs(db_session) -> list[models.Job]:
+    # jobs share timestamps, so ids decide their order.
+    jobs = [
+        models.Job(
+            url="https://example.com",
+            type=models.JobType.transcript,
+            status=models.JobStatus.success if i % 2 else models.JobStatus.error,
+            created_at=datetime(2024, 1, 1 + i // 2),  # type: ignore
+        )
+        for i in range(7)
+    ]
+    db_session.add_all(jobs)
+    db_session.commit()
+    return sorted(jobs, key=lambda job: (job.created_at, job.id), reverse=True)
+
+
+def test_get_jobs_paginated(client, auth_headers, many_jobs):
+    ids: list[str] = []
+    params: dict[str, str | int] = {"limit": 3}
+
+    while True:
+        res = client.get("/api/v1/jobs", headers=auth_headers, params=params)
+        assert res.status_code == 200
+        ids.extend(job["id"] for job in res.json())
+
+        if "X-Next-Cursor" not in res.headers:
+            break
+        params["cursor"] = res.headers["X-Next-Cursor"]
+
+    assert ids == [job.id for job in many_jobs]
+
+
+def test_get_jobs_paginated_after_create(client, auth_headers):
+    created = [
+        client.post(
+            "/api/v1/jobs",
+            headers=auth_headers,
+            json={"url": "https://example.com", "type": models.JobType.transcript},
+        ).json()["id"]
+        for _ in range(5)
+    ]
+
+    # jobs created within the same second are paged through once each.
+    ids: list[str] = []
+    params: dict[str, str | int] = {"limit": 2}
+
+    while True:
+        res = client.get("/api/v1/jobs", headers=auth_headers, params=params)
+        ids.extend(job["id"] for job in res.json())
+
+        if "X-Next-Cursor" not in res.headers:
+            break
+        assert len(ids) <= len(created)
+        params["cursor"] = res.headers["X-Next-Cursor"]
+
+    assert ids == created[::-1]
+
+
+def test_get_jobs_filtered(client, auth_headers, many_jobs):
+    res = client.get(
+        "/api/v1/jobs",
+        headers=auth_headers,
+        params={
+            "status": "success",
+            "created_after": "2024-01-02T00:00:00",
+            "created_before": "2024-01-03T01:00:00+01:00",
+        },
+    )
+
+    assert [job["id"] for job in res.json()] == [
+        job.id
+        for job in many_jobs
+        if job.status == models.JobStatus.success
+        and datetime(2024, 1, 2) <= job.created_at < datetime(2024, 1, 3)
+    ]
+    assert "X-Next-Cursor" not in res.headers
+
+
+def test_get_jobs_invalid_cursor(client, auth_headers):
+    res = client.get(
+        "/api/v1/jobs", headers=auth_headers, params={"cursor": "not-a-cursor"}
+    )
+    assert res.status_code == 400
+
+
 # GET /api/v1/jobs/:id
 # ---
 def test_get_job_pass(client, auth_headers: dict[str, str], mock_job: models.Job):
@@ -81,6 +250,34 @@ def test_get_job_sharing_enabled(client, app, mock_job):
     assert res.status_code == 200
 
 
+def test_get_finished_job_cached(client, auth_headers, db_session, mock_job):
+    mock_job.status = models.JobStatus.success
+    db_session.commit()
+
+    url = f"/api/v1/jobs/{mock_job.id}"
+    res = client.get(url, headers=auth_headers)
+
+    assert res.status_code == 200
+    assert res.json()["status"] == "success"
+    assert res.headers["Cache-Control"] == "private, max-age=60"
+
+    res_cached = client.get(
+        url, headers={**auth_headers, "If-None-Match": res.headers["ETag"]}
+    )
+    assert res_cached.status_code == 304
+
+    client.delete(url, headers=auth_headers)
+
+    assert client.get(url, headers=auth_headers).status_code == 404
+
+
+def test_get_processing_job_not_cached(client, auth_headers, mock_job):
+    res = client.get(f"/api/v1/jobs/{mock_job.id}", headers=auth_headers)
+
+    assert res.headers["Cache-Control"] == "no-cache"
+    assert "ETag" not in res.headers
+
+
 # GET /api/v1/jobs/:id/artifacts
 # ---
 def test_get_artifacts_pass(client, auth_headers, db_session, mock_job, mock_artifact):
@@ -94,6 +291,54 @@ def test_get_artifacts_pass(client, auth_headers, db_session, mock_job, mock_art
     assert res.json()[0]["id"] == str(mock_artifact.id)
 
 
+def test_get_artifacts_sliced(client, auth_headers, db_session, mock_job):
+    segments = [
+        {
+            "id": i,
+            "seek": 0,
+            "start": i * 10.0,
+            "end": i * 10.0 + 8,
+            "text": f" segment {i}",
+            "tokens": [50364, 1230, 50590],
+            "temperature": 0.0,
+            "avg_logprob": -0.3,
+            "compression_ratio": 1.2,
+            "no_speech_prob": 0.01,
+        }
+        for i in range(10)
+    ]
+    db_session.add(
+        models.Artifact(
+            job_id=str(mock_job.id),
+            type=models.ArtifactType.raw_transcript,
+            data=segments,
+        )
+    )
+    db_session.commit()
+
+    res = client.get(
+        f"/api/v1/jobs/{mock_job.id}/artifacts",
+        headers=auth_headers,
+        params={"fields": ["start", "text"], "start": 25, "end": 50},
+    )
+
+    assert res.status_code == 200
+    assert res.json()[0]["data"] == [
+        {"start": 20.0, "text": " segment 2"},
+        {"start": 30.0, "text": " segment 3"},
+        {"start": 40.0, "text": " segment 4"},
+    ]
+
+
+def test_get_artifacts_unknown_field(client, auth_headers, mock_job):
+    res = client.get(
+        f"/api/v1/jobs/{mock_job.id}/artifacts",
+        headers=auth_headers,
+        params={"fields": "secret"},
+    )
+    assert res.status_code == 422
+
+
 def test_get_artifacts_not_found(client, auth_headers, mock_job):
     res = client.get(
         f"/api/v1/jobs/{mock_job.id}/artifacts",
@@ -107,24 +352,22 @@ def test_get_artifacts_not_found(client, auth_headers, mock_job):
 # DELETE /api/v1/jobs
 # ---
 def test_delete_job_pass(client, auth_headers, mock_job, db_session):
+    url = f"/api/v1/jobs/{mock_job.id}"
+
     res_job = client.get(
-        f"/api/v1/jobs/{mock_job.id}",
+        url,
         headers=auth_headers,
     )
 
     assert res_job.status_code == 200
 
     client.delete(
-        f"/api/v1/jobs/{mock_job.id}",
+        url,
         headers=auth_headers,
     )
 
-    # HACK: this catches a missed .commit().
-    # TODO: clean up pytest database handling.
-    db_session.rollback()
-
     res_job_missing = client.get(
-        f"/api/v1/jobs/{mock_job.id}",
+        url,
         headers=auth_headers,
     )
 
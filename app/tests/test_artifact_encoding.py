@@ -0,0 +1,86 @@
+import json
+from typing import Any
+
+import app.shared.db.models as models
+from app.shared.db.artifact_encoding import (
+    ArtifactEncoding,
+    decode,
+    encode,
+    encode_chunk,
+)
+
+TRANSCRIPT: list[dict[str, Any]] = [
+    {
+        "id": i,
+        "seek": i * 3000,
+        "start": i * 30.0,
+        "end": i * 30.0 + 4.52,
+        "text": f" Segment number {i}, äöü.",
+        "tokens": [50364 + i, 3996, 1230, 291, 11, 50590],
+        "temperature": 0.0,
+        "avg_logprob": -0.2811659574508667,
+        "compression_ratio": 1.2857142857142858,
+        "no_speech_prob": 0.012432098388671875,
+    }
+    for i in range(50)
+]
+
+
+def test_packs_transcripts():
+    encoding, payload = encode(TRANSCRIPT)
+
+    assert encoding == ArtifactEncoding.packed_transcript
+    assert payload and len(payload) < len(json.dumps(TRANSCRIPT)) / 4
+    assert decode(encoding, payload) == TRANSCRIPT
+
+
+def test_decodes_selected_fields():
+    encoding, payload = encode(TRANSCRIPT)
+
+    assert decode(encoding, payload, fields=["start", "text"]) == [
+        {"start": s["start"], "text": s["text"]} for s in TRANSCRIPT
+    ]
+
+
+def test_decodes_time_range():
+    # segments are 4.52 seconds long and start every 30 seconds.
+    expected = [s for s in TRANSCRIPT if s["end"] > 62 and s["start"] < 120]
+    assert [s["id"] for s in expected] == [2, 3]
+
+    for data in [TRANSCRIPT, [{**TRANSCRIPT[0], "extra": 1}, *TRANSCRIPT[1:]]]:
+        encoding, payload = encode(data)
+        sliced = decode(encoding, payload, fields=["id", "text"], start=62, end=120)
+        assert sliced == [{"id": s["id"], "text": s["text"]} for s in expected]
+
+
+def test_encodes_other_data_as_json():
+    for data in [{"language_code": "en"}, [], [{**TRANSCRIPT[0], "extra": 1}]]:
+        encoding, payload = encode(data)
+        assert encoding == ArtifactEncoding.json
+        assert decode(encoding, payload) == data
+
+    assert encode(None) == (None, None)
+
+
+def test_decodes_chunks():
+    payload = b"".join(encode_chunk(TRANSCRIPT[i : i + 20]) for i in range(0, 50, 20))
+
+    assert decode(ArtifactEncoding.chunked, payload) == TRANSCRIPT
+    assert decode(ArtifactEncoding.chunked, b"") == []
+    assert decode(
+        ArtifactEncoding.chunked, payload, fields=iter(["id"]), start=570, end=620
+    ) == [{"id": 19}, {"id": 20}]
+
+
+def test_artifact_data(db_session, mock_job):
+    artifact = models.Artifact(
+        job_id=str(mock_job.id),
+        type=models.ArtifactType.raw_transcript,
+        data=TRANSCRIPT,
+    )
+    db_session.add(artifact)
+    db_session.commit()
+    db_session.expire_all()
+
+    assert artifact.encoding == ArtifactEncoding.packed_transcript
+    assert artifact.data == TRANSCRIPT
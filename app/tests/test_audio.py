@@ -0,0 +1,137 @@
+import hashlib
+import io
+import shutil
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("requests")
+
+from app.worker.audio import (  # noqa: E402
+    AudioStreamError,
+    detect_speech,
+    merge_segments,
+    remap_sample,
+    remap_segments,
+    split_on_silence,
+    stream_audio,
+)
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="requires ffmpeg"
+)
+
+
+def make_wav(seconds: int, sample_rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(b"\x00\x10" * sample_rate * seconds)
+    return buffer.getvalue()
+
+
+@requires_ffmpeg
+def test_stream_audio_decodes_media(media_server):
+    media_server.files["/a.wav"] = make_wav(seconds=3, sample_rate=44100)
+
+    audio, fingerprint = stream_audio(media_server.url("/a.wav"))
+
+    assert len(audio) == 3 * 16000
+    assert fingerprint == hashlib.sha256(media_server.files["/a.wav"]).hexdigest()
+
+
+@requires_ffmpeg
+def test_stream_audio_max_samples(media_server):
+    media_server.files["/a.wav"] = make_wav(seconds=60)
+
+    audio, _ = stream_audio(media_server.url("/a.wav"), max_samples=16000)
+
+    assert len(audio) == 16000
+
+
+@requires_ffmpeg
+def test_stream_audio_invalid_media(media_server):
+    media_server.files["/a.wav"] = b"not a media file"
+
+    with pytest.raises(AudioStreamError):
+        stream_audio(media_server.url("/a.wav"))
+
+
+def test_split_on_silence_cuts_at_quietest_frame():
+    audio = np.random.default_rng(0).uniform(-1, 1, 16000 * 25).astype(np.float32)
+    audio[16000 * 9 : 16000 * 9 + 1600] = 0
+
+    chunks = split_on_silence(audio, chunk_samples=16000 * 10)
+
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(audio)
+    assert 16000 * 9 <= chunks[0][1] < 16000 * 9 + 1600
+    assert all(end - start <= 16000 * 10 for start, end in chunks)
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+
+
+def test_split_on_silence_short_audio():
+    audio = np.zeros(16000, dtype=np.float32)
+    assert split_on_silence(audio, chunk_samples=16000 * 10) == [(0, 16000)]
+
+
+def test_merge_segments():
+    segment = {"id": 0, "seek": 0, "start": 1.0, "end": 2.0, "text": "a"}
+
+    merged = merge_segments([(0, [segment]), (16000 * 60, [segment, segment])])
+
+    assert [s["id"] for s in merged] == [0, 1, 2]
+    assert merged[1]["start"] == 61.0 and merged[1]["end"] == 62.0
+    assert merged[1]["seek"] == 6000
+
+
+def test_detect_speech():
+    rng = np.random.default_rng(0)
+    audio = rng.normal(0, 0.0001, 16000 * 60).astype(np.float32)
+    audio[16000 * 10 : 16000 * 20] = rng.uniform(-0.5, 0.5, 16000 * 10)
+    audio[16000 * 40 : 16000 * 41] = rng.uniform(-0.5, 0.5, 16000)
+
+    regions = detect_speech(audio)
+
+    assert len(regions) == 2
+    assert regions[0][0] <= 16000 * 10 < 16000 * 20 <= regions[0][1]
+    assert regions[0][1] - regions[0][0] < 16000 * 11
+    assert regions[1][0] <= 16000 * 40 < 16000 * 41 <= regions[1][1]
+
+
+def test_detect_speech_silence():
+    assert detect_speech(np.zeros(16000 * 10, dtype=np.float32)) == []
+
+
+def test_detect_speech_noise_over_digital_silence():
+    rng = np.random.default_rng(0)
+    audio = np.zeros(16000 * 60, dtype=np.float32)
+    # faint hiss and clicks at around -80dBFS.
+    audio[16000 * 30 : 16000 * 35] = rng.normal(0, 0.0001, 16000 * 5)
+    audio[16000 * 45 : 16000 * 50 : 16000 // 5] = 0.003
+    audio[16000 * 10 : 16000 * 20] = rng.uniform(-0.5, 0.5, 16000 * 10)
+
+    regions = detect_speech(audio)
+
+    assert len(regions) == 1
+    assert regions[0][0] <= 16000 * 10 < 16000 * 20 <= regions[0][1]
+
+
+def test_remap_segments():
+    regions = [(16000 * 10, 16000 * 20), (16000 * 40, 16000 * 41)]
+    segments = [
+        {"id": 0, "seek": 0, "start": 0.0, "end": 10.0, "text": "a"},
+        {"id": 1, "seek": 0, "start": 10.0, "end": 10.5, "text": "b"},
+    ]
+
+    remapped = remap_segments(segments, regions)
+
+    assert (remapped[0]["start"], remapped[0]["end"]) == (10.0, 20.0)
+    assert (remapped[1]["start"], remapped[1]["end"]) == (40.0, 40.5)
+    assert remapped[0]["seek"] == 1000
+
+    # the end of a region maps to its end in the original audio.
+    assert remap_sample(16000 * 10, regions) == 16000 * 20
+    assert remap_sample(16000 * 11, regions) == 16000 * 41
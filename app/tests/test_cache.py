@@ -0,0 +1,40 @@
+from app.web.cache import LRUCache, etag_matches
+
+
+def test_evicts_least_recently_used():
+    cache: LRUCache[str] = LRUCache(max_bytes=10)
+
+    cache.set("a", "a", 4)
+    cache.set("b", "b", 4)
+    cache.get("a")
+    cache.set("c", "c", 4)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("a", None, "c")
+    assert cache.size == 8
+
+
+def test_skips_oversized_entries():
+    cache: LRUCache[str] = LRUCache(max_bytes=10)
+    cache.set("a", "a", 11)
+    assert cache.get("a") is None
+
+
+def test_etag_matches():
+    assert etag_matches('"x", W/"y"', '"y"')
+    assert etag_matches("*", '"y"')
+    assert not etag_matches('"x"', '"y"')
+
+
+def test_expires_entries(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr("app.web.cache.time.monotonic", lambda: now)
+
+    cache: LRUCache[str] = LRUCache(max_bytes=10, max_age=60)
+    cache.set("a", "a", 4)
+
+    now = 159
+    assert cache.get("a") == "a"
+
+    now = 160
+    assert cache.get("a") is None
+    assert cache.size == 0
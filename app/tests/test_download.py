@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+pytest.importorskip("requests")
+
+from app.worker.download import Downloader  # noqa: E402
+
+BODY = os.urandom(1024 * 1024 + 17)
+
+
+@pytest.fixture()
+def downloader():
+    return Downloader(connections=4, part_size=64 * 1024, retries=2)
+
+
+def test_download_parallel_ranges(tmp_path, media_server, downloader):
+    media_server.files["/a.mp4"] = BODY
+
+    downloader.download(media_server.url("/a.mp4"), str(tmp_path / "a"))
+
+    assert (tmp_path / "a").read_bytes() == BODY
+    assert len(media_server.requests) == 17
+    assert all(byte_range for _, byte_range in media_server.requests)
+
+
+def test_download_without_range_support(tmp_path, media_server, downloader):
+    media_server.files["/a.mp4"] = BODY
+    media_server.accept_ranges = False
+
+    downloader.download(media_server.url("/a.mp4"), str(tmp_path / "a"))
+
+    assert (tmp_path / "a").read_bytes() == BODY
+    assert len(media_server.requests) == 1
+
+
+def test_download_retries_failed_ranges(tmp_path, media_server, downloader):
+    media_server.files["/a.mp4"] = BODY
+    media_server.failures = 3
+
+    downloader.download(media_server.url("/a.mp4"), str(tmp_path / "a"))
+
+    assert (tmp_path / "a").read_bytes() == BODY
+
+
+def test_download_not_modified(tmp_path, media_server, downloader):
+    media_server.files["/a.mp4"] = BODY
+    url = media_server.url("/a.mp4")
+
+    headers = downloader.download(url, str(tmp_path / "a"))
+
+    assert headers is not None
+    assert (
+        downloader.download(
+            url, str(tmp_path / "b"), {"If-None-Match": headers["ETag"]}
+        )
+        is None
+    )
+    assert not (tmp_path / "b").exists()
+
+
+def test_download_unknown_size(tmp_path, media_server, downloader):
+    media_server.files["/a.mp4"] = BODY
+    media_server.unknown_size = True
+
+    downloader.download(media_server.url("/a.mp4"), str(tmp_path / "a"))
+
+    assert (tmp_path / "a").read_bytes() == BODY
+    assert media_server.requests[-1] == ("/a.mp4", None)
+
+
+def test_download_retries_short_ranges(tmp_path, media_server, downloader):
+    media_server.files["/a.mp4"] = BODY
+    media_server.short_parts = 2
+
+    downloader.download(media_server.url("/a.mp4"), str(tmp_path / "a"))
+
+    assert (tmp_path / "a").read_bytes() == BODY
+
+
+def test_download_empty_file(tmp_path, media_server, downloader):
+    media_server.files["/a.mp4"] = b""
+
+    downloader.download(media_server.url("/a.mp4"), str(tmp_path / "a"))
+
+    assert (tmp_path / "a").read_bytes() == b""
@@ -0,0 +1,111 @@
+import json
+import threading
+
+import pytest
+
+import app.shared.db.models as models
+from app.shared.db.base import make_session_local
+from app.shared.events import EventPublisher, JobEvent, publish_job_changes
+from app.web.injections.job_events import get_job_event_listener
+from app.web.job_events import JobEventListener
+
+
+class FakePublisher(EventPublisher):
+    def __init__(self) -> None:
+        self.events: list[JobEvent] = []
+
+    def publish(self, job_event: JobEvent) -> None:
+        self.events.append(job_event)
+
+
+@pytest.fixture()
+def listener(app, settings):
+    listener = JobEventListener(settings.BROKER_URL)
+    app.dependency_overrides[get_job_event_listener] = lambda: listener
+    yield listener
+    listener.stop()
+
+
+def read_events(res) -> list[dict]:
+    return [
+        json.loads(line[len("data: ") :])
+        for line in res.iter_lines()
+        if line.startswith("data: ")
+    ]
+
+
+def test_publish_committed_job_changes(test_db, mock_job):
+    publisher = FakePublisher()
+    session_local = make_session_local(test_db)
+    publish_job_changes(session_local, publisher)
+
+    with session_local() as session:
+        job = session.get(models.Job, mock_job.id)
+        job.meta = {**job.meta, "seek": 3000}
+        session.commit()
+
+        job.status = models.JobStatus.error
+        session.flush()
+        session.rollback()
+
+    assert [(str(e.id), e.status, e.meta) for e in publisher.events] == [
+        (
+            mock_job.id,
+            models.JobStatus.processing,
+            models.JobMeta(task_id=mock_job.meta["task_id"], seek=3000),
+        )
+    ]
+
+
+def test_stream_finished_job(client, auth_headers, db_session, mock_job, listener):
+    mock_job.status = models.JobStatus.success
+    db_session.commit()
+
+    with client.stream(
+        "GET", f"/api/v1/jobs/{mock_job.id}/events", headers=auth_headers
+    ) as res:
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/event-stream")
+        events = read_events(res)
+
+    assert [e["status"] for e in events] == ["success"]
+
+
+def test_stream_job_events(client, auth_headers, settings, mock_job, listener):
+    publisher = EventPublisher(settings.BROKER_URL)
+
+    def publish() -> None:
+        listener.ready.wait(5)
+        for job_event in [
+            JobEvent(
+                id=mock_job.id,
+                status=models.JobStatus.processing,
+                meta=models.JobMeta(seek=1500),
+            ),
+            JobEvent(id=mock_job.id, status=models.JobStatus.success),
+        ]:
+            publisher.publish(job_event)
+
+    # publishes once the endpoint has subscribed.
+    threading.Thread(target=publish, daemon=True).start()
+
+    with client.stream(
+        "GET", f"/api/v1/jobs/{mock_job.id}/events", headers=auth_headers
+    ) as res:
+        events = read_events(res)
+
+    assert [(e["status"], (e["meta"] or {}).get("seek")) for e in events] == [
+        ("processing", None),
+        ("processing", 1500),
+        ("success", None),
+    ]
+    assert not listener.subscribers
+
+
+def test_stream_unknown_job(client, auth_headers, listener):
+    res = client.get(
+        "/api/v1/jobs/8f1b9f2a-0e4f-4a2f-9a4e-3b0c6f1e2d3c/events",
+        headers=auth_headers,
+    )
+    assert res.status_code == 404
+    assert not listener.subscribers
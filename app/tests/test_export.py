@@ -0,0 +1,73 @@
+import pytest
+
+import app.shared.db.models as models
+from app.web.export import ExportFormat, render
+
+SEGMENTS = [
+    {"start": 0.0, "end": 2.5, "text": " Hello there."},
+    {"start": 3661.25, "end": 3663.0, "text": " General Kenobi."},
+]
+
+
+def test_render_srt():
+    assert "".join(render(SEGMENTS, ExportFormat.srt)) == (
+        "1\n00:00:00,000 --> 00:00:02,500\nHello there.\n\n"
+        "2\n01:01:01,250 --> 01:01:03,000\nGeneral Kenobi.\n\n"
+    )
+
+
+def test_render_vtt():
+    assert "".join(render(SEGMENTS, ExportFormat.vtt)) == (
+        "WEBVTT\n\n"
+        "00:00:00.000 --> 00:00:02.500\nHello there.\n\n"
+        "01:01:01.250 --> 01:01:03.000\nGeneral Kenobi.\n\n"
+    )
+
+
+def test_render_txt():
+    assert "".join(render(SEGMENTS, ExportFormat.txt)) == (
+        "Hello there.\nGeneral Kenobi.\n"
+    )
+
+
+@pytest.fixture()
+def transcript(db_session, mock_job):
+    artifact = models.Artifact(
+        job_id=str(mock_job.id),
+        type=models.ArtifactType.raw_transcript,
+        data=[{**segment, "id": 0} for segment in SEGMENTS],
+    )
+    db_session.add(artifact)
+    db_session.commit()
+    return artifact
+
+
+def test_export_transcript(client, auth_headers, db_session, mock_job, transcript):
+    url = f"/api/v1/jobs/{mock_job.id}/transcript.vtt"
+    res = client.get(url, headers=auth_headers)
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/vtt")
+    assert res.text.startswith("WEBVTT\n\n00:00:00.000 --> 00:00:02.500\n")
+
+    cached = client.get(
+        url, headers={**auth_headers, "If-None-Match": res.headers["ETag"]}
+    )
+
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == res.headers["ETag"]
+
+    # the etag changes with the transcript.
+    transcript.data = [{**SEGMENTS[0], "id": 0}]
+    db_session.commit()
+    res = client.get(
+        url, headers={**auth_headers, "If-None-Match": res.headers["ETag"]}
+    )
+
+    assert res.status_code == 200
+    assert "Kenobi" not in res.text
+
+
+def test_export_missing_transcript(client, auth_headers, mock_job, mock_artifact):
+    res = client.get(f"/api/v1/jobs/{mock_job.id}/transcript.srt", headers=auth_headers)
+    assert res.status_code == 404
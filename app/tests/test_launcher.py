@@ -0,0 +1,54 @@
+import os
+
+from app.worker.launcher import cpu_topology, parse_cpu_list, partition
+
+
+def write(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def make_sysfs(root: str) -> str:
+    """Two NUMA nodes with two cores each, every core has two hyperthreads."""
+    write(os.path.join(root, "node", "node0", "cpulist"), "0-1,4-5\n")
+    write(os.path.join(root, "node", "node1", "cpulist"), "2-3,6-7\n")
+
+    for cpu in range(8):
+        topology = os.path.join(root, "cpu", f"cpu{cpu}", "topology")
+        write(os.path.join(topology, "physical_package_id"), f"{cpu % 4 // 2}\n")
+        write(os.path.join(topology, "core_id"), f"{cpu % 2}\n")
+
+    return root
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cpu_list("") == []
+
+
+def test_cpu_topology(tmp_path):
+    sysfs = make_sysfs(str(tmp_path))
+
+    assert cpu_topology(sysfs, set(range(8))) == [
+        [[0, 4], [1, 5]],
+        [[2, 6], [3, 7]],
+    ]
+
+    # restricted by the affinity of the process.
+    assert cpu_topology(sysfs, {0, 1, 4}) == [[[0, 4], [1]]]
+
+
+def test_cpu_topology_without_sysfs(tmp_path):
+    assert cpu_topology(str(tmp_path), {0, 1}) == [[[0], [1]]]
+
+
+def test_partition(tmp_path):
+    topology = cpu_topology(make_sysfs(str(tmp_path)), set(range(8)))
+
+    # one share per node.
+    assert partition(topology, 2) == [[[0, 4], [1, 5]], [[2, 6], [3, 7]]]
+
+    assert [len(share) for share in partition(topology, 3)] == [2, 1, 1]
+    # no more shares than cores.
+    assert len(partition(topology, 16)) == 4
@@ -0,0 +1,55 @@
+import hashlib
+import os
+
+import pytest
+
+pytest.importorskip("requests")
+
+from app.worker.media_cache import MediaCache  # noqa: E402
+
+
+def test_fetch_downloads_once(tmp_path, media_server):
+    media_server.files["/a.mp3"] = b"a" * 1024
+    cache = MediaCache(str(tmp_path / "cache"), max_bytes=1024**2)
+
+    first = cache.fetch(media_server.url("/a.mp3"), str(tmp_path / "job-1"))
+    second = cache.fetch(media_server.url("/a.mp3"), str(tmp_path / "job-2"))
+
+    assert first == second == hashlib.sha256(b"a" * 1024).hexdigest()
+    assert (tmp_path / "job-2").read_bytes() == b"a" * 1024
+    # second request is a conditional request answered with 304.
+    assert len(media_server.requests) == 2
+
+
+def test_fetch_detects_changed_content(tmp_path, media_server):
+    cache = MediaCache(str(tmp_path / "cache"), max_bytes=1024**2)
+
+    media_server.files["/a.mp3"] = b"old"
+    cache.fetch(media_server.url("/a.mp3"), str(tmp_path / "job-1"))
+
+    media_server.files["/a.mp3"] = b"new"
+    cache.fetch(media_server.url("/a.mp3"), str(tmp_path / "job-2"))
+
+    assert (tmp_path / "job-1").read_bytes() == b"old"
+    assert (tmp_path / "job-2").read_bytes() == b"new"
+
+
+def test_fetch_evicts_least_recently_used(tmp_path, media_server):
+    cache = MediaCache(str(tmp_path / "cache"), max_bytes=2048)
+    blobs = tmp_path / "cache" / "blobs"
+
+    def fetch(name: str) -> str:
+        media_server.files[f"/{name}.mp3"] = name.encode() * 1024
+        return cache.fetch(media_server.url(f"/{name}.mp3"), str(tmp_path / name))
+
+    a, b = fetch("a"), fetch("b")
+
+    # mtime resolution can be coarse, spread access times explicitly.
+    os.utime(blobs / a, (1, 1))
+    os.utime(blobs / b, (2, 2))
+
+    c = fetch("c")
+
+    assert sorted(os.listdir(blobs)) == sorted([b, c])
+    # evicted blobs stay available to jobs that hold a link.
+    assert (tmp_path / "a").read_bytes() == b"a" * 1024
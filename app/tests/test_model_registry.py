@@ -0,0 +1,49 @@
+from app.worker.model_registry import ModelRegistry
+
+SIZES = {"tiny": 1, "base": 2, "small": 5}
+
+
+def make_registry(max_bytes: int) -> tuple[ModelRegistry[str], list[str]]:
+    loads: list[str] = []
+
+    def load(name: str) -> tuple[str, int]:
+        loads.append(name)
+        return f"model:{name}", SIZES[name]
+
+    return ModelRegistry(load, max_bytes), loads
+
+
+def test_get_caches_models():
+    registry, loads = make_registry(max_bytes=10)
+
+    assert registry.get("tiny") == "model:tiny"
+    assert registry.get("tiny") == "model:tiny"
+    assert loads == ["tiny"]
+
+
+def test_evicts_least_recently_used():
+    registry, loads = make_registry(max_bytes=3)
+
+    registry.get("tiny")
+    registry.get("base")
+    # makes base the least recently used model.
+    registry.get("tiny")
+    registry.get("small")
+
+    assert registry.names() == ["small"]
+
+    registry.get("tiny")
+    registry.get("base")
+
+    assert registry.names() == ["tiny", "base"]
+    assert loads == ["tiny", "base", "small", "tiny", "base"]
+
+
+def test_keeps_last_model_over_budget():
+    registry, _ = make_registry(max_bytes=0)
+
+    registry.get("small")
+    assert "small" in registry
+
+    registry.get("tiny")
+    assert registry.names() == ["tiny"]
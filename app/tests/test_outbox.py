@@ -0,0 +1,148 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from kombu import Connection
+
+import app.shared.db.models as models
+from app.web.outbox import utcnow
+
+
+def published_tasks(broker_url: str) -> list[str]:
+    """Drain the default task queue, returns the job ids of the tasks."""
+    ids = []
+
+    with Connection(broker_url) as connection:
+        channel = connection.default_channel
+
+        while message := channel.basic_get("celery"):
+            args, _, _ = message.decode()
+            ids.append(args[0])
+
+    return ids
+
+
+@pytest.fixture(autouse=True)
+def empty_task_queue(settings):
+    published_tasks(settings.BROKER_URL)
+
+
+@pytest.fixture()
+def pending_jobs(db_session) -> list[models.Job]:
+    jobs = [
+        models.Job(
+            url=f"https://example.com/{i}.mp3",
+            type=models.JobType.transcript,
+            status=models.JobStatus.create,
+            publish_after=utcnow(),
+        )
+        for i in range(3)
+    ]
+    db_session.add_all(jobs)
+    db_session.commit()
+    return jobs
+
+
+def wait_for(condition, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_create_job_publishes_task(client, auth_headers, settings, db_session):
+    res = client.post(
+        "/api/v1/jobs",
+        headers=auth_headers,
+        json={"url": "https://example.com", "type": models.JobType.transcript},
+    )
+    id = res.json()["id"]
+
+    def published() -> bool:
+        db_session.expire_all()
+        return db_session.get(models.Job, id).publish_after is None
+
+    wait_for(published)
+    assert published_tasks(settings.BROKER_URL) == [id]
+
+
+def test_app_startup_publishes_pending_jobs(app, settings, db_session, pending_jobs):
+    def published() -> bool:
+        db_session.expire_all()
+        return all(job.publish_after is None for job in pending_jobs)
+
+    # no job is created, jobs of a previous process are pending.
+    with TestClient(app):
+        wait_for(published)
+
+    assert sorted(published_tasks(settings.BROKER_URL)) == sorted(
+        job.id for job in pending_jobs
+    )
+
+
+def test_dispatch_in_batches(outbox, settings, db_session, pending_jobs):
+    assert outbox.dispatch() == 2
+    assert outbox.dispatch() == 1
+    assert outbox.dispatch() == 0
+
+    assert sorted(published_tasks(settings.BROKER_URL)) == sorted(
+        job.id for job in pending_jobs
+    )
+
+    db_session.expire_all()
+    assert all(job.publish_after is None for job in pending_jobs)
+
+
+def test_dispatch_republishes_unconfirmed(
+    outbox, settings, db_session, pending_jobs, monkeypatch
+):
+    queue_task = outbox.task_queue.queue_task
+    calls = []
+
+    def flaky_queue_task(job, producer):
+        calls.append(job.id)
+        if len(calls) == 2:
+            raise ConnectionError("broker went away")
+        queue_task(job, producer)
+
+    monkeypatch.setattr(outbox.task_queue, "queue_task", flaky_queue_task)
+
+    assert outbox.dispatch() == 1
+    # the unconfirmed job stays claimed until the retry interval passed.
+    assert outbox.dispatch() == 1
+    assert outbox.dispatch() == 0
+
+    time.sleep(outbox.retry_interval)
+
+    assert outbox.dispatch() == 1
+    assert calls.count(calls[1]) == 2
+    assert sorted(published_tasks(settings.BROKER_URL)) == sorted(
+        job.id for job in pending_jobs
+    )
+
+
+def test_dispatch_publishes_jobs_deleted_after_claim(
+    outbox, settings, db_session, pending_jobs, monkeypatch
+):
+    claim = outbox.claim
+    ids = sorted(job.id for job in pending_jobs)
+    # claimed first.
+    deleted = [pending_jobs[0]]
+
+    def claim_and_delete(session):
+        jobs = claim(session)
+        while deleted:
+            db_session.delete(deleted.pop())
+            db_session.commit()
+        return jobs
+
+    monkeypatch.setattr(outbox, "claim", claim_and_delete)
+
+    # the worker skips tasks of deleted jobs.
+    assert outbox.dispatch() + outbox.dispatch() == 3
+    assert sorted(published_tasks(settings.BROKER_URL)) == ids
+
+
+def test_dispatch_skips_published_jobs(outbox, mock_job):
+    assert mock_job.publish_after is None
+    assert outbox.dispatch() == 0
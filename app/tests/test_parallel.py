@@ -0,0 +1,65 @@
+import multiprocessing
+
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+from app.worker.strategies.parallel import (  # noqa: E402
+    replicate,
+    transcribe_parallel,
+)
+
+
+class FakeModel(torch.nn.Module):  # type: ignore
+    """Transcribes every chunk of audio as a single segment."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.linear = torch.nn.Linear(4, 4)
+
+    def transcribe(self, audio, **kwargs):
+        return {
+            "segments": [
+                {"id": 0, "seek": 0, "start": 0, "end": len(audio) / 16000, "text": ""}
+            ]
+        }
+
+
+def transcribe_in_daemon(queue) -> None:
+    try:
+        segments = transcribe_parallel(
+            FakeModel(),  # type: ignore
+            np.random.default_rng(0).random(16000 * 10, dtype=np.float32),
+            "transcribe",
+            "en",
+            workers=2,
+            chunk_samples=16000 * 3,
+        )
+        queue.put([(s["start"], s["end"]) for s in segments])
+    except Exception as e:
+        queue.put(repr(e))
+
+
+def test_replicate_shares_weights():
+    model = FakeModel()
+    replicas = replicate(model, 2)  # type: ignore
+
+    assert len({id(replica) for replica in [model, *replicas]}) == 3
+    assert all(replica.linear.weight is model.linear.weight for replica in replicas)
+
+
+def test_transcribe_parallel_in_daemonic_process():
+    # celery's prefork pool runs tasks in daemonic processes.
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    process = context.Process(target=transcribe_in_daemon, args=(queue,), daemon=True)
+    process.start()
+    result = queue.get(timeout=60)
+    process.join()
+
+    assert isinstance(result, list), result
+    assert result[0][0] == 0
+    assert result[-1][1] == pytest.approx(10)
+    assert all(a[1] == pytest.approx(b[0]) for a, b in zip(result, result[1:]))
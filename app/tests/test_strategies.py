@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("requests")
+
+from app.worker.strategies.base import BaseStrategy  # noqa: E402
+
+
+class FakeStrategy(BaseStrategy):
+    """Transcribes one segment per second of audio."""
+
+    def _load_audio(self, job, max_samples=None):
+        return np.zeros(16000 * 5, dtype=np.float32)
+
+    def _run_whisper(self, audio, task, job, on_segments=None):
+        self.received = len(audio)
+        segments = [
+            {"id": i, "seek": i * 100, "start": i, "end": i + 1, "text": str(i)}
+            for i in range(len(audio) // 16000)
+        ]
+        if on_segments:
+            on_segments(segments, len(audio) // 160)
+        return segments
+
+
+def test_run_whisper_resumable(settings):
+    strategy = FakeStrategy(settings.model_copy(update={"MEDIA_CACHE_MAX_BYTES": 0}))
+    reported = []
+
+    job = SimpleNamespace(id="job", meta={"seek": 300}, config=None)
+    segments = strategy._run_whisper_resumable(
+        job, "transcribe", lambda segments, seek: reported.append((segments, seek))
+    )
+
+    # the first three seconds were transcribed by a previous attempt.
+    assert strategy.received == 16000 * 2
+    assert [s["start"] for s in segments] == [3, 4]
+    assert [s["seek"] for s in segments] == [300, 400]
+    assert reported[0][1] == 500
+
+
+def test_processing_key(settings):
+    strategy = FakeStrategy(settings.model_copy(update={"MEDIA_CACHE_MAX_BYTES": 0}))
+    tiny = SimpleNamespace(config={"model": "tiny"})
+    base = SimpleNamespace(config={"model": "base"})
+
+    assert strategy.processing_key(tiny) == strategy.processing_key(tiny)
+    assert strategy.processing_key(tiny) != strategy.processing_key(base)
+
+    strategy.settings = settings.model_copy(update={"WHISPER_STRATEGY": "ctranslate2"})
+    assert strategy.processing_key(tiny) != FakeStrategy(settings).processing_key(tiny)
+
+
+class FakeCTranslate2Whisper:
+    """Stands in for the compiled model, checks the shape of encoded batches."""
+
+    device = "cpu"
+    device_index = [0]
+
+    def encode(self, features, to_cpu=False):
+        assert len(features.shape) == 3
+        return features
+
+    def detect_language(self, encoder_output):
+        return [[("<|en|>", 0.9), ("<|de|>", 0.1)]] * encoder_output.shape[0]
+
+
+def test_ctranslate2_detect_language_batch(settings, monkeypatch):
+    faster_whisper = pytest.importorskip("faster_whisper")
+    from faster_whisper.feature_extractor import FeatureExtractor
+
+    from app.worker.strategies.ctranslate2 import CTranslate2Strategy
+
+    # the real `WhisperModel`, without loading weights.
+    model = faster_whisper.WhisperModel.__new__(faster_whisper.WhisperModel)
+    model.model = FakeCTranslate2Whisper()
+    model.feature_extractor = FeatureExtractor()
+
+    strategy = CTranslate2Strategy.__new__(CTranslate2Strategy)
+    BaseStrategy.__init__(
+        strategy, settings.model_copy(update={"MEDIA_CACHE_MAX_BYTES": 0})
+    )
+    strategy.model = model
+    strategy._select_model = lambda name: None  # type: ignore
+
+    def load_audio(job, max_samples=None):
+        if job.id == "missing":
+            raise FileNotFoundError(job.id)
+        return np.zeros(16000 * 5, dtype=np.float32)
+
+    strategy._load_audio = load_audio  # type: ignore
+    monkeypatch.setenv("WHISPER_MODEL", "tiny")
+
+    jobs = [SimpleNamespace(id=id, config=None) for id in ("a", "missing", "b")]
+    results = strategy.detect_language_batch(jobs)
+
+    assert results[0] == results[2] == ("language_detection", {"code": "en"})
+    assert isinstance(results[1], FileNotFoundError)
@@ -0,0 +1,105 @@
+import app.shared.db.models as models
+from app.shared.db.artifact_encoding import ArtifactEncoding
+from app.worker.transcript_writer import TranscriptWriter
+
+
+def segment(start: float) -> dict:
+    return {
+        "id": 0,
+        "seek": int(start * 100),
+        "start": start,
+        "end": start + 1,
+        "text": f"at {start}",
+        "tokens": [],
+        "temperature": 0.0,
+        "avg_logprob": -0.1,
+        "compression_ratio": 1.0,
+        "no_speech_prob": 0.0,
+    }
+
+
+def stored_segments(db_session, job) -> list[dict]:
+    db_session.expire_all()
+    artifact = db_session.query(models.Artifact).filter_by(job_id=job.id).one()
+    return artifact.data
+
+
+def test_writer_commits_first_segments(db_session, mock_job):
+    writer = TranscriptWriter(db_session, mock_job, interval=60)
+
+    writer.append([segment(0), segment(1)], 200)
+    # throttled, stored on the next flush.
+    writer.append([segment(2)], 300)
+
+    assert [s["start"] for s in stored_segments(db_session, mock_job)] == [0, 1]
+
+    writer.flush()
+
+    assert [s["id"] for s in stored_segments(db_session, mock_job)] == [0, 1, 2]
+    assert mock_job.meta["seek"] == 300
+
+
+def test_writer_appends_chunks(db_session, mock_job):
+    writer = TranscriptWriter(db_session, mock_job, interval=0)
+    writer.append([segment(0)], 100)
+    db_session.expire_all()
+    payload = writer.artifact.payload
+    writer.append([segment(1), segment(2)], 300)
+
+    db_session.expire_all()
+    artifact = writer.artifact
+
+    # stored segments are not encoded again.
+    assert artifact.encoding == ArtifactEncoding.chunked
+    assert artifact.payload[: len(payload)] == payload  # type: ignore
+    assert [s["id"] for s in artifact.data] == [0, 1, 2]
+
+    writer.finish([segment(0), segment(1), segment(2)])
+    db_session.commit()
+
+    assert writer.artifact.encoding == ArtifactEncoding.packed_transcript
+    assert [s["start"] for s in stored_segments(db_session, mock_job)] == [0, 1, 2]
+
+
+def test_writer_resumes_at_checkpoint(db_session, mock_job):
+    writer = TranscriptWriter(db_session, mock_job, interval=0)
+    writer.append([segment(0), segment(1)], 200)
+
+    # a retried attempt keeps the stored segments.
+    writer = TranscriptWriter(db_session, mock_job, interval=0)
+    assert writer.seek == 200
+    writer.append([segment(2)], 300)
+    writer.finish([segment(2), segment(3)])
+
+    db_session.commit()
+
+    segments = stored_segments(db_session, mock_job)
+    assert [s["start"] for s in segments] == [0, 1, 2, 3]
+    assert [s["id"] for s in segments] == [0, 1, 2, 3]
+    assert "seek" not in mock_job.meta
+
+
+def test_writer_without_checkpoint_starts_over(db_session, mock_job):
+    TranscriptWriter(db_session, mock_job, interval=0).append([segment(0)], 100)
+
+    mock_job.meta = {"attempts": 2}
+    writer = TranscriptWriter(db_session, mock_job, interval=0)
+
+    assert writer.segments == []
+
+
+def test_writer_reuses_artifact(db_session, mock_job, mock_artifact):
+    writer = TranscriptWriter(db_session, mock_job, interval=0)
+    writer.append([segment(0)], 100)
+
+    assert writer.artifact.id == mock_artifact.id
+    assert len(stored_segments(db_session, mock_job)) == 1
+
+
+def test_get_partial_artifacts(client, auth_headers, db_session, mock_job):
+    TranscriptWriter(db_session, mock_job, interval=0).append([segment(0)], 100)
+
+    res = client.get(f"/api/v1/jobs/{mock_job.id}/artifacts", headers=auth_headers)
+
+    assert res.status_code == 200
+    assert res.json()[0]["data"][0]["text"] == "at 0"
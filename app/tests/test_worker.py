@@ -0,0 +1,281 @@
+import importlib
+import uuid
+
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded, TimeLimitExceeded
+
+import app.shared.db.models as models
+from app.shared.db.base import make_session_local
+from app.shared.events import publish_job_changes
+from app.tests.test_events import FakePublisher
+from app.tests.test_transcript_writer import segment
+from app.worker.transcript_writer import TranscriptWriter
+
+
+@pytest.fixture()
+def worker(monkeypatch, settings):
+    # the worker reads its settings from the environment on import.
+    for key in ("API_SECRET", "BROKER_URL", "DATABASE_URI", "ENVIRONMENT"):
+        monkeypatch.setenv(key, getattr(settings, key))
+
+    worker = importlib.import_module("app.worker.main")
+    monkeypatch.setattr(worker, "settings", settings)
+    return worker
+
+
+@pytest.fixture()
+def publisher():
+    return FakePublisher()
+
+
+@pytest.fixture()
+def session_local(test_db, publisher):
+    session_local = make_session_local(test_db)
+    publish_job_changes(session_local, publisher)
+    return session_local
+
+
+def create_job(session_local, **kwargs) -> str:
+    with session_local() as session:
+        job = models.Job(
+            **{
+                "url": "https://example.com",
+                "type": models.JobType.language_detection,
+                "status": models.JobStatus.create,
+                **kwargs,
+            }
+        )
+        session.add(job)
+        session.commit()
+        return str(job.id)
+
+
+def test_claimed_language_detection_jobs_publish_events(
+    worker, settings, session_local, publisher
+):
+    settings.LANGUAGE_DETECTION_BATCH_SIZE = 8
+    leader_id = create_job(session_local)
+    ids = [create_job(session_local) for _ in range(2)]
+    publisher.events.clear()
+
+    with session_local() as session:
+        leader = session.get(models.Job, leader_id)
+        claimed = worker.claim_language_detection_jobs(session, leader)
+        assert sorted(job.id for job in claimed) == sorted(ids)
+
+    assert sorted(
+        (str(e.id), e.status, str(e.meta.batch_id)) for e in publisher.events
+    ) == sorted((id, models.JobStatus.processing, leader_id) for id in ids)
+
+
+def test_claimed_language_detection_jobs_keep_meta(worker, settings, session_local):
+    settings.LANGUAGE_DETECTION_BATCH_SIZE = 8
+    leader_id = create_job(session_local)
+    id = create_job(session_local, meta={"fingerprint": "abc"})
+
+    with session_local() as session:
+        leader = session.get(models.Job, leader_id)
+        [claimed] = worker.claim_language_detection_jobs(session, leader)
+        assert str(claimed.id) == id
+        assert claimed.meta == {
+            "fingerprint": "abc",
+            "batch_id": leader_id,
+            "attempts": 1,
+        }
+
+
+def test_task_takes_over_job_of_finished_batch(worker, session_local, monkeypatch):
+    monkeypatch.setattr(worker, "SessionLocal", session_local)
+    monkeypatch.setattr(worker.transcribe, "strategy", FailingStrategy())
+    leader_id = create_job(session_local, status=models.JobStatus.processing)
+    id = create_job(
+        session_local,
+        type=models.JobType.transcript,
+        status=models.JobStatus.processing,
+        meta={"batch_id": leader_id, "attempts": 1},
+    )
+
+    # processed by the batch of its leader.
+    worker.transcribe.run(id)
+
+    with session_local() as session:
+        job = session.get(models.Job, id)
+        assert job and job.status == models.JobStatus.processing
+        session.get(models.Job, leader_id).status = models.JobStatus.error
+        session.commit()
+
+    with pytest.raises(RuntimeError):
+        worker.transcribe.run(id)
+
+    with session_local() as session:
+        job = session.get(models.Job, id)
+        assert job and job.status == models.JobStatus.error
+        assert job.meta["attempts"] == 2
+        assert "batch_id" not in job.meta
+
+
+def test_find_duplicate_job_with_same_processing_key(worker, db_session):
+    def job(processed_with: str, status=models.JobStatus.success) -> models.Job:
+        job = models.Job(
+            url="https://example.com",
+            type=models.JobType.transcript,
+            status=status,
+            meta={"fingerprint": "abc", "processed_with": processed_with},
+        )
+        db_session.add(job)
+        db_session.commit()
+        return job
+
+    tiny = job('{"model":"tiny"}')
+    job('{"model":"base"}')
+    pending = job('{"model":"tiny"}', models.JobStatus.processing)
+
+    duplicate = worker.find_duplicate_job(
+        db_session, pending, "abc", '{"model":"tiny"}'
+    )
+    assert duplicate and duplicate.id == tiny.id
+    assert not worker.find_duplicate_job(
+        db_session, pending, "abc", '{"model":"large"}'
+    )
+
+
+class FailingStrategy:
+    """Stores a segment, then fails."""
+
+    def fingerprint(self, job):
+        return None
+
+    def processing_key(self, job):
+        return "{}"
+
+    def process(self, job, on_segments):
+        on_segments([segment(0)], 100)
+        raise RuntimeError("model crashed")
+
+    def cleanup(self, job_id):
+        pass
+
+
+def test_failed_job_drops_partial_transcript(worker, session_local, monkeypatch):
+    monkeypatch.setattr(worker, "SessionLocal", session_local)
+    monkeypatch.setattr(worker.transcribe, "strategy", FailingStrategy())
+    id = create_job(session_local, type=models.JobType.transcript)
+
+    with pytest.raises(RuntimeError):
+        worker.transcribe.run(id)
+
+    with session_local() as session:
+        job = session.get(models.Job, id)
+        assert job and job.status == models.JobStatus.error
+        assert job.meta["error"] == "model crashed"
+        assert "seek" not in job.meta
+        assert not session.query(models.Artifact).filter_by(job_id=id).count()
+
+
+def test_claim_job_once(worker, session_local):
+    id = create_job(session_local, type=models.JobType.transcript)
+    a, b = str(uuid.uuid4()), str(uuid.uuid4())
+
+    with session_local() as session:
+        job = session.get(models.Job, id)
+        assert worker.claim_job(session, job, a, {"task_id": a, "attempts": 1})
+        assert not worker.claim_job(session, job, b, {"task_id": b, "attempts": 1})
+        # a redelivered task keeps its id.
+        assert worker.claim_job(session, job, a, {"task_id": a, "attempts": 2})
+        assert job.meta == {"task_id": a, "attempts": 2}
+
+
+def test_duplicate_task_is_dropped(worker, session_local, monkeypatch):
+    monkeypatch.setattr(worker, "SessionLocal", session_local)
+    monkeypatch.setattr(worker.transcribe, "strategy", FailingStrategy())
+    meta = {"task_id": str(uuid.uuid4()), "attempts": 1}
+    id = create_job(
+        session_local,
+        type=models.JobType.transcript,
+        status=models.JobStatus.processing,
+        meta=meta,
+    )
+
+    worker.transcribe.run(id)
+
+    with session_local() as session:
+        job = session.get(models.Job, id)
+        assert job and job.status == models.JobStatus.processing
+        assert job.meta == meta
+
+
+class ResumingStrategy(FailingStrategy):
+    """Continues at the checkpoint of a previous attempt."""
+
+    def process(self, job, on_segments):
+        assert job.meta["seek"] == 100
+        return models.ArtifactType.raw_transcript, [segment(1)]
+
+    def loaded_models(self):
+        return []
+
+
+def test_redelivered_task_continues_at_checkpoint(worker, session_local, monkeypatch):
+    monkeypatch.setattr(worker, "SessionLocal", session_local)
+    monkeypatch.setattr(worker.transcribe, "strategy", ResumingStrategy())
+    task_id = str(uuid.uuid4())
+    id = create_job(
+        session_local,
+        type=models.JobType.transcript,
+        status=models.JobStatus.processing,
+        meta={"task_id": task_id, "attempts": 1},
+    )
+
+    # the first attempt stored a segment before its worker was lost.
+    with session_local() as session:
+        writer = TranscriptWriter(session, session.get(models.Job, id), 0)
+        writer.append([segment(0)], 100)
+
+    worker.transcribe.apply(args=[id], task_id=task_id).get()
+
+    with session_local() as session:
+        job = session.get(models.Job, id)
+        assert job and job.status == models.JobStatus.success
+        assert job.meta["attempts"] == 2
+        artifact = session.query(models.Artifact).filter_by(job_id=id).one()
+        assert [s["start"] for s in artifact.data] == [0, 1]
+
+
+def test_task_is_sent_again_after_hard_time_limit(worker, monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        worker.transcribe, "apply_async", lambda **kwargs: sent.append(kwargs)
+    )
+
+    worker.resend_timed_out_task(
+        sender=worker.transcribe,
+        task_id="a",
+        exception=SoftTimeLimitExceeded(),
+        args=["job"],
+        kwargs={},
+    )
+    worker.resend_timed_out_task(
+        sender=worker.transcribe,
+        task_id="a",
+        exception=TimeLimitExceeded(60),
+        args=["job"],
+        kwargs={},
+    )
+
+    assert sent == [{"args": ["job"], "kwargs": {}, "task_id": "a"}]
+
+
+def test_pool_process_runs_on_share_of_its_index(worker, settings, monkeypatch):
+    pinned = []
+    monkeypatch.setattr(
+        worker.os, "sched_setaffinity", lambda _, cpus: pinned.extend(cpus)
+    )
+    monkeypatch.setattr(worker, "current_process_index", lambda base: 1)
+    # keeps torch from being imported.
+    settings.WHISPER_STRATEGY = "ctranslate2"
+    settings.WORKER_CPU_SHARES = [[[0, 4], [1, 5]], [[2, 6]]]
+
+    worker.configure_threads()
+
+    assert pinned == [2, 6]
+    assert settings.WORKER_THREADS == 1
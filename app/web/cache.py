@@ -0,0 +1,102 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from math import inf
+from typing import Callable, Generic, Hashable, NamedTuple, TypeVar
+
+from fastapi import Response
+
+T = TypeVar("T")
+
+
+class LRUCache(Generic[T]):
+    """
+    Thread-safe in-process cache that evicts the least recently used entries
+    when the total size of its entries exceeds `max_bytes`.
+    Entries larger than `max_bytes` are not stored. If `max_age` is set,
+    entries expire that many seconds after they were stored.
+    """
+
+    def __init__(self, max_bytes: int, max_age: float | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # value, size and expiry of each entry.
+        self.entries: OrderedDict[Hashable, tuple[T, int, float]] = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> T | None:
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return None
+
+            if entry[2] <= time.monotonic():
+                self._remove(key)
+                return None
+
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: Hashable, value: T, size: int) -> None:
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            self._remove(key)
+
+            expires_at = (
+                time.monotonic() + self.max_age if self.max_age is not None else inf
+            )
+            self.entries[key] = (value, size, expires_at)
+            self.size += size
+
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def delete(self, key: Hashable) -> None:
+        with self.lock:
+            self._remove(key)
+
+    def delete_if(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Remove all entries whose key matches `predicate`."""
+        with self.lock:
+            for key in [key for key in self.entries if predicate(key)]:
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self.entries.pop(key, None)
+
+        if entry is not None:
+            self.size -= entry[1]
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an `If-None-Match` header matches `etag`, compared weakly."""
+    if if_none_match.strip() == "*":
+        return True
+
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in tags
+
+
+class CachedResponse(NamedTuple):
+    """A serialized JSON response body."""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def create(cls, body: bytes) -> "CachedResponse":
+        return cls(body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+    def respond(self, if_none_match: str | None, cache_control: str) -> Response:
+        """Respond with the body, or with 304 if the client has it already."""
+        headers = {"ETag": self.etag, "Cache-Control": cache_control}
+
+        if if_none_match and etag_matches(if_none_match, self.etag):
+            return Response(status_code=304, headers=headers)
+
+        return Response(self.body, media_type="application/json", headers=headers)
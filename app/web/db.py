@@ -0,0 +1,92 @@
+"""
+Sync database sessions for async endpoints, see `DATABASE_ASYNC`.
+
+Endpoints are written against `AsyncSession`. By default, they get a
+`ThreadedSession` instead, which runs a sync session in the thread pool.
+With SQLite, this is faster than the async driver, which runs every call
+of a query in its own thread.
+"""
+import asyncio
+from typing import Any, Iterable
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Result, ScalarResult
+from sqlalchemy.engine import CursorResult, FrozenResult
+from sqlalchemy.orm import Session, sessionmaker
+
+
+class ThreadedSession:
+    """
+    The part of the `AsyncSession` interface that endpoints use, over a sync
+    session. Queries run in the thread pool, their rows are fetched there.
+    """
+
+    def __init__(self, session: Session, limiter: asyncio.Semaphore) -> None:
+        self.sync_session = session
+        self.limiter = limiter
+
+    async def __aenter__(self) -> "ThreadedSession":
+        await self.limiter.acquire()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        try:
+            await self.close()
+        finally:
+            self.limiter.release()
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Result:
+        def execute() -> Any:
+            result = self.sync_session.execute(statement, *args, **kwargs)
+            if isinstance(result, CursorResult) and not result.returns_rows:
+                return result
+
+            # buffered like the results of `AsyncSession`.
+            return result.freeze()
+
+        result = await run_in_threadpool(execute)
+        return result() if isinstance(result, FrozenResult) else result
+
+    async def scalars(
+        self, statement: Any, *args: Any, **kwargs: Any
+    ) -> ScalarResult[Any]:
+        return (await self.execute(statement, *args, **kwargs)).scalars()
+
+    async def scalar(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(
+            self.sync_session.scalar, statement, *args, **kwargs
+        )
+
+    async def get(self, entity: Any, ident: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    def add(self, instance: object) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances: Iterable[object]) -> None:
+        self.sync_session.add_all(instances)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def refresh(self, instance: object) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
+class ThreadedSessionMaker:
+    """
+    Creates `ThreadedSession`s, at most `max_sessions` are entered at once.
+    A session holds its connection between calls. If more sessions waited
+    for a connection than the pool has, they could take all threads of the
+    pool from the sessions that hold a connection, and wait forever.
+    """
+
+    def __init__(self, session_local: sessionmaker[Session], max_sessions: int):
+        self.session_local = session_local
+        self.limiter = asyncio.Semaphore(max_sessions)
+
+    def __call__(self) -> ThreadedSession:
+        return ThreadedSession(self.session_local(), self.limiter)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Any, Literal
 from uuid import UUID
 
 from pydantic import AnyHttpUrl, BaseModel, ConfigDict
@@ -10,6 +11,7 @@ from app.shared.db.models import (
     JobMeta,
     JobStatus,
     JobType,
+    LanguageDetection,
 )
 
 # DB objects
@@ -38,3 +40,43 @@ class Artifact(WithDbFields):
     job_id: UUID
     data: ArtifactData
     type: ArtifactType
+
+
+# fields of `RawTranscript` that can be selected.
+TranscriptField = Literal[
+    "id",
+    "seek",
+    "start",
+    "end",
+    "text",
+    "tokens",
+    "temperature",
+    "avg_logprob",
+    "compression_ratio",
+    "no_speech_prob",
+]
+
+
+class ArtifactSlice(WithDbFields):
+    """A transcription artifact with a subset of segments and their fields."""
+
+    job_id: UUID
+    data: list[dict[str, Any]] | LanguageDetection | None
+    type: ArtifactType
+
+
+# Batches
+
+
+class JobBatchError(BaseModel):
+    """Validation errors of one job in a batch."""
+
+    index: int
+    errors: list[dict[str, Any]]
+
+
+class JobBatch(BaseModel):
+    """Result of a batch submission. Invalid jobs are skipped and reported."""
+
+    jobs: list[Job]
+    errors: list[JobBatchError]
@@ -0,0 +1,49 @@
+import enum
+from typing import Any, Iterator
+
+# fields of transcript segments that are used by all formats.
+EXPORT_FIELDS = ("start", "end", "text")
+
+
+class ExportFormat(str, enum.Enum):
+    """Text formats a transcript can be exported to."""
+
+    srt = "srt"
+    vtt = "vtt"
+    txt = "txt"
+
+
+MEDIA_TYPES = {
+    ExportFormat.srt: "application/x-subrip",
+    ExportFormat.vtt: "text/vtt",
+    ExportFormat.txt: "text/plain",
+}
+
+
+def format_timestamp(seconds: float, decimal_marker: str) -> str:
+    milliseconds = round(seconds * 1000)
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{decimal_marker}{milliseconds:03d}"
+
+
+def render(segments: list[dict[str, Any]], format: ExportFormat) -> Iterator[str]:
+    """Render transcript segments in `format`, in chunks of one segment."""
+    if format == ExportFormat.vtt:
+        yield "WEBVTT\n\n"
+
+    for i, segment in enumerate(segments, start=1):
+        text = segment["text"].strip()
+
+        if format == ExportFormat.txt:
+            yield f"{text}\n"
+            continue
+
+        marker = "," if format == ExportFormat.srt else "."
+        start = format_timestamp(segment["start"], marker)
+        end = format_timestamp(segment["end"], marker)
+
+        # WebVTT cue identifiers are optional, SRT requires a counter.
+        prefix = f"{i}\n" if format == ExportFormat.srt else ""
+        yield f"{prefix}{start} --> {end}\n{text}\n\n"
@@ -0,0 +1,45 @@
+from functools import lru_cache
+
+from fastapi import Depends
+
+from app.shared.events import JobEvent
+from app.shared.settings import Settings
+from app.web.cache import CachedResponse, LRUCache
+from app.web.injections.job_events import job_event_listener
+from app.web.injections.settings import get_settings
+
+
+@lru_cache
+def export_cache(max_bytes: int) -> LRUCache[bytes]:
+    return LRUCache(max_bytes)
+
+
+async def get_export_cache(settings: Settings = Depends(get_settings)):
+    return export_cache(settings.EXPORT_CACHE_MAX_BYTES)
+
+
+@lru_cache
+def response_cache(
+    max_bytes: int, max_age: float, broker_url: str
+) -> LRUCache[CachedResponse]:
+    # expires like the responses cached by clients, in case an event was missed.
+    cache: LRUCache[CachedResponse] = LRUCache(max_bytes, max_age)
+
+    # jobs might be deleted through another process.
+    def invalidate(job_event: JobEvent) -> None:
+        if job_event.deleted:
+            cache.delete_if(lambda key: key[1] == job_event.id)  # type: ignore
+
+    listener = job_event_listener(broker_url)
+    listener.callbacks.append(invalidate)
+    listener.start()
+
+    return cache
+
+
+async def get_response_cache(settings: Settings = Depends(get_settings)):
+    return response_cache(
+        settings.RESPONSE_CACHE_MAX_BYTES,
+        settings.RESPONSE_CACHE_MAX_AGE,
+        settings.BROKER_URL,
+    )
@@ -1,26 +1,51 @@
 from functools import lru_cache
-from typing import Generator
+from typing import AsyncGenerator
 
 from fastapi import Depends
-from sqlalchemy.orm import Session
-
-from app.shared.db.base import make_engine, make_session_local
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.shared.db.base import (
+    make_async_engine,
+    make_async_session_local,
+    make_engine,
+    make_session_local,
+)
 from app.shared.settings import Settings
+from app.web.db import ThreadedSession, ThreadedSessionMaker
 from app.web.injections.settings import get_settings
 
 
 @lru_cache
-def session_local(database_url: str):
-    engine = make_engine(database_url)
-    return make_session_local(engine)
-
-
-def get_session_local(settings: Settings = Depends(get_settings)):
-    return session_local(settings.DATABASE_URI)
-
-
-def get_session(
+def session_local(
+    database_url: str, pool_size: int, max_overflow: int, async_driver: bool
+):
+    if async_driver:
+        engine = make_async_engine(
+            database_url, pool_size=pool_size, max_overflow=max_overflow
+        )
+        return make_async_session_local(engine)
+
+    sync_engine = make_engine(
+        database_url, pool_size=pool_size, max_overflow=max_overflow
+    )
+    # attributes are not reloaded after a commit, like with the async driver.
+    return ThreadedSessionMaker(
+        make_session_local(sync_engine, expire_on_commit=False),
+        max_sessions=pool_size + max_overflow,
+    )
+
+
+async def get_session_local(settings: Settings = Depends(get_settings)):
+    return session_local(
+        settings.DATABASE_URI,
+        settings.DATABASE_POOL_SIZE,
+        settings.DATABASE_MAX_OVERFLOW,
+        settings.DATABASE_ASYNC,
+    )
+
+
+async def get_session(
     session_local=Depends(get_session_local),
-) -> Generator[Session, None, None]:
-    with session_local() as session:
+) -> AsyncGenerator[AsyncSession | ThreadedSession, None]:
+    async with session_local() as session:
         yield session
@@ -0,0 +1,26 @@
+from functools import lru_cache
+
+from fastapi import Depends
+
+from app.shared.events import EventPublisher
+from app.shared.settings import Settings
+from app.web.injections.settings import get_settings
+from app.web.job_events import JobEventListener
+
+
+@lru_cache
+def job_event_listener(broker_url: str):
+    return JobEventListener(broker_url)
+
+
+async def get_job_event_listener(settings: Settings = Depends(get_settings)):
+    return job_event_listener(settings.BROKER_URL)
+
+
+@lru_cache
+def event_publisher(broker_url: str):
+    return EventPublisher(broker_url)
+
+
+async def get_event_publisher(settings: Settings = Depends(get_settings)):
+    return event_publisher(settings.BROKER_URL)
@@ -0,0 +1,23 @@
+from fastapi import Request
+
+from app.shared.db.base import make_engine, make_session_local
+from app.shared.settings import Settings
+from app.web.injections.task_queue import task_queue
+from app.web.outbox import OutboxDispatcher
+
+
+def outbox_dispatcher(settings: Settings) -> OutboxDispatcher:
+    # the dispatcher runs in its own thread, with a sync session.
+    session_local = make_session_local(make_engine(settings.DATABASE_URI))
+    return OutboxDispatcher(
+        task_queue(settings.BROKER_URL),
+        session_local,
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        poll_interval=settings.OUTBOX_POLL_INTERVAL,
+        retry_interval=settings.OUTBOX_RETRY_INTERVAL,
+    )
+
+
+async def get_outbox_dispatcher(request: Request) -> OutboxDispatcher:
+    # passed to `app_factory`, or created when the app starts.
+    return request.app.state.outbox
@@ -8,7 +8,7 @@ from app.shared.settings import Settings
 from app.web.injections.settings import get_settings
 
 
-def api_key_auth(
+async def api_key_auth(
     credentials: Annotated[
         HTTPAuthorizationCredentials, Depends(HTTPBearer(auto_error=False))
     ],
@@ -17,7 +17,7 @@ def api_key_auth(
     validate_credentials(credentials, settings.API_SECRET)
 
 
-def sharing_auth(
+async def sharing_auth(
     credentials: Annotated[
         HTTPAuthorizationCredentials, Depends(HTTPBearer(auto_error=False))
     ],
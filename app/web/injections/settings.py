@@ -4,5 +4,9 @@ from app.shared.settings import Settings
 
 
 @lru_cache
-def get_settings():
+def settings():
     return Settings()  # type: ignore
+
+
+async def get_settings():
+    return settings()
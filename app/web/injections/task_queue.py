@@ -12,5 +12,5 @@ def task_queue(broker_url: str):
     return TaskQueue(broker_url)
 
 
-def get_task_queue(settings: Settings = Depends(get_settings)):
+async def get_task_queue(settings: Settings = Depends(get_settings)):
     return task_queue(settings.BROKER_URL)
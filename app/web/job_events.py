@@ -0,0 +1,115 @@
+import asyncio
+import socket
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable
+
+from kombu import Connection, Queue
+from kombu.message import Message
+
+from app.shared.events import EXCHANGE, JobEvent
+from app.shared.logger import logger
+
+Subscriber = tuple[asyncio.AbstractEventLoop, asyncio.Queue[JobEvent]]
+
+
+class JobEventListener:
+    """
+    Receives job events published by workers and hands them to the subscribers
+    of this process. Every process consumes the event exchange with a single
+    connection in a background thread, regardless of the number of subscribers.
+    """
+
+    def __init__(self, broker_url: str) -> None:
+        self.broker_url = broker_url
+        self.subscribers: dict[uuid.UUID, list[Subscriber]] = defaultdict(list)
+        # called with every event, from the listener thread.
+        self.callbacks: list[Callable[[JobEvent], None]] = []
+        self.lock = threading.Lock()
+        self.thread: threading.Thread | None = None
+        self.stopped = threading.Event()
+        # set while the listener's queue is bound to the exchange.
+        self.ready = threading.Event()
+
+    def subscribe(self, job_id: uuid.UUID) -> asyncio.Queue[JobEvent]:
+        """Receive events of job `job_id`. Must be called from an event loop."""
+        queue: asyncio.Queue[JobEvent] = asyncio.Queue()
+
+        with self.lock:
+            self.subscribers[job_id].append((asyncio.get_running_loop(), queue))
+
+        self.start()
+
+        return queue
+
+    def start(self) -> None:
+        """Start consuming events, if not started yet."""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name="job-events", daemon=True
+                )
+                self.thread.start()
+
+    def unsubscribe(self, job_id: uuid.UUID, queue: asyncio.Queue[JobEvent]) -> None:
+        with self.lock:
+            subscribers = [s for s in self.subscribers[job_id] if s[1] is not queue]
+
+            if subscribers:
+                self.subscribers[job_id] = subscribers
+            else:
+                del self.subscribers[job_id]
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+        if self.thread:
+            self.thread.join()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                self.consume()
+            except Exception as e:
+                logger.warn(f"job event listener failed, reconnecting: {e}")
+                self.ready.clear()
+                self.stopped.wait(1)
+
+    def consume(self) -> None:
+        # a queue per process, removed by the broker when the process goes away.
+        queue = Queue(
+            f"{EXCHANGE.name}.{uuid.uuid4()}",
+            exchange=EXCHANGE,
+            durable=False,
+            exclusive=True,
+            auto_delete=True,
+        )
+
+        with Connection(self.broker_url) as connection:
+            with connection.Consumer(
+                queue, callbacks=[self.on_message], accept=["json"], no_ack=True
+            ):
+                self.ready.set()
+
+                while not self.stopped.is_set():
+                    try:
+                        connection.drain_events(timeout=1)
+                    except socket.timeout:
+                        pass
+
+    def on_message(self, body: dict, message: Message) -> None:
+        job_event = JobEvent(**body)
+
+        for callback in self.callbacks:
+            callback(job_event)
+
+        with self.lock:
+            subscribers = list(self.subscribers.get(job_event.id, []))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, job_event)
+            except RuntimeError:
+                # the subscriber's loop was closed before it unsubscribed.
+                pass
@@ -1,32 +1,116 @@
-from typing import Annotated
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Annotated, Any, AsyncGenerator, AsyncIterator
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Path
-from pydantic import AnyHttpUrl, BaseModel, Field
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import AnyHttpUrl, BaseModel, Field, TypeAdapter, ValidationError
+from sqlalchemy import Row, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 import app.shared.db.models as models
 import app.web.dtos as dtos
-from app.web.injections.db import get_session
+from app.shared.events import EventPublisher, JobEvent
+from app.shared.settings import Settings
+from app.web.cache import CachedResponse, LRUCache, etag_matches
+from app.web.db import ThreadedSession, ThreadedSessionMaker
+from app.web.export import EXPORT_FIELDS, MEDIA_TYPES, ExportFormat, render
+from app.web.injections.cache import get_export_cache, get_response_cache
+from app.web.injections.db import get_session, get_session_local
+from app.web.injections.job_events import (
+    get_event_publisher,
+    get_job_event_listener,
+)
+from app.web.injections.outbox import get_outbox_dispatcher, outbox_dispatcher
 from app.web.injections.security import api_key_auth, sharing_auth
-from app.web.injections.task_queue import get_task_queue
-from app.web.task_queue import TaskQueue
+from app.web.injections.settings import get_settings
+from app.web.job_events import JobEventListener
+from app.web.outbox import OutboxDispatcher, utcnow
+from app.web.pagination import after_cursor, encode_cursor, to_utc
 
-DatabaseSession = Annotated[Session, Depends(get_session)]
+DatabaseSession = Annotated[AsyncSession | ThreadedSession, Depends(get_session)]
+AppSettings = Annotated[Settings, Depends(get_settings)]
+ResponseCache = Annotated[LRUCache[CachedResponse], Depends(get_response_cache)]
 
+# job listings select these columns, rows are serialized without ORM objects.
+JOB_COLUMNS = (
+    models.Job.id,
+    models.Job.created_at,
+    models.Job.updated_at,
+    models.Job.status,
+    models.Job.type,
+    models.Job.url,
+    models.Job.meta,
+    models.Job.config,
+)
 
-def app_factory():
+ARTIFACTS = TypeAdapter(list[dtos.Artifact])
+ARTIFACT_SLICES = TypeAdapter(list[dtos.ArtifactSlice])
+
+TERMINAL_STATUSES = (models.JobStatus.success, models.JobStatus.error)
+
+# maximum number of jobs in a batch submission.
+BATCH_MAX_JOBS = 10_000
+
+
+def cache_control(settings: Settings) -> str:
+    """Cache-Control of finished jobs, shared caches only store shareable jobs."""
+    scope = "public" if settings.ENABLE_SHARING else "private"
+    return f"{scope}, max-age={settings.RESPONSE_CACHE_MAX_AGE}"
+
+
+def format_event(job_event: JobEvent) -> str:
+    return f"event: job\ndata: {job_event.model_dump_json()}\n\n"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if app.state.outbox is None:
+        app.state.outbox = outbox_dispatcher(await get_settings())
+
+    outbox: OutboxDispatcher = app.state.outbox
+
+    # jobs left unpublished by a previous process are published without
+    # waiting for a new job to be created.
+    outbox.start()
+    try:
+        yield
+    finally:
+        await run_in_threadpool(outbox.stop)
+
+
+def app_factory(outbox: OutboxDispatcher | None = None):
     app = FastAPI(
         description=(
             "whisperbox-transcribe is an async HTTP wrapper for openai/whisper."
         ),
         title="whisperbox-transcribe",
+        lifespan=lifespan,
     )
 
+    # created from the settings when the app starts, unless passed.
+    app.state.outbox = outbox
+
     api_router = APIRouter(prefix="/api/v1")
 
     @api_router.get("/", status_code=204)
-    def api_root():
+    async def api_root():
         return None
 
     @api_router.get(
@@ -35,17 +119,50 @@ def app_factory():
         response_model=list[dtos.Job],
         summary="Get metadata for all jobs",
     )
-    def get_jobs(
+    async def get_jobs(
         session: DatabaseSession,
+        response: Response,
         type: dtos.JobType | None = None,
-    ) -> list[models.Job]:
-        """Get metadata for all jobs."""
-        query = session.query(models.Job).order_by(models.Job.created_at.desc())
+        status: dtos.JobStatus | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        cursor: str | None = None,
+        limit: int = Query(default=100, ge=1, le=1000),
+    ) -> list[Row]:
+        """
+        Get metadata for all jobs, newest first.
+        Results are paginated, if there are more jobs, the `X-Next-Cursor`
+        header contains a `cursor` that returns the next page.
+        """
+        query = select(*JOB_COLUMNS).order_by(
+            models.Job.created_at.desc(), models.Job.id.desc()
+        )
 
         if type:
-            query = query.filter(models.Job.type == type)
+            query = query.where(models.Job.type == type)
+
+        if status:
+            query = query.where(models.Job.status == status)
+
+        if created_after:
+            query = query.where(models.Job.created_at >= to_utc(created_after))
+
+        if created_before:
+            query = query.where(models.Job.created_at < to_utc(created_before))
+
+        if cursor:
+            query = query.where(after_cursor(cursor))
 
-        return query.all()
+        # fetch one more job to know whether there is a next page.
+        jobs = list((await session.execute(query.limit(limit + 1))).all())
+
+        if len(jobs) > limit:
+            jobs = jobs[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                jobs[-1].created_at, jobs[-1].id
+            )
+
+        return jobs
 
     @api_router.get(
         "/jobs/{id}",
@@ -53,40 +170,234 @@ def app_factory():
         response_model=dtos.Job,
         summary="Get metadata for one job",
     )
-    def get_job(
+    async def get_job(
         session: DatabaseSession,
+        cache: ResponseCache,
+        settings: AppSettings,
+        response: Response,
         id: UUID = Path(),
-    ) -> models.Job | None:
+        if_none_match: Annotated[str | None, Header()] = None,
+    ) -> models.Job | Response:
         """
         Use this route to check transcription status of any given job.
         """
-        job = session.query(models.Job).filter(models.Job.id == str(id)).one_or_none()
+        # finished jobs do not change, they are served from memory.
+        cached = cache.get(("job", id))
+
+        if cached:
+            return cached.respond(if_none_match, cache_control(settings))
+
+        job = await session.get(models.Job, str(id))
 
         if not job:
             raise HTTPException(status_code=404)
 
+        if job.status in TERMINAL_STATUSES:
+            body = dtos.Job.model_validate(job).model_dump_json().encode()
+            cached = CachedResponse.create(body)
+            cache.set(("job", id), cached, len(body))
+            return cached.respond(if_none_match, cache_control(settings))
+
+        response.headers["Cache-Control"] = "no-cache"
         return job
 
+    @api_router.get(
+        "/jobs/{id}/events",
+        dependencies=[Depends(sharing_auth)],
+        response_class=StreamingResponse,
+        responses={200: {"content": {"text/event-stream": {}}}},
+        summary="Stream status changes of one job",
+    )
+    async def stream_job_events(
+        request: Request,
+        session_local: Annotated[
+            async_sessionmaker[AsyncSession] | ThreadedSessionMaker,
+            Depends(get_session_local),
+        ],
+        listener: Annotated[JobEventListener, Depends(get_job_event_listener)],
+        settings: Annotated[Settings, Depends(get_settings)],
+        id: UUID = Path(),
+    ) -> StreamingResponse:
+        """
+        Streams server-sent events with the status and meta of a job,
+        starting with its current state. Progress of running jobs is reported
+        in `meta.seek`. The stream ends once the job succeeded, failed or
+        was deleted.
+        """
+        # subscribe before reading the job, so no change is missed in between.
+        queue = listener.subscribe(id)
+
+        # the session is closed before streaming, streams can be long-lived.
+        try:
+            async with session_local() as session:
+                job = await session.get(models.Job, str(id))
+                job_event = JobEvent.model_validate(job) if job else None
+        except BaseException:
+            listener.unsubscribe(id, queue)
+            raise
+
+        if not job_event:
+            listener.unsubscribe(id, queue)
+            raise HTTPException(status_code=404)
+
+        async def stream(job_event: JobEvent) -> AsyncGenerator[str, None]:
+            try:
+                yield format_event(job_event)
+
+                while (
+                    job_event.status not in TERMINAL_STATUSES and not job_event.deleted
+                ):
+                    if await request.is_disconnected():
+                        break
+
+                    try:
+                        job_event = await asyncio.wait_for(
+                            queue.get(), settings.EVENTS_KEEPALIVE_INTERVAL
+                        )
+                    except asyncio.TimeoutError:
+                        yield ": keepalive\n\n"
+                    else:
+                        yield format_event(job_event)
+            finally:
+                listener.unsubscribe(id, queue)
+
+        return StreamingResponse(
+            stream(job_event),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @api_router.get(
         "/jobs/{id}/artifacts",
         dependencies=[Depends(api_key_auth)],
         response_model=list[dtos.Artifact],
         summary="Get all artifacts for one job",
     )
-    def get_artifacts_for_job(
+    async def get_artifacts_for_job(
         session: DatabaseSession,
+        cache: ResponseCache,
+        settings: AppSettings,
         id: UUID = Path(),
-    ) -> list[models.Artifact]:
+        fields: Annotated[
+            list[dtos.TranscriptField] | None,
+            Query(description="Only return these fields of transcript segments."),
+        ] = None,
+        start: Annotated[
+            float | None,
+            Query(ge=0, description="Only return segments that end after this time."),
+        ] = None,
+        end: Annotated[
+            float | None,
+            Query(ge=0, description="Only return segments that start before this."),
+        ] = None,
+        if_none_match: Annotated[str | None, Header()] = None,
+    ) -> Response:
         """
         Returns all artifacts for one job.
         See the type of `data` for possible data types.
-        Returns an empty array for unfinished or non-existant jobs.
+        While a transcript or translation job is processing, its transcript
+        contains the segments that were transcribed so far.
+        Transcripts can be limited to a time range in seconds and to some
+        fields of each segment.
+        Returns an empty array for non-existant jobs and jobs without results yet.
         """
+        key = ("artifacts", id, tuple(fields) if fields else None, start, end)
+        cached = cache.get(key)
+
+        if cached:
+            return cached.respond(if_none_match, cache_control(settings))
+
+        # read before the artifacts. if the job finished only after this, its
+        # artifacts might be read while partial and must not be cached.
+        status = await session.scalar(
+            select(models.Job.status).where(models.Job.id == str(id))
+        )
+
         artifacts = (
-            session.query(models.Artifact).filter(models.Artifact.job_id == str(id))
+            await session.scalars(
+                select(models.Artifact).where(models.Artifact.job_id == str(id))
+            )
         ).all()
 
-        return artifacts
+        if fields is None and start is None and end is None:
+            body = ARTIFACTS.dump_json(
+                ARTIFACTS.validate_python(artifacts, from_attributes=True)
+            )
+        else:
+            # only the selected parts of transcripts are decoded and serialized.
+            slices = [
+                dtos.ArtifactSlice.model_validate(
+                    {
+                        "id": artifact.id,
+                        "created_at": artifact.created_at,
+                        "updated_at": artifact.updated_at,
+                        "job_id": artifact.job_id,
+                        "type": artifact.type,
+                        "data": artifact.select_data(fields, start, end),
+                    }
+                )
+                for artifact in artifacts
+            ]
+            body = ARTIFACT_SLICES.dump_json(slices)
+
+        if status in TERMINAL_STATUSES:
+            cached = CachedResponse.create(body)
+            cache.set(key, cached, len(body))
+            return cached.respond(if_none_match, cache_control(settings))
+
+        return Response(
+            body, media_type="application/json", headers={"Cache-Control": "no-cache"}
+        )
+
+    @api_router.get(
+        "/jobs/{id}/transcript.{format}",
+        dependencies=[Depends(sharing_auth)],
+        response_class=Response,
+        responses={
+            200: {"content": {media: {} for media in MEDIA_TYPES.values()}},
+            304: {"description": "The transcript did not change."},
+        },
+        summary="Export the transcript of one job",
+    )
+    async def export_transcript(
+        session: DatabaseSession,
+        cache: Annotated[LRUCache[bytes], Depends(get_export_cache)],
+        format: ExportFormat,
+        id: UUID = Path(),
+        if_none_match: Annotated[str | None, Header()] = None,
+    ) -> Response:
+        """
+        Returns the transcript of a transcript or translation job as SubRip
+        subtitles, WebVTT subtitles or plain text.
+        Responses carry an `ETag` that changes with the transcript, use it
+        with `If-None-Match` to skip unchanged downloads.
+        """
+        artifact = await session.scalar(
+            select(models.Artifact).where(
+                models.Artifact.job_id == str(id),
+                models.Artifact.type == models.ArtifactType.raw_transcript,
+            )
+        )
+
+        if not artifact or artifact.payload is None:
+            raise HTTPException(status_code=404)
+
+        # renders of identical transcripts are identical.
+        digest = hashlib.blake2b(artifact.payload, digest_size=16)  # type: ignore
+        etag = f'"{digest.hexdigest()}-{format.value}"'
+        headers = {"ETag": etag}
+
+        if if_none_match and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        body = cache.get(etag)
+
+        if body is None:
+            segments = artifact.select_data(EXPORT_FIELDS)
+            body = "".join(render(segments, format)).encode()
+            cache.set(etag, body, len(body))
+
+        return Response(body, media_type=MEDIA_TYPES[format], headers=headers)
 
     @api_router.delete(
         "/jobs/{id}",
@@ -94,13 +405,28 @@ def app_factory():
         status_code=204,
         summary="Delete a job with all artifacts",
     )
-    def delete_transcript(
+    async def delete_transcript(
         session: DatabaseSession,
+        cache: ResponseCache,
+        publisher: Annotated[EventPublisher, Depends(get_event_publisher)],
         id: UUID = Path(),
     ) -> None:
         """Remove metadata and artifacts for a single job."""
-        session.query(models.Job).filter(models.Job.id == str(id)).delete()
-        session.commit()
+        status = await session.scalar(
+            select(models.Job.status).where(models.Job.id == str(id))
+        )
+
+        await session.execute(delete(models.Job).where(models.Job.id == str(id)))
+        await session.commit()
+
+        cache.delete_if(lambda key: key[1] == id)  # type: ignore
+
+        # other web processes drop their cached responses of the job.
+        if status:
+            await run_in_threadpool(
+                publisher.publish, JobEvent(id=id, status=status, deleted=True)
+            )
+
         return None
 
     class PostJobPayload(BaseModel):
@@ -125,6 +451,33 @@ def app_factory():
             ),
         )
 
+        model: models.WhisperModel | None = Field(
+            default=None,
+            description=(
+                "Whisper model used to process the job. Smaller models are faster, "
+                "larger models are more accurate. Defaults to the worker's model."
+            ),
+        )
+
+    def job_from_payload(payload: PostJobPayload) -> models.Job:
+        """Create a job with status "create", to be saved to the database."""
+        config = {}
+
+        if payload.language:
+            config["language"] = payload.language
+
+        if payload.model:
+            config["model"] = payload.model.value
+
+        # the job's task is published by the outbox dispatcher.
+        return models.Job(
+            url=str(payload.url),
+            status=dtos.JobStatus.create,
+            type=payload.type,
+            config=config or None,
+            publish_after=utcnow(),
+        )
+
     @api_router.post(
         "/jobs",
         dependencies=[Depends(api_key_auth)],
@@ -132,10 +485,10 @@ def app_factory():
         status_code=201,
         summary="Enqueue a new job",
     )
-    def create_job(
+    async def create_job(
         payload: PostJobPayload,
         session: DatabaseSession,
-        task_queue: Annotated[TaskQueue, Depends(get_task_queue)],
+        outbox: Annotated[OutboxDispatcher, Depends(get_outbox_dispatcher)],
     ) -> models.Job:
         """
         Enqueue a new whisper job for processing.
@@ -150,21 +503,64 @@ def app_factory():
         * Once a job is created, you can query its status by its id.
         """
 
-        # create a job with status "create" and save it to the database.
-        job = models.Job(
-            url=str(payload.url),
-            status=dtos.JobStatus.create,
-            type=payload.type,
-            config={"language": payload.language} if payload.language else None,
-        )
+        job = job_from_payload(payload)
 
         session.add(job)
-        session.commit()
+        await session.commit()
+        # load server defaults.
+        await session.refresh(job)
 
-        task_queue.queue_task(job)
+        outbox.notify()
 
         return job
 
+    @api_router.post(
+        "/jobs/batch",
+        dependencies=[Depends(api_key_auth)],
+        response_model=dtos.JobBatch,
+        status_code=201,
+        summary="Enqueue many new jobs",
+    )
+    async def create_jobs(
+        payloads: Annotated[
+            list[Any],
+            Body(max_length=BATCH_MAX_JOBS, description="Payloads of `POST /jobs`."),
+        ],
+        session: DatabaseSession,
+        outbox: Annotated[OutboxDispatcher, Depends(get_outbox_dispatcher)],
+    ) -> dtos.JobBatch:
+        """
+        Enqueue up to 10,000 jobs at once, see `POST /jobs`.
+        Invalid payloads do not fail the batch, they are skipped and returned
+        in `errors` with their index. `jobs` contains the created jobs in
+        order of their payloads.
+        """
+        jobs = []
+        errors = []
+
+        for index, item in enumerate(payloads):
+            try:
+                payload = PostJobPayload.model_validate(item)
+            except ValidationError as e:
+                errors.append(
+                    dtos.JobBatchError(
+                        index=index,
+                        errors=jsonable_encoder(e.errors(include_url=False)),
+                    )
+                )
+            else:
+                jobs.append(job_from_payload(payload))
+
+        # one transaction, server defaults are returned by the insert.
+        session.add_all(jobs)
+        await session.commit()
+
+        outbox.notify()
+
+        return dtos.JobBatch(
+            jobs=[dtos.Job.model_validate(job) for job in jobs], errors=errors
+        )
+
     app.include_router(api_router)
 
     return app
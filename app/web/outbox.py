@@ -0,0 +1,144 @@
+"""
+Transactional outbox for the tasks of new jobs.
+
+Jobs are created with `publish_after` set, in the same transaction as the
+job itself. A dispatcher publishes their tasks and clears `publish_after`
+once the broker confirmed them. Tasks that were not confirmed are
+re-published, so a job is not stuck in `create` when the broker fails.
+"""
+import threading
+from datetime import timedelta
+
+from sqlalchemy import Row, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.shared.db.models as models
+from app.shared.db.models import utcnow
+from app.shared.logger import logger
+from app.web.task_queue import TaskQueue
+
+
+class OutboxDispatcher:
+    """
+    Publishes the tasks of pending jobs in a background thread, in batches
+    over a single pooled producer. Every web process runs a dispatcher,
+    dispatchers claim the jobs they publish, so a task is not published by
+    two processes at once.
+    """
+
+    def __init__(
+        self,
+        task_queue: TaskQueue,
+        session_local: sessionmaker[Session],
+        batch_size: int,
+        poll_interval: float,
+        retry_interval: float,
+    ) -> None:
+        self.task_queue = task_queue
+        self.session_local = session_local
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.lock = threading.Lock()
+        self.thread: threading.Thread | None = None
+        self.stopped = threading.Event()
+        # set when new jobs were committed.
+        self.pending = threading.Event()
+
+    def notify(self) -> None:
+        """Publish pending jobs now, instead of with the next poll."""
+        self.start()
+        self.pending.set()
+
+    def start(self) -> None:
+        """Start dispatching, if not started yet."""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name="outbox", daemon=True
+                )
+                self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.pending.set()
+
+        if self.thread:
+            self.thread.join()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            self.pending.clear()
+
+            try:
+                # full batches are followed by another one right away.
+                while self.dispatch() == self.batch_size:
+                    pass
+            except Exception as e:
+                logger.warn(f"outbox dispatcher failed: {e}")
+
+            self.pending.wait(self.poll_interval)
+
+    def claim(self, session: Session) -> list[Row]:
+        """
+        Claim a batch of jobs that are due, returns the `id` and `config` of
+        each job. Claimed jobs are due again after `retry_interval`, unless
+        their task is confirmed until then.
+        """
+        now = utcnow()
+
+        due = (
+            select(models.Job.id)
+            .where(models.Job.publish_after <= now)
+            .order_by(models.Job.publish_after)
+            .limit(self.batch_size)
+        )
+
+        # the condition is checked again, jobs claimed in between are skipped.
+        # columns instead of jobs, those would be expired by the commit.
+        jobs = session.execute(
+            update(models.Job)
+            .where(
+                models.Job.id.in_(due.scalar_subquery()),
+                models.Job.publish_after <= now,
+            )
+            .values(publish_after=now + timedelta(seconds=self.retry_interval))
+            .returning(models.Job.id, models.Job.config),
+            execution_options={"synchronize_session": False},
+        ).all()
+
+        session.commit()
+
+        return list(jobs)
+
+    def dispatch(self) -> int:
+        """Publish one batch of jobs, returns the number of confirmed tasks."""
+        with self.session_local() as session:
+            jobs = self.claim(session)
+
+            if not jobs:
+                return 0
+
+            published: list[str] = []
+
+            try:
+                with self.task_queue.producer() as producer:
+                    for job in jobs:
+                        self.task_queue.queue_task(job, producer)
+                        published.append(str(job.id))
+            except Exception as e:
+                logger.warn(
+                    f"failed to publish {len(jobs) - len(published)} tasks, "
+                    f"retrying in {self.retry_interval}s: {e}"
+                )
+            finally:
+                if published:
+                    session.execute(
+                        update(models.Job)
+                        .where(models.Job.id.in_(published))
+                        .values(publish_after=None),
+                        execution_options={"synchronize_session": False},
+                    )
+                    session.commit()
+
+            return len(published)
@@ -0,0 +1,32 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import ColumnElement, tuple_
+
+import app.shared.db.models as models
+
+
+def encode_cursor(created_at: datetime, id: str) -> str:
+    """Opaque cursor that points after the job `id` in the job list."""
+    value = json.dumps([created_at.isoformat(), str(id)])
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def after_cursor(cursor: str) -> ColumnElement[bool]:
+    """Filter for jobs that are listed after `cursor`, newest first."""
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor))
+        key = (datetime.fromisoformat(created_at), str(id))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    return tuple_(models.Job.created_at, models.Job.id) < key
+
+
+def to_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
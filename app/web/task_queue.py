@@ -1,7 +1,11 @@
+from typing import ContextManager
+
 from celery import Celery
+from kombu import Producer
+from sqlalchemy import Row
 
 import app.shared.db.models as models
-from app.shared.celery import get_celery_binding
+from app.shared.celery import get_celery_binding, model_queue
 
 
 class TaskQueue:
@@ -10,11 +14,26 @@ class TaskQueue:
     def __init__(self, broker_url: str) -> None:
         self.celery = get_celery_binding(broker_url=broker_url)
 
-    def queue_task(self, job: models.Job):
+    def producer(self) -> ContextManager[Producer]:
+        """A producer from the connection pool, to publish many tasks with."""
+        return self.celery.producer_or_acquire()
+
+    def queue_task(self, job: models.Job | Row, producer: Producer | None = None):
         """
-        Queues an async transcription job. We use a celery signature here to
-        allow for full separation of worker processes and dependencies.
+        Queues an async transcription job, `job` needs an `id` and `config`.
+        We use a celery signature here to allow for full separation of worker
+        processes and dependencies.
+        Raises if the broker did not confirm the task, publishing is not
+        retried, see `outbox`.
         """
         transcribe = self.celery.signature("app.worker.main.transcribe")
-        # TODO: catch delivery errors?
-        transcribe.delay(job.id)
+
+        config = models.JobConfig(**job.config) if job.config else None
+
+        options = {"producer": producer, "retry": False}
+
+        if config and config.model:
+            # workers prefer queues of models they have loaded.
+            options["queue"] = model_queue(config.model.value)
+
+        transcribe.apply_async((job.id,), **options)
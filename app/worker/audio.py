@@ -0,0 +1,307 @@
+import bisect
+import hashlib
+import subprocess
+import threading
+
+import numpy as np
+import requests
+
+# whisper operates on 16kHz mono audio.
+SAMPLE_RATE = 16000
+
+# number of samples between mel spectrogram frames, whisper's `seek` unit.
+HOP_LENGTH = 160
+
+
+class AudioStreamError(Exception):
+    """Raised when ffmpeg could not decode a media stream."""
+
+
+def _decode_command(source: str, sample_rate: int) -> list[str]:
+    """ffmpeg command that decodes `source` to 16 bit mono PCM on stdout."""
+    # mirrors `whisper.audio.load_audio`.
+    return [
+        "ffmpeg",
+        "-nostdin",
+        "-threads",
+        "0",
+        "-i",
+        source,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(sample_rate),
+        "pipe:1",
+    ]
+
+
+def load_audio(filename: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode a media file to mono float32 PCM."""
+    try:
+        out = subprocess.run(
+            _decode_command(filename, sample_rate), capture_output=True, check=True
+        ).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode()}") from e
+
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def stream_audio(
+    url: str, sample_rate: int = SAMPLE_RATE, max_samples: int | None = None
+) -> tuple[np.ndarray, str | None]:
+    """
+    Download `url` and decode it to mono float32 PCM at the same time.
+    The HTTP response is piped into ffmpeg, so the compressed media file is
+    never written to disk and decoding starts with the first received bytes.
+
+    Returns the decoded audio and the sha256 of the media file. The hash is
+    `None` if decoding stopped after `max_samples` before the file was read.
+
+    Formats that are not streamable (e.g. mp4 files with a trailing `moov`
+    atom) raise an `AudioStreamError`.
+    """
+    cmd = _decode_command("pipe:0", sample_rate)
+
+    sha256 = hashlib.sha256()
+    stderr = bytearray()
+
+    with requests.get(url, stream=True) as r:
+        r.raise_for_status()
+
+        process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+
+        # these streams are always set when created with `subprocess.PIPE`.
+        assert process.stdin and process.stdout and process.stderr
+
+        complete = threading.Event()
+        errors: list[Exception] = []
+
+        def feed():
+            try:
+                for chunk in r.iter_content(chunk_size=64 * 1024):
+                    sha256.update(chunk)
+                    process.stdin.write(chunk)  # type: ignore
+                complete.set()
+            except BrokenPipeError:
+                # ffmpeg exited before the download finished.
+                ...
+            except Exception as e:
+                errors.append(e)
+            finally:
+                try:
+                    process.stdin.close()  # type: ignore
+                except BrokenPipeError:
+                    ...
+
+        def drain():
+            # keep ffmpeg from blocking on a full stderr pipe.
+            for line in process.stderr:  # type: ignore
+                stderr.extend(line)
+                del stderr[:-4096]
+
+        threads = [threading.Thread(target=feed), threading.Thread(target=drain)]
+
+        for thread in threads:
+            thread.start()
+
+        truncated = False
+
+        if max_samples is not None:
+            pcm = process.stdout.read(max_samples * 2)
+            truncated = len(pcm) == max_samples * 2
+            if truncated:
+                process.kill()
+        else:
+            pcm = process.stdout.read()
+
+        returncode = process.wait()
+
+        # stop downloading if ffmpeg exited early.
+        r.close()
+
+        for thread in threads:
+            thread.join()
+
+    if not truncated:
+        if errors:
+            raise errors[0]
+        if returncode != 0:
+            raise AudioStreamError(
+                f"Failed to load audio: {stderr.decode(errors='ignore')}"
+            )
+
+    audio = np.frombuffer(pcm, np.int16).flatten().astype(np.float32) / 32768.0
+
+    return audio, sha256.hexdigest() if complete.is_set() else None
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    chunk_samples: int,
+    search_samples: int | None = None,
+    frame_samples: int = SAMPLE_RATE * 30 // 1000,
+) -> list[tuple[int, int]]:
+    """
+    Split `audio` into `(start, end)` sample ranges of at most `chunk_samples`.
+    Each cut is placed at the quietest frame within `search_samples` (default:
+    a tenth of a chunk) before the chunk boundary, so that words are not split.
+    """
+    search_samples = search_samples or chunk_samples // 10
+
+    bounds = [0]
+
+    while len(audio) - bounds[-1] > chunk_samples:
+        target = bounds[-1] + chunk_samples
+        window_start = max(bounds[-1] + 1, target - search_samples)
+        window = audio[window_start:target]
+
+        frames = len(window) // frame_samples
+
+        if frames == 0:
+            bounds.append(target)
+            continue
+
+        energy = np.square(window[: frames * frame_samples]).reshape(frames, -1)
+        quietest = int(np.argmin(energy.mean(axis=1)))
+
+        bounds.append(window_start + quietest * frame_samples + frame_samples // 2)
+
+    bounds.append(len(audio))
+
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def merge_segments(chunks: list[tuple[int, list[dict]]]) -> list[dict]:
+    """
+    Merge whisper segments of audio chunks into one transcript.
+    `chunks` are `(offset, segments)` pairs, where `offset` is the first sample
+    of the chunk. Timestamps and seeks are shifted and ids renumbered.
+    """
+    merged: list[dict] = []
+
+    for offset, segments in chunks:
+        seconds = offset / SAMPLE_RATE
+
+        for segment in segments:
+            merged.append(
+                {
+                    **segment,
+                    "id": len(merged),
+                    "seek": segment["seek"] + offset // HOP_LENGTH,
+                    "start": segment["start"] + seconds,
+                    "end": segment["end"] + seconds,
+                }
+            )
+
+    return merged
+
+
+def detect_speech(
+    audio: np.ndarray,
+    threshold_db: float = -45,
+    min_threshold_db: float = -70,
+    frame_samples: int = SAMPLE_RATE * 30 // 1000,
+    min_silence_samples: int = SAMPLE_RATE // 2,
+    min_speech_samples: int = SAMPLE_RATE // 4,
+    padding_samples: int = SAMPLE_RATE // 5,
+) -> list[tuple[int, int]]:
+    """
+    Find `(start, end)` sample ranges of `audio` that likely contain speech.
+
+    This is an energy based detector: frames louder than `threshold_db` dBFS
+    count as speech. For quiet recordings, the threshold is lowered to 10dB
+    above the noise floor, but not below `min_threshold_db`, so faint noise
+    over digital silence is not taken for speech. Gaps shorter than
+    `min_silence_samples` are bridged and regions are padded, so that soft
+    word onsets and endings are kept.
+    """
+    frames = len(audio) // frame_samples
+
+    if frames == 0:
+        return []
+
+    energy = np.square(audio[: frames * frame_samples]).reshape(frames, -1).mean(axis=1)
+    db = 10 * np.log10(energy + 1e-10)
+
+    noise_floor = np.percentile(db, 10)
+    speech = db > max(min(threshold_db, noise_floor + 10), min_threshold_db)
+
+    # frame indices where runs of speech frames start and end.
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], speech.astype(np.int8), [0]])))
+
+    runs: list[list[int]] = []
+
+    for start, end in edges.reshape(-1, 2) * frame_samples:
+        if runs and start - runs[-1][1] < min_silence_samples:
+            runs[-1][1] = int(end)
+        else:
+            runs.append([int(start), int(end)])
+
+    regions: list[tuple[int, int]] = []
+
+    for start, end in runs:
+        if end - start < min_speech_samples:
+            continue
+
+        start = max(0, start - padding_samples)
+        end = min(len(audio), end + padding_samples)
+
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+
+    return regions
+
+
+def remap_segments(segments: list[dict], regions: list[tuple[int, int]]) -> list[dict]:
+    """
+    Map whisper segments of audio that was concatenated from `regions` back
+    onto the timeline of the original audio.
+    """
+    offsets = _region_offsets(regions)
+
+    def to_original(sample: float, is_end: bool = False) -> float:
+        return _remap(sample, regions, offsets, is_end)
+
+    return [
+        {
+            **segment,
+            "seek": int(to_original(segment["seek"] * HOP_LENGTH)) // HOP_LENGTH,
+            "start": to_original(segment["start"] * SAMPLE_RATE) / SAMPLE_RATE,
+            "end": to_original(segment["end"] * SAMPLE_RATE, is_end=True) / SAMPLE_RATE,
+        }
+        for segment in segments
+    ]
+
+
+def remap_sample(sample: int, regions: list[tuple[int, int]]) -> int:
+    """
+    Map the end position `sample` in audio that was concatenated from `regions`
+    onto the timeline of the original audio.
+    """
+    return int(_remap(sample, regions, _region_offsets(regions), is_end=True))
+
+
+def _region_offsets(regions: list[tuple[int, int]]) -> list[int]:
+    """Start of each region within the concatenated audio."""
+    offsets = [0]
+    for start, end in regions:
+        offsets.append(offsets[-1] + end - start)
+    return offsets
+
+
+def _remap(
+    sample: float, regions: list[tuple[int, int]], offsets: list[int], is_end: bool
+) -> float:
+    # ends of regions map to the end of the region, not the start of the next.
+    find = bisect.bisect_left if is_end else bisect.bisect_right
+    i = min(max(find(offsets, sample) - 1, 0), len(regions) - 1)
+    return regions[i][0] + sample - offsets[i]
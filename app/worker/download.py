@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Mapping
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.shared.logger import logger
+
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class IncompletePart(requests.RequestException):
+    """A range response did not contain the requested bytes."""
+
+
+class Downloader:
+    """
+    Downloads media files over a pooled HTTP session.
+
+    The first request asks for the first part of the file. If the server
+    answers with a partial response, the remaining parts are fetched in parallel
+    and written into place. Otherwise the response is streamed as a whole.
+    """
+
+    def __init__(
+        self,
+        connections: int = 4,
+        part_size: int = 16 * 1024**2,
+        retries: int = 3,
+    ) -> None:
+        self.connections = connections
+        self.part_size = part_size
+        self.retries = retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def download(
+        self, url: str, filename: str, headers: Mapping[str, str] | None = None
+    ) -> Mapping[str, str] | None:
+        """
+        Download `url` to `filename` and return the response headers.
+        `headers` are sent with the first request. If they make it conditional
+        and the server answers with 304, nothing is written and `None` is returned.
+        """
+        r = self.session.get(
+            url,
+            headers={**(headers or {}), "Range": f"bytes=0-{self.part_size - 1}"},
+            stream=True,
+        )
+
+        with r:
+            if r.status_code == 304:
+                return None
+
+            # empty files can not satisfy any range.
+            if r.status_code == 416:
+                return self._download_whole(url, filename, headers)
+
+            r.raise_for_status()
+
+            if r.status_code != 206:
+                # ranges are not supported, stream the full response.
+                self._stream(r, filename)
+                return r.headers
+
+            match = CONTENT_RANGE.fullmatch(r.headers.get("Content-Range", ""))
+
+            if not match or int(match.group(1)) != 0:
+                # the size of the file is unknown, so parts can not be planned.
+                logger.debug(f"unexpected range response for {url}, retrying.")
+                return self._download_whole(url, filename, headers)
+
+            size = int(match.group(3))
+
+            with open(filename, "wb") as f:
+                f.truncate(size)
+                fd = f.fileno()
+
+                parts = [
+                    (start, min(start + self.part_size, size) - 1)
+                    for start in range(self.part_size, size, self.part_size)
+                ]
+
+                logger.debug(f"downloading {url} in {len(parts) + 1} parts.")
+
+                # RFC 7233: only accept range responses for an unchanged file.
+                if_range = r.headers.get("ETag") or r.headers.get("Last-Modified")
+
+                with ThreadPoolExecutor(max_workers=self.connections) as executor:
+                    futures = [
+                        executor.submit(self._fetch_part, url, fd, part, if_range)
+                        for part in parts
+                    ]
+
+                    # the first part is read from the probing response.
+                    first_part = (0, int(match.group(2)))
+                    try:
+                        self._write(r, fd, first_part)
+                    except requests.RequestException:
+                        self._fetch_part(url, fd, first_part, if_range)
+
+                    for future in futures:
+                        future.result()
+
+            return r.headers
+
+    def _download_whole(
+        self, url: str, filename: str, headers: Mapping[str, str] | None
+    ) -> Mapping[str, str] | None:
+        """Download `url` to `filename` with a single request without a range."""
+        with self.session.get(url, headers=headers, stream=True) as r:
+            if r.status_code == 304:
+                return None
+
+            r.raise_for_status()
+            self._stream(r, filename)
+            return r.headers
+
+    def _stream(self, r: requests.Response, filename: str) -> None:
+        with open(filename, "wb") as f:
+            for chunk in r.iter_content(chunk_size=64 * 1024):
+                f.write(chunk)
+
+    def _fetch_part(
+        self, url: str, fd: int, part: tuple[int, int], if_range: str | None
+    ) -> None:
+        """Fetch the byte range `part` into `fd`, retrying on errors."""
+        start, end = part
+
+        headers = {"Range": f"bytes={start}-{end}"}
+        if if_range:
+            headers["If-Range"] = if_range
+
+        for attempt in range(self.retries + 1):
+            try:
+                with self.session.get(url, headers=headers, stream=True) as r:
+                    r.raise_for_status()
+                    if r.status_code != 206:
+                        raise Exception(f"{url} changed while it was downloaded.")
+                    if r.headers.get("Content-Range", "").split("/")[0] != (
+                        f"bytes {start}-{end}"
+                    ):
+                        raise IncompletePart(f"{url} returned a different range.")
+                    self._write(r, fd, part)
+                    return
+            except requests.RequestException as e:
+                if attempt == self.retries:
+                    raise
+                logger.debug(f"retrying range {start}-{end} of {url}: {e}")
+
+    def _write(self, r: requests.Response, fd: int, part: tuple[int, int]) -> None:
+        """Write the body of `r` to the byte range `part` of `fd`."""
+        start, end = part
+        offset = start
+
+        for chunk in r.iter_content(chunk_size=64 * 1024):
+            if offset + len(chunk) > end + 1:
+                raise IncompletePart(f"range {start}-{end} is longer than requested.")
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+
+        if offset != end + 1:
+            raise IncompletePart(
+                f"range {start}-{end} ended after {offset - start} bytes."
+            )
+
+
+def hash_file(filename: str) -> str:
+    """Return the sha256 of a file's content."""
+    sha256 = hashlib.sha256()
+
+    with open(filename, "rb") as f:
+        while chunk := f.read(1024**2):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
@@ -0,0 +1,136 @@
+"""
+Starts a celery worker with one pool process per share of the CPU.
+
+Each pool process pins itself to its own set of physical cores on start, with
+torch's thread pools sized to match, see `WORKER_CPU_SHARES`. Shares are cut
+along NUMA nodes, so a process does not access memory of another node if
+avoidable. All processes are forked from the same worker, so they share a
+preloaded model.
+
+Usage: python -m app.worker.launcher [celery worker arguments...]
+"""
+import glob
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from typing import NoReturn
+
+from app.shared.logger import logger
+from app.shared.settings import Settings
+
+# cores of a NUMA node, each core is the set of its logical cpus.
+Node = list[list[int]]
+
+# physical cores per worker if `WORKER_PROCESSES` is not set.
+DEFAULT_CORES_PER_PROCESS = 4
+
+
+def parse_cpu_list(value: str) -> list[int]:
+    """Parse a kernel cpu list like `0-3,8,10-11`."""
+    cpus: list[int] = []
+
+    for part in value.strip().split(","):
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        cpus.extend(range(int(start), int(end or start) + 1))
+
+    return cpus
+
+
+def cpu_topology(
+    sysfs: str = "/sys/devices/system", available: set[int] | None = None
+) -> list[Node]:
+    """
+    Physical cores of the `available` cpus, grouped by NUMA node. Defaults to
+    the cpus this process may run on. Falls back to one node with one core
+    per logical cpu if sysfs is unavailable.
+    """
+    if available is None:
+        available = os.sched_getaffinity(0)
+
+    node_of: dict[int, int] = {}
+    for path in glob.glob(os.path.join(sysfs, "node", "node*", "cpulist")):
+        node = int(re.findall(r"node(\d+)", path)[-1])
+        with open(path) as f:
+            for cpu in parse_cpu_list(f.read()):
+                node_of[cpu] = node
+
+    cores: dict[tuple[int, int, int], list[int]] = defaultdict(list)
+
+    for cpu in sorted(available):
+        topology = os.path.join(sysfs, "cpu", f"cpu{cpu}", "topology")
+        try:
+            with open(os.path.join(topology, "physical_package_id")) as f:
+                package = int(f.read())
+            with open(os.path.join(topology, "core_id")) as f:
+                core = int(f.read())
+        except OSError:
+            package, core = 0, cpu
+
+        cores[(node_of.get(cpu, 0), package, core)].append(cpu)
+
+    nodes: dict[int, Node] = defaultdict(list)
+    for (node, *_), cpus in sorted(cores.items()):
+        nodes[node].append(cpus)
+
+    return [nodes[node] for node in sorted(nodes)]
+
+
+def partition(topology: list[Node], processes: int) -> list[list[list[int]]]:
+    """
+    Split the cores of `topology` into `processes` shares of equal size.
+    Cores are assigned in node order, so a share only spans two nodes
+    if the share size does not divide the number of cores per node.
+    """
+    cores = [core for node in topology for core in node]
+    processes = max(1, min(processes, len(cores)))
+
+    size, remainder = divmod(len(cores), processes)
+    shares = []
+    start = 0
+
+    for i in range(processes):
+        end = start + size + (i < remainder)
+        shares.append(cores[start:end])
+        start = end
+
+    return shares
+
+
+def default_processes(topology: list[Node]) -> int:
+    cores = sum(len(node) for node in topology)
+    return max(len(topology), cores // DEFAULT_CORES_PER_PROCESS, 1)
+
+
+def launch(settings: Settings, celery_args: list[str]) -> NoReturn:
+    """Replace this process with a worker that has a pool process per share."""
+    topology = cpu_topology()
+    shares = partition(
+        topology, settings.WORKER_PROCESSES or default_processes(topology)
+    )
+
+    for i, share in enumerate(shares):
+        cpus = [cpu for core in share for cpu in core]
+        logger.info(f"pool process {i} runs on cpus {cpus}.")
+
+    os.execve(
+        sys.executable,
+        [
+            sys.executable,
+            "-m",
+            "celery",
+            "--app=app.worker.main.celery",
+            "worker",
+            "--pool=prefork",
+            f"--concurrency={len(shares)}",
+            *celery_args,
+        ],
+        {**os.environ, "WORKER_CPU_SHARES": json.dumps(shares)},
+    )
+
+
+if __name__ == "__main__":
+    launch(Settings(), sys.argv[1:])  # type: ignore
@@ -1,21 +1,57 @@
+import gc
+import os
+import time
+from pathlib import Path
 from typing import Any
 from uuid import UUID
 
-from celery import Task
-from sqlalchemy.orm import Session
+from celery import Task, signals
+from celery.exceptions import SoftTimeLimitExceeded, TimeLimitExceeded
+from celery.utils.log import current_process_index
+from celery.worker.control import control_command
+from kombu import Queue
+from sqlalchemy import ColumnElement, and_, false, or_
+from sqlalchemy.orm import Session, load_only
 
 import app.shared.db.models as models
-from app.shared.celery import get_celery_binding
+from app.shared.celery import get_celery_binding, model_queue
 from app.shared.db.base import make_engine, make_session_local
+from app.shared.events import (
+    EventPublisher,
+    publish_job_changes,
+    record_job_change,
+)
 from app.shared.logger import logger
 from app.shared.settings import Settings
-from app.worker.strategies.local import LocalStrategy
+from app.worker.strategies import get_strategy
+from app.worker.strategies.base import BaseStrategy
+from app.worker.transcript_writer import TranscriptWriter
 
 # TODO: refactor to be part of a Task instance.
 settings = Settings()  # type: ignore
 celery = get_celery_binding(settings.BROKER_URL)
 engine = make_engine(settings.DATABASE_URI)
 SessionLocal = make_session_local(engine)
+publish_job_changes(SessionLocal, EventPublisher(settings.BROKER_URL))
+
+# consumer priority of queues for models that are loaded by the worker.
+# brokers deliver to lower priority consumers only if higher ones are busy.
+LOADED_MODEL_PRIORITY = 10
+
+celery.conf.task_queues = [
+    Queue(celery.conf.task_default_queue),
+    *(
+        Queue(
+            model_queue(model),
+            consumer_arguments={
+                "x-priority": LOADED_MODEL_PRIORITY
+                if model == os.environ.get("WHISPER_MODEL")
+                else 0
+            },
+        )
+        for model in settings.WORKER_MODELS or [m.value for m in models.WhisperModel]
+    ),
+]
 
 
 class TranscribeTask(Task):
@@ -28,14 +64,331 @@ class TranscribeTask(Task):
 
     def __init__(self) -> None:
         super().__init__()
-        # currently only `LocalStrategy` is implemented.
-        self.strategy: LocalStrategy | None = None
+        self.strategy: BaseStrategy | None = None
+        # models the broker was told this worker has loaded.
+        self.advertised_models: set[str] = set()
 
     def __call__(self, *args: Any, **kwargs: Any) -> Any:
-        # load model into memory once when the first task is processed.
+        # load model into memory once when the first task is processed,
+        # unless it was preloaded by the parent process.
         if not self.strategy:
-            self.strategy = LocalStrategy()
-        return self.run(*args, **kwargs)
+            self.strategy = get_strategy(settings)
+            self.advertised_models = {self.strategy.model_name}
+        try:
+            return self.run(*args, **kwargs)
+        finally:
+            self.advertise_models()
+
+    def advertise_models(self) -> None:
+        """Raise the consumer priority of queues for models that are loaded."""
+        if not self.strategy or not self.request.hostname:
+            return
+
+        loaded = set(self.strategy.loaded_models())
+
+        for model in loaded ^ self.advertised_models:
+            self.app.control.broadcast(
+                "set_queue_priority",
+                arguments={
+                    "queue": model_queue(model),
+                    "priority": LOADED_MODEL_PRIORITY if model in loaded else 0,
+                },
+                destination=[self.request.hostname],
+            )
+
+        self.advertised_models = loaded
+
+
+@control_command(args=[("queue", str), ("priority", int)])
+def set_queue_priority(state: Any, queue: str, priority: int) -> dict[str, str]:
+    """Re-subscribe to a task queue with a different consumer priority."""
+    consumer = state.consumer
+    queues = consumer.app.amqp.queues
+
+    if queue not in queues:
+        return {"error": f"not consuming from {queue}"}
+
+    def resubscribe() -> None:
+        consumer.cancel_task_queue(queue)
+        queues[queue].consumer_arguments = {"x-priority": priority}
+        queues.select_add(queues[queue])
+        consumer.add_task_queue(queue)
+
+    consumer.call_soon(resubscribe)
+
+    return {"ok": f"consuming from {queue} with priority {priority}"}
+
+
+def same_config(job: models.Job, key: str) -> ColumnElement[bool]:
+    """Filter for jobs with the same value for config `key` as `job`."""
+    value = (job.config or {}).get(key)
+
+    if value:
+        return models.Job.config[key].as_string() == value
+
+    return models.Job.config[key].as_string().is_(None)
+
+
+def find_duplicate_job(
+    session: Session, job: models.Job, fingerprint: str, processed_with: str
+) -> models.Job | None:
+    """
+    Find a successful job that processed the same media with the same model
+    and settings, see `BaseStrategy.processing_key`.
+    """
+    # only the id of the duplicate is used.
+    query = (
+        session.query(models.Job)
+        .options(load_only(models.Job.id))
+        .filter(
+            models.Job.id != job.id,
+            models.Job.type == job.type,
+            models.Job.status == models.JobStatus.success,
+            models.Job.meta["fingerprint"].as_string() == fingerprint,
+            models.Job.meta["processed_with"].as_string() == processed_with,
+            same_config(job, "language"),
+        )
+    )
+
+    return query.order_by(models.Job.created_at.desc()).first()
+
+
+def reuse_duplicate_job(
+    session: Session, job: models.Job, fingerprint: str, processed_with: str
+) -> bool:
+    """Copy the artifacts of an identical, finished job to `job` if one exists."""
+    duplicate = find_duplicate_job(session, job, fingerprint, processed_with)
+
+    if not duplicate:
+        return False
+
+    logger.debug(f"[{job.id}]: reusing artifacts of job {duplicate.id}.")
+
+    session.add_all(copy_artifacts(session, duplicate, job))
+    job.meta = {**(job.meta or {}), "duplicate_of": str(duplicate.id)}
+
+    return True
+
+
+def copy_artifacts(
+    session: Session, source: models.Job, target: models.Job
+) -> list[models.Artifact]:
+    """Copy the artifacts of `source` to `target`, so they outlive its deletion."""
+    artifacts = session.query(models.Artifact).filter(
+        models.Artifact.job_id == str(source.id)
+    )
+
+    # copied encoded, the data is not decoded.
+    return [
+        models.Artifact(
+            job_id=str(target.id),
+            encoding=artifact.encoding,
+            payload=artifact.payload,
+            type=artifact.type,
+        )
+        for artifact in artifacts
+    ]
+
+
+def claim_job(
+    session: Session,
+    job: models.Job,
+    task_id: str | None,
+    meta: dict[str, Any],
+    batch_id: str | None = None,
+) -> bool:
+    """
+    Set `job` to processing by task `task_id`, unless another task does so.
+    The outbox might publish the task of a job twice, while retries and
+    redeliveries of a task keep its id. If `batch_id` is set, the job is
+    taken over from the batch of that leader.
+    """
+    count = (
+        session.query(models.Job)
+        .filter(
+            models.Job.id == job.id,
+            or_(
+                models.Job.status == models.JobStatus.create,
+                and_(
+                    models.Job.status == models.JobStatus.processing,
+                    models.Job.meta["task_id"].as_string() == str(task_id),
+                ),
+                and_(
+                    models.Job.status == models.JobStatus.processing,
+                    models.Job.meta["batch_id"].as_string() == str(batch_id),
+                )
+                if batch_id
+                else false(),
+            ),
+        )
+        .update(
+            {"status": models.JobStatus.processing, "meta": meta},
+            synchronize_session=False,
+        )
+    )
+
+    if not count:
+        session.rollback()
+        return False
+
+    session.refresh(job)
+    # the bulk update is not seen by the session's event hooks.
+    record_job_change(session, job)
+    session.commit()
+    return True
+
+
+def claim_language_detection_jobs(
+    session: Session, leader: models.Job
+) -> list[models.Job]:
+    """
+    Claim pending language detection jobs to be processed together with `leader`.
+    Waits up to `LANGUAGE_DETECTION_BATCH_WAIT` seconds for the batch to fill up.
+    Claimed jobs are set to processing, their own tasks will skip them.
+    """
+    # jobs claimed by a previous attempt of the leader that was lost.
+    claimed = (
+        session.query(models.Job)
+        .filter(
+            models.Job.status == models.JobStatus.processing,
+            models.Job.meta["batch_id"].as_string() == str(leader.id),
+        )
+        .all()
+    )
+
+    limit = settings.LANGUAGE_DETECTION_BATCH_SIZE - 1
+    deadline = time.monotonic() + settings.LANGUAGE_DETECTION_BATCH_WAIT
+
+    while len(claimed) < limit:
+        candidates = (
+            session.query(models.Job.id, models.Job.meta)
+            .filter(
+                models.Job.id != leader.id,
+                models.Job.type == models.JobType.language_detection,
+                models.Job.status == models.JobStatus.create,
+                # a batch is processed with a single model.
+                same_config(leader, "model"),
+            )
+            .order_by(models.Job.created_at)
+            .limit(limit - len(claimed))
+            .all()
+        )
+
+        for id, meta in candidates:
+            # another worker might have picked up the job in the meantime.
+            count = (
+                session.query(models.Job)
+                .filter(
+                    models.Job.id == id,
+                    models.Job.status == models.JobStatus.create,
+                )
+                .update(
+                    {
+                        "status": models.JobStatus.processing,
+                        "meta": {
+                            **(meta or {}),
+                            "batch_id": str(leader.id),
+                            "attempts": 1,
+                        },
+                    },
+                    synchronize_session=False,
+                )
+            )
+
+            if count:
+                job = session.query(models.Job).filter_by(id=id).one()
+                # the bulk update is not seen by the session's event hooks.
+                record_job_change(session, job)
+                claimed.append(job)
+
+            session.commit()
+
+        if time.monotonic() >= deadline:
+            break
+
+        time.sleep(0.5)
+
+    return claimed
+
+
+def detect_language_batch(
+    strategy: BaseStrategy, session: Session, leader: models.Job
+) -> None:
+    """
+    Detect the language of `leader` and other pending language detection jobs
+    with a single model invocation. Errors of other jobs are stored on
+    the respective job, while errors of `leader` are raised.
+    """
+    jobs = [leader, *claim_language_detection_jobs(session, leader)]
+
+    logger.debug(f"[{leader.id}]: detecting language for {len(jobs)} jobs.")
+
+    errors: dict[str, Exception] = {}
+    pending: list[models.Job] = []
+
+    try:
+        for job in jobs:
+            try:
+                fingerprint = strategy.fingerprint(job)
+                processed_with = strategy.processing_key(job)
+                job.meta = {
+                    **(job.meta or {}),
+                    "fingerprint": fingerprint,
+                    "processed_with": processed_with,
+                }
+                if not (
+                    fingerprint
+                    and reuse_duplicate_job(session, job, fingerprint, processed_with)
+                ):
+                    pending.append(job)
+            except Exception as e:
+                errors[str(job.id)] = e
+
+        results = strategy.detect_language_batch(pending)
+
+        for job, result in zip(pending, results):
+            if isinstance(result, Exception):
+                errors[str(job.id)] = result
+                continue
+
+            result_type, data = result
+            session.add(
+                models.Artifact(job_id=str(job.id), data=data, type=result_type)
+            )
+
+            # streamed media is fingerprinted while processing.
+            meta = job.meta or {}
+            fingerprint = meta.get("fingerprint") or strategy.fingerprint(job)
+            job.meta = {**meta, "fingerprint": fingerprint}
+
+        for job in jobs:
+            if str(job.id) not in errors:
+                job.status = models.JobStatus.success
+            elif job is not leader:
+                # errors of the leader are handled by its task.
+                job.meta = {**(job.meta or {}), "error": str(errors[str(job.id)])}
+                job.status = models.JobStatus.error
+
+        session.commit()
+    finally:
+        for job in jobs[1:]:
+            strategy.cleanup(str(job.id))
+
+    if str(leader.id) in errors:
+        raise errors[str(leader.id)]
+
+
+def fail_batch(session: Session, leader: models.Job, error: Exception) -> None:
+    """Fail all jobs that were claimed by `leader` and are still processing."""
+    # update through the ORM, so an event is published for every member.
+    members = session.query(models.Job).filter(
+        models.Job.status == models.JobStatus.processing,
+        models.Job.meta["batch_id"].as_string() == str(leader.id),
+    )
+
+    for member in members:
+        member.status = models.JobStatus.error
+        member.meta = {"batch_id": str(leader.id), "error": str(error)}
 
 
 @celery.task(
@@ -50,6 +403,10 @@ class TranscribeTask(Task):
 def transcribe(self: TranscribeTask, job_id: UUID) -> None:
     session: Session | None = None
     job: models.Job | None = None
+    writer: TranscriptWriter | None = None
+    attempts = 0
+    # the files of a duplicate task belong to the task processing the job.
+    duplicate = False
 
     try:
         if not self.strategy:
@@ -74,6 +431,18 @@ def transcribe(self: TranscribeTask, job_id: UUID) -> None:
             logger.warn(f"[{job.id}]: job has already been processed, abort.")
             return
 
+        batch_id = (job.meta or {}).get("batch_id")
+
+        if job.status == models.JobStatus.processing and batch_id:
+            leader = session.get(models.Job, batch_id)
+
+            if leader and leader.status == models.JobStatus.processing:
+                logger.warn(f"[{job.id}]: job is processed in a batch, abort.")
+                return
+
+            # the leader finished or was deleted without processing the job.
+            logger.warn(f"[{job.id}]: batch {batch_id} is gone, taking over job.")
+
         logger.debug(f"[{job.id}]: start processing {job.type} job.")
 
         if job.meta is not None:
@@ -81,46 +450,205 @@ def transcribe(self: TranscribeTask, job_id: UUID) -> None:
         else:
             attempts = 1
 
+        # unit of work: set task status to processing.
+
+        meta = {"task_id": self.request.id, "attempts": attempts}
+
+        # resume from the checkpoint of a previous attempt.
+        if (job.meta or {}).get("seek"):
+            meta["seek"] = job.meta["seek"]
+
+        if not claim_job(session, job, self.request.id, meta, batch_id):
+            duplicate = True
+            logger.warn(f"[{job.id}]: job is processed by another task, abort.")
+            return
+
+        logger.debug(f"[{job.id}]: finished setting task to {job.status}.")
+
         # SAFEGUARD: celery's retry policies do not handle lost workers, retry once.
         # @see https://github.com/celery/celery/pull/6103
         if attempts > 2:
             raise Exception("Maximum number of retries exceeded for killed worker.")
 
-        # unit of work: set task status to processing.
+        if (
+            job.type == models.JobType.language_detection
+            and settings.LANGUAGE_DETECTION_BATCH_SIZE > 1
+        ):
+            # unit of work: process job in a batch with other pending jobs.
+            detect_language_batch(self.strategy, session, job)
+            logger.debug(f"[{job.id}]: successfully processed batch.")
+            return
 
-        job.meta = {"task_id": self.request.id, "attempts": attempts}
+        # unit of work: reuse artifacts of a finished job with identical media.
+        fingerprint = self.strategy.fingerprint(job)
+        processed_with = self.strategy.processing_key(job)
 
-        job.status = models.JobStatus.processing
-        session.commit()
+        if not (
+            fingerprint
+            and reuse_duplicate_job(session, job, fingerprint, processed_with)
+        ):
+            # unit of work: process job with whisper, storing segments on the way.
+            if job.type != models.JobType.language_detection:
+                writer = TranscriptWriter(
+                    session, job, settings.PARTIAL_RESULTS_INTERVAL
+                )
 
-        logger.debug(f"[{job.id}]: finished setting task to {job.status}.")
+            result_type, result = self.strategy.process(
+                job, writer.append if writer else None
+            )
+            logger.debug(f"[{job.id}]: successfully processed audio.")
 
-        # unit of work: process job with whisper.
-        result_type, result = self.strategy.process(job)
-        logger.debug(f"[{job.id}]: successfully processed audio.")
+            # streamed media is fingerprinted while processing.
+            fingerprint = fingerprint or self.strategy.fingerprint(job)
 
-        artifact = models.Artifact(job_id=str(job.id), data=result, type=result_type)
-        session.add(artifact)
+            if writer:
+                writer.finish(result)
+            else:
+                artifact = models.Artifact(
+                    job_id=str(job.id), data=result, type=result_type
+                )
+                session.add(artifact)
 
+        job.meta = {
+            **job.meta,
+            "fingerprint": fingerprint,
+            "processed_with": processed_with,
+        }
         job.status = models.JobStatus.success
         session.commit()
 
         logger.debug(f"[{job.id}]: successfully stored artifact.")
 
     except Exception as e:
+        # continue from the checkpoint in another attempt instead of failing.
+        if (
+            isinstance(e, SoftTimeLimitExceeded)
+            and job
+            and writer
+            and writer.seek
+            and attempts < 2
+        ):
+            writer.flush()
+            logger.warn(f"[{job.id}]: time limit exceeded, continuing at checkpoint.")
+            raise self.retry(exc=e, countdown=0)
+
         if job and session:
             if session.in_transaction():
                 session.rollback()
             if job.meta is not None:
-                job.meta = {**job.meta, "error": str(e)}
+                # the checkpoint is dropped together with the partial transcript.
+                meta = {k: v for k, v in job.meta.items() if k != "seek"}
+                job.meta = {**meta, "error": str(e)}
             else:
                 job.meta = {"error": str(e)}
 
+            # segments stored while processing are not a result of a failed job.
+            session.query(models.Artifact).filter(
+                models.Artifact.job_id == str(job.id)
+            ).delete(synchronize_session=False)
+
             job.status = models.JobStatus.error
+            fail_batch(session, job, e)
             session.commit()
         raise
     finally:
-        if self.strategy:
+        if self.strategy and not duplicate:
             self.strategy.cleanup(job_id)
         if session:
             session.close()
+
+
+@signals.task_failure.connect
+def resend_timed_out_task(
+    sender: Task | None = None,
+    task_id: str | None = None,
+    exception: BaseException | None = None,
+    args: Any = None,
+    kwargs: Any = None,
+    **_: Any,
+) -> None:
+    """
+    Send a task that exceeded its hard time limit again. Its process was killed,
+    so the job is still processing. Like a task of a lost worker, the job
+    continues at its checkpoint, until the attempts safeguard fails it.
+    """
+    if (
+        sender is None
+        or sender.name != transcribe.name
+        or not isinstance(exception, TimeLimitExceeded)
+    ):
+        return
+
+    logger.warn(f"[{task_id}]: hard time limit exceeded, sending task again.")
+    # a task with the same id takes over the job.
+    transcribe.apply_async(args=args, kwargs=kwargs, task_id=task_id)
+
+
+@signals.worker_init.connect
+def preload_strategy(**kwargs: Any) -> None:
+    """
+    Load the model in the worker's parent process, before the pool is forked.
+    Children inherit the loaded strategy and share its memory copy-on-write.
+    """
+    if not settings.WHISPER_PRELOAD:
+        return
+
+    # CUDA contexts and CTranslate2's thread pools do not survive a fork.
+    if settings.WHISPER_STRATEGY != "local":
+        logger.warn(f"preloading is not supported by {settings.WHISPER_STRATEGY}.")
+        return
+
+    import torch
+
+    if torch.cuda.is_available():
+        logger.warn("preloading is not supported on GPU.")
+        return
+
+    logger.debug("preloading model before forking workers.")
+    transcribe.strategy = get_strategy(settings)
+    transcribe.advertised_models = {transcribe.strategy.model_name}
+
+    # keep the garbage collector from writing to pages shared with children.
+    gc.freeze()
+
+
+@signals.worker_process_init.connect
+def configure_threads(**kwargs: Any) -> None:
+    """
+    Pin this pool process to the share of cores of its index, if any, and size
+    the thread pools to the share. A replaced process takes over the index,
+    and so the share, of the process it replaces.
+    """
+    if settings.WORKER_CPU_SHARES:
+        index = current_process_index(base=0) or 0
+        share = settings.WORKER_CPU_SHARES[index % len(settings.WORKER_CPU_SHARES)]
+        os.sched_setaffinity(0, [cpu for core in share for cpu in core])
+
+        # hyperthreads of a core share its execution units, count cores only.
+        settings.WORKER_THREADS = settings.WORKER_THREADS or len(share)
+
+    if not settings.WORKER_THREADS or settings.WHISPER_STRATEGY != "local":
+        return
+
+    import torch
+
+    torch.set_num_threads(settings.WORKER_THREADS)
+
+    try:
+        torch.set_num_interop_threads(settings.WORKER_THREADS)
+    except RuntimeError:
+        # can only be set before the first parallel work of the process,
+        # which is inherited from the parent if it preloaded the model.
+        logger.warn("failed to size the inter-op thread pool.")
+
+
+@signals.worker_ready.connect
+def mark_worker_ready(**kwargs: Any) -> None:
+    Path(settings.WORKER_READY_FILE).touch()
+    logger.info("worker is ready to process jobs.")
+
+
+@signals.worker_shutdown.connect
+def unmark_worker_ready(**kwargs: Any) -> None:
+    if os.path.exists(settings.WORKER_READY_FILE):
+        os.remove(settings.WORKER_READY_FILE)
@@ -0,0 +1,185 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from app.shared.logger import logger
+from app.worker.download import Downloader, hash_file
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Hold an exclusive advisory lock on `path`.
+    `flock` locks are shared between prefork children of the same host.
+    """
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class MediaCache:
+    """
+    Content-addressed on-disk cache for downloaded media files.
+
+    Layout of the cache directory:
+    * `blobs/<sha256>`: media content, addressed by its hash.
+    * `urls/<sha256(url)>.json`: url entry with blob hash and HTTP validators.
+    * `locks/<sha256(url)>.lock`: serializes downloads of the same url.
+    * `tmp/`: in-flight downloads, renamed into `blobs/` once complete.
+    * `.lock`: guards blob lookups, links and eviction.
+
+    Blobs are evicted in least-recently-used order once `max_bytes` is exceeded.
+    Callers receive a hard link to a blob, so eviction never removes a file
+    that is still in use by a job.
+    """
+
+    def __init__(
+        self, directory: str, max_bytes: int, downloader: Downloader | None = None
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.downloader = downloader or Downloader()
+
+        for folder in ["blobs", "urls", "locks", "tmp"]:
+            os.makedirs(os.path.join(directory, folder), exist_ok=True)
+
+    def fetch(self, url: str, destination: str) -> str:
+        """
+        Place the media file at `url` at `destination` and return its sha256.
+        The remote file is only downloaded if it is not cached or has changed.
+        """
+        key = hashlib.sha256(url.encode()).hexdigest()
+
+        with file_lock(os.path.join(self.directory, "locks", f"{key}.lock")):
+            entry = self._read_entry(key)
+
+            if entry and not os.path.exists(self._blob_path(entry["digest"])):
+                entry = None
+
+            digest = self._download(url, key, entry)
+
+            if digest is None and entry is not None:
+                logger.debug(f"media cache hit for {url}.")
+                digest = entry["digest"]
+
+            if not digest or not self._link(digest, destination):
+                # the blob was evicted between lookup and link, retry uncached.
+                digest = self._download(url, key, None)
+                if not digest or not self._link(digest, destination):
+                    raise Exception(f"failed to fetch {url} into media cache.")
+
+        self._evict()
+        return digest
+
+    def _download(self, url: str, key: str, entry: dict[str, Any] | None) -> str | None:
+        """
+        Download `url` into the blob store and return its sha256.
+        Returns `None` if `entry` is still valid according to the server.
+        """
+        headers: dict[str, str] = {}
+
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.directory, "tmp"))
+        os.close(fd)
+
+        try:
+            response_headers = self.downloader.download(url, tmp, headers)
+
+            if response_headers is None:
+                return None
+
+            digest = hash_file(tmp)
+
+            with self._global_lock():
+                blob = self._blob_path(digest)
+                if os.path.exists(blob):
+                    # identical content is already cached under another url.
+                    os.utime(blob)
+                else:
+                    os.replace(tmp, blob)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        self._write_entry(
+            key,
+            {
+                "url": url,
+                "digest": digest,
+                "etag": response_headers.get("ETag"),
+                "last_modified": response_headers.get("Last-Modified"),
+            },
+        )
+
+        return digest
+
+    def _link(self, digest: str, destination: str) -> bool:
+        with self._global_lock():
+            blob = self._blob_path(digest)
+
+            if not os.path.exists(blob):
+                return False
+
+            # mark blob as recently used.
+            os.utime(blob)
+
+            try:
+                os.link(blob, destination)
+            except OSError:
+                # hard links do not work across file systems.
+                shutil.copyfile(blob, destination)
+
+        return True
+
+    def _evict(self) -> None:
+        with self._global_lock():
+            blobs = []
+
+            with os.scandir(os.path.join(self.directory, "blobs")) as it:
+                for dir_entry in it:
+                    stat = dir_entry.stat()
+                    blobs.append((stat.st_mtime, stat.st_size, dir_entry.path))
+
+            total = sum(size for _, size, _ in blobs)
+
+            for _, size, path in sorted(blobs):
+                if total <= self.max_bytes:
+                    break
+                logger.debug(f"evicting {path} from media cache.")
+                os.remove(path)
+                total -= size
+
+    def _read_entry(self, key: str) -> dict[str, Any] | None:
+        try:
+            with open(self._entry_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, key: str, entry: dict[str, Any]) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.directory, "tmp"))
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, self._entry_path(key))
+
+    def _global_lock(self):
+        return file_lock(os.path.join(self.directory, ".lock"))
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, "urls", f"{key}.json")
@@ -0,0 +1,69 @@
+import gc
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar
+
+from app.shared.logger import logger
+
+T = TypeVar("T")
+
+
+class ModelRegistry(Generic[T]):
+    """
+    Keeps loaded models in memory and evicts the least recently used ones
+    when the estimated size of all loaded models exceeds `max_bytes`.
+    The most recently used model is always kept, regardless of its size.
+
+    `load` returns a model and its estimated size in memory, in bytes.
+    """
+
+    def __init__(self, load: Callable[[str], tuple[T, int]], max_bytes: int) -> None:
+        self.load = load
+        self.max_bytes = max_bytes
+
+        self.models: OrderedDict[str, T] = OrderedDict()
+        # sizes are remembered after eviction to make room before a reload.
+        self.sizes: dict[str, int] = {}
+
+    def get(self, name: str) -> T:
+        """Return model `name`, loading it if necessary."""
+        if name in self.models:
+            self.models.move_to_end(name)
+            return self.models[name]
+
+        # evict known models before loading, so the budget is not exceeded.
+        self._evict(self.sizes.get(name, 0))
+
+        logger.debug(f"loading model {name}.")
+
+        model, size = self.load(name)
+        self.models[name] = model
+        self.sizes[name] = size
+
+        self._evict(0)
+
+        return model
+
+    def names(self) -> list[str]:
+        """Names of the loaded models, least recently used first."""
+        return list(self.models)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.models
+
+    def _evict(self, reserve: int) -> None:
+        """Evict models until `reserve` more bytes fit into the budget."""
+        while self.models and self._used() + reserve > self.max_bytes:
+            # keep the model that was just loaded.
+            if not reserve and len(self.models) == 1:
+                break
+
+            name = next(iter(self.models))
+            del self.models[name]
+
+            logger.debug(f"evicted model {name}.")
+
+            # release the weights before a new model is allocated.
+            gc.collect()
+
+    def _used(self) -> int:
+        return sum(self.sizes[name] for name in self.models)
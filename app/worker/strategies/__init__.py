@@ -0,0 +1,15 @@
+from app.shared.settings import Settings
+from app.worker.strategies.base import BaseStrategy
+
+
+def get_strategy(settings: Settings) -> BaseStrategy:
+    """Instantiate the transcription strategy selected by `WHISPER_STRATEGY`."""
+    # strategies are imported lazily, their engines are optional dependencies.
+    if settings.WHISPER_STRATEGY == "ctranslate2":
+        from app.worker.strategies.ctranslate2 import CTranslate2Strategy
+
+        return CTranslate2Strategy(settings)
+
+    from app.worker.strategies.local import LocalStrategy
+
+    return LocalStrategy(settings)
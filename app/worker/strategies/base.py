@@ -1,15 +1,46 @@
+import json
 import os
 import tempfile
 from abc import ABC
-from typing import Any, Protocol, Tuple
+from typing import Any, Callable, Literal, Protocol, Tuple
 from uuid import UUID
 
-import requests
+import numpy as np
 
 import app.shared.db.models as models
+from app.shared.logger import logger
+from app.shared.settings import Settings
+from app.worker.audio import (
+    HOP_LENGTH,
+    SAMPLE_RATE,
+    AudioStreamError,
+    load_audio,
+    merge_segments,
+    stream_audio,
+)
+from app.worker.download import Downloader, hash_file
+from app.worker.media_cache import MediaCache
+from app.worker.model_registry import ModelRegistry
 
 TaskReturnValue = Tuple[models.ArtifactType, Any]
 
+# receives transcript segments while a job is processed, in order, and
+# the seek up to which the media has been transcribed, in whisper's frames.
+SegmentCallback = Callable[[list[dict[str, Any]], int], None]
+
+
+# settings that change the results of a job, part of its processing key.
+PROCESSING_SETTINGS = (
+    "WHISPER_STRATEGY",
+    "CTRANSLATE2_COMPUTE_TYPE",
+    "WHISPER_QUANTIZE",
+    "WHISPER_BATCH_SIZE",
+    "VAD_ENABLED",
+    "VAD_THRESHOLD_DB",
+    "LONG_AUDIO_MIN_DURATION",
+    "LONG_AUDIO_CHUNK_DURATION",
+)
+
 
 class TaskProtocol(Protocol):
     def __call__(self, job: models.Job) -> TaskReturnValue:
@@ -17,43 +48,205 @@ class TaskProtocol(Protocol):
 
 
 class BaseStrategy(ABC):
-    def process(self, job: models.Job) -> TaskReturnValue:
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+
+        self.downloader = Downloader(
+            connections=settings.DOWNLOAD_CONNECTIONS,
+            part_size=settings.DOWNLOAD_PART_SIZE,
+        )
+
+        self.media_cache: MediaCache | None = None
+
+        if settings.MEDIA_CACHE_MAX_BYTES > 0:
+            self.media_cache = MediaCache(
+                settings.MEDIA_CACHE_DIR,
+                settings.MEDIA_CACHE_MAX_BYTES,
+                self.downloader,
+            )
+
+        # sha256 of downloaded media files, keyed by job id.
+        self._fingerprints: dict[str, str] = {}
+
+        # models are loaded on demand, the selected model is used for processing.
+        self.models: ModelRegistry[Any] = ModelRegistry(
+            self._load_model, settings.MODEL_REGISTRY_MAX_BYTES
+        )
+        self.model_name = ""
+        self.model: Any = None
+
+    def process(
+        self, job: models.Job, on_segments: SegmentCallback | None = None
+    ) -> TaskReturnValue:
+        """
+        Process `job`. Transcripts and translations report segments to
+        `on_segments` as soon as they are available, if supported.
+        """
         if job.type == models.JobType.transcript:
-            return self.transcribe(job)
+            return self.transcribe(job, on_segments)
         elif job.type == models.JobType.translation:
-            return self.translate(job)
+            return self.translate(job, on_segments)
         else:
             return self.detect_language(job)
 
-    def cleanup(self, job_id: UUID) -> None:
+    def fingerprint(self, job) -> str | None:
+        """
+        Download the media file of `job` and return the sha256 of its content.
+        The download is kept around for processing until `cleanup` is called.
+        Streamed media is only fingerprinted once `process` has consumed it.
+        """
+        if not self.settings.STREAM_MEDIA:
+            self._download(job.url, job.id)
+        return self._fingerprints.get(str(job.id))
+
+    def processing_key(self, job) -> str:
+        """
+        The model and settings `job` is processed with. Jobs with identical
+        media and keys have identical results.
+        """
+        key = {name: getattr(self.settings, name) for name in PROCESSING_SETTINGS}
+        key["model"] = self._job_model_name(job)
+        return json.dumps(key, sort_keys=True, separators=(",", ":"))
+
+    def cleanup(self, job_id: UUID | str) -> None:
+        self._fingerprints.pop(str(job_id), None)
         try:
             os.remove(self._get_tmp_file(job_id))
         except OSError:
             ...
 
-    def transcribe(self, job: models.Job) -> TaskReturnValue:
+    def loaded_models(self) -> list[str]:
+        """Names of the models this strategy keeps in memory."""
+        return self.models.names()
+
+    def transcribe(
+        self, job: models.Job, on_segments: SegmentCallback | None = None
+    ) -> TaskReturnValue:
         raise NotImplementedError()
 
-    def translate(self, job: models.Job) -> TaskReturnValue:
+    def translate(
+        self, job: models.Job, on_segments: SegmentCallback | None = None
+    ) -> TaskReturnValue:
         raise NotImplementedError()
 
     def detect_language(self, job: models.Job) -> TaskReturnValue:
         raise NotImplementedError()
 
-    def _get_tmp_file(self, job_id: UUID) -> str:
+    def detect_language_batch(
+        self, jobs: list[models.Job]
+    ) -> list[TaskReturnValue | Exception]:
+        """
+        Detect the language of multiple jobs at once.
+        Returns a result or an exception for each job, in order.
+        """
+        results: list[TaskReturnValue | Exception] = []
+
+        for job in jobs:
+            try:
+                results.append(self.detect_language(job))
+            except Exception as e:
+                results.append(e)
+
+        return results
+
+    def _load_audio(self, job, max_samples: int | None = None) -> np.ndarray:
+        """
+        Load the media file of `job` as 16kHz mono audio.
+        If `STREAM_MEDIA` is enabled, media is decoded while it is downloaded.
+        Only the first `max_samples` are decoded if set.
+        """
+        if self.settings.STREAM_MEDIA:
+            try:
+                audio, fingerprint = stream_audio(job.url, SAMPLE_RATE, max_samples)
+                if fingerprint:
+                    self._fingerprints[str(job.id)] = fingerprint
+                return audio
+            except AudioStreamError as e:
+                logger.warning(
+                    f"[{job.id}]: failed to stream media, downloading instead. {e}"
+                )
+
+        return load_audio(self._download(job.url, job.id))
+
+    def _run_whisper(
+        self,
+        audio: np.ndarray,
+        task: Literal["translate", "transcribe"],
+        job,
+        on_segments: SegmentCallback | None = None,
+    ) -> list[dict[str, Any]]:
+        """Transcribe `audio` and return whisper's segments."""
+        raise NotImplementedError()
+
+    def _run_whisper_resumable(
+        self,
+        job,
+        task: Literal["translate", "transcribe"],
+        on_segments: SegmentCallback | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Transcribe the media of `job`, starting at the seek of a previous attempt
+        if there is one. Only segments after the seek are returned.
+        """
+        audio = self._load_audio(job)
+        offset = ((job.meta or {}).get("seek") or 0) * HOP_LENGTH
+
+        if offset:
+            logger.debug(f"[{job.id}]: resuming at {offset / SAMPLE_RATE:.1f}s.")
+
+        def on_resumed_segments(segments: list[dict[str, Any]], seek: int) -> None:
+            if on_segments:
+                on_segments(
+                    merge_segments([(offset, segments)]), seek + offset // HOP_LENGTH
+                )
+
+        segments = self._run_whisper(
+            audio[offset:], task, job, on_resumed_segments if on_segments else None
+        )
+
+        return merge_segments([(offset, segments)])
+
+    def _load_model(self, name: str) -> tuple[Any, int]:
+        """Load model `name` and return it with its estimated size in bytes."""
+        raise NotImplementedError()
+
+    def _select_model(self, name: str) -> None:
+        """Make model `name` the model used for processing."""
+        if name != self.model_name:
+            # drop the reference, so an evicted model can be freed.
+            self.model = None
+            self.model = self.models.get(name)
+            self.model_name = name
+
+    def _job_model_name(self, job) -> str:
+        """Model requested by `job`, defaults to the `WHISPER_MODEL` of the worker."""
+        config = models.JobConfig(**job.config) if job.config else None
+
+        if config and config.model:
+            return config.model.value
+
+        return os.environ["WHISPER_MODEL"]
+
+    def _get_tmp_file(self, job_id: UUID | str) -> str:
         tmp = tempfile.gettempdir()
         return os.path.join(tmp, str(job_id))
 
     def _download(self, url: str, job_id: UUID) -> str:
-        # re-create folder.
         filename = self._get_tmp_file(job_id)
+
+        # media was already downloaded while fingerprinting this job.
+        if str(job_id) in self._fingerprints and os.path.exists(filename):
+            return filename
+
+        # re-create folder.
         self.cleanup(job_id)
 
+        if self.media_cache:
+            self._fingerprints[str(job_id)] = self.media_cache.fetch(url, filename)
+            return filename
+
         # stream media to disk.
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status()
-            with open(filename, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
+        self.downloader.download(url, filename)
+        self._fingerprints[str(job_id)] = hash_file(filename)
 
         return filename
@@ -0,0 +1,289 @@
+from typing import Any, Callable, Literal
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES, SAMPLE_RATE
+from whisper.decoding import DecodingResult
+from whisper.tokenizer import Tokenizer, get_tokenizer
+
+# defaults of `whisper.transcribe`.
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def transcribe_sequential(
+    model: whisper.Whisper,
+    audio: np.ndarray,
+    task: Literal["translate", "transcribe"],
+    language: str | None,
+    on_segments: Callable[[list[dict[str, Any]], int], None],
+) -> list[dict[str, Any]]:
+    """
+    Transcribe `audio` like `whisper.transcribe` without conditioning on previous
+    text: one 30-second window at a time, each starting at the last timestamp
+    predicted in the previous one. The segments of each window are passed to
+    `on_segments` once it is decoded, together with the seek after it.
+    """
+    dtype = torch.float32 if model.device.type == "cpu" else torch.float16
+
+    # padded with 30 seconds of silence, like `whisper.transcribe`.
+    mel = whisper.log_mel_spectrogram(audio, padding=N_SAMPLES)
+    content_frames = mel.shape[-1] - N_FRAMES
+
+    language = _language(model, mel, language, dtype)
+    tokenizer = get_tokenizer(model.is_multilingual, language=language, task=task)
+    input_stride = N_FRAMES // model.dims.n_audio_ctx
+
+    seek = 0
+    segments: list[dict[str, Any]] = []
+
+    while seek < content_frames:
+        segment_size = min(N_FRAMES, content_frames - seek)
+        window = whisper.pad_or_trim(mel[:, seek : seek + N_FRAMES], N_FRAMES)
+        [result] = _decode_with_fallback(
+            model, window[None].to(model.device, dtype), task, language, dtype
+        )
+
+        window_segments = []
+
+        if _should_skip(result):
+            seek += segment_size
+        else:
+            window_segments = _window_segments(
+                model, tokenizer, result, seek, content_frames
+            )
+            seek += _window_advance(tokenizer, result, segment_size, input_stride)
+
+        segments.extend(window_segments)
+        on_segments(window_segments, min(seek, content_frames))
+
+    for id, segment in enumerate(segments):
+        segment["id"] = id
+
+    return segments
+
+
+def transcribe_batched(
+    model: whisper.Whisper,
+    audio: np.ndarray,
+    task: Literal["translate", "transcribe"],
+    language: str | None,
+    batch_size: int,
+    on_segments: Callable[[list[dict[str, Any]], int], None] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Transcribe `audio` by decoding `batch_size` 30-second windows per forward pass.
+
+    `whisper.transcribe` decodes one window at a time and starts the next window
+    at the last timestamp predicted. Since we do not condition on previous text,
+    windows are independent and can be decoded in parallel if they are cut at
+    fixed 30 second offsets instead. Segments follow the `whisper.transcribe`
+    output format. The segments of each batch are passed to `on_segments` once
+    it is decoded, together with the seek at the end of its last window.
+    """
+    dtype = torch.float32 if model.device.type == "cpu" else torch.float16
+
+    mel = whisper.log_mel_spectrogram(audio)
+    content_frames = mel.shape[-1]
+
+    language = _language(model, mel, language, dtype)
+    tokenizer = get_tokenizer(model.is_multilingual, language=language, task=task)
+
+    seeks = list(range(0, content_frames, N_FRAMES))
+    segments: list[dict[str, Any]] = []
+
+    for i in range(0, len(seeks), batch_size):
+        batch_seeks = seeks[i : i + batch_size]
+
+        mels = torch.stack(
+            [
+                whisper.pad_or_trim(mel[:, seek : seek + N_FRAMES], N_FRAMES)
+                for seek in batch_seeks
+            ]
+        ).to(model.device, dtype)
+
+        results = _decode_with_fallback(model, mels, task, language, dtype)
+        batch_segments = []
+
+        for seek, result in zip(batch_seeks, results):
+            if not _should_skip(result):
+                batch_segments.extend(
+                    _window_segments(model, tokenizer, result, seek, content_frames)
+                )
+
+        segments.extend(batch_segments)
+
+        if on_segments:
+            on_segments(batch_segments, min(batch_seeks[-1] + N_FRAMES, content_frames))
+
+    for id, segment in enumerate(segments):
+        segment["id"] = id
+
+    return segments
+
+
+def _language(
+    model: whisper.Whisper, mel: torch.Tensor, language: str | None, dtype: torch.dtype
+) -> str:
+    """Return `language`, or detect it from the first window of `mel`."""
+    if language is not None:
+        return language
+
+    if not model.is_multilingual:
+        return "en"
+
+    window = whisper.pad_or_trim(mel, N_FRAMES).to(model.device).to(dtype)
+    _, probs = model.detect_language(window)
+    return max(probs, key=probs.get)
+
+
+def _should_skip(result: DecodingResult) -> bool:
+    """Whether `whisper.transcribe` skips a window as silent."""
+    return (
+        result.no_speech_prob > NO_SPEECH_THRESHOLD
+        and result.avg_logprob <= LOGPROB_THRESHOLD
+    )
+
+
+def _decode_with_fallback(
+    model: whisper.Whisper,
+    mels: torch.Tensor,
+    task: str,
+    language: str,
+    dtype: torch.dtype,
+) -> list[DecodingResult]:
+    """
+    Decode a batch of windows. Windows that fail the quality thresholds
+    of `whisper.transcribe` are decoded again at the next temperature,
+    unless they are likely silent.
+    """
+    results: list[DecodingResult] = [None] * len(mels)  # type: ignore
+    pending = list(range(len(mels)))
+
+    for temperature in TEMPERATURES:
+        options = whisper.DecodingOptions(
+            task=task,
+            language=language,
+            temperature=temperature,
+            fp16=dtype == torch.float16,
+        )
+
+        decoded = model.decode(mels[pending], options)
+
+        retry = []
+
+        for index, result in zip(pending, decoded):
+            results[index] = result
+            needs_fallback = (
+                result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+                or result.avg_logprob < LOGPROB_THRESHOLD
+            )
+
+            # silence, like `whisper.transcribe` does not decode it again.
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD:
+                needs_fallback = False
+
+            if needs_fallback:
+                retry.append(index)
+
+        if not retry:
+            break
+
+        pending = retry
+
+    return results
+
+
+def _window_segments(
+    model: whisper.Whisper,
+    tokenizer: Tokenizer,
+    result: DecodingResult,
+    seek: int,
+    content_frames: int,
+) -> list[dict[str, Any]]:
+    """Split the tokens of one decoded window into timestamped segments."""
+    time_offset = seek * HOP_LENGTH / SAMPLE_RATE
+    segment_duration = min(N_FRAMES, content_frames - seek) * HOP_LENGTH / SAMPLE_RATE
+    time_precision = N_FRAMES // model.dims.n_audio_ctx * HOP_LENGTH / SAMPLE_RATE
+
+    tokens = result.tokens
+    timestamp_begin = tokenizer.timestamp_begin
+    is_timestamp = [token >= timestamp_begin for token in tokens]
+
+    def segment(start: float, end: float, tokens: list[int]) -> dict[str, Any]:
+        text_tokens = [token for token in tokens if token < tokenizer.eot]
+        text = tokenizer.decode(text_tokens)
+
+        # mirrors `whisper.transcribe`, which clears empty segments.
+        if start == end or not text.strip():
+            text, tokens = "", []
+
+        return {
+            "seek": seek,
+            "start": start,
+            "end": end,
+            "text": text,
+            "tokens": tokens,
+            "temperature": result.temperature,
+            "avg_logprob": result.avg_logprob,
+            "compression_ratio": result.compression_ratio,
+            "no_speech_prob": result.no_speech_prob,
+        }
+
+    # consecutive timestamp tokens delimit segments.
+    slices = [
+        i + 1 for i in range(len(tokens) - 1) if is_timestamp[i] and is_timestamp[i + 1]
+    ]
+
+    if slices:
+        if is_timestamp[-2:] == [False, True]:
+            slices.append(len(tokens))
+
+        segments = []
+        last_slice = 0
+
+        for current_slice in slices:
+            sliced_tokens = tokens[last_slice:current_slice]
+            start = (sliced_tokens[0] - timestamp_begin) * time_precision
+            end = (sliced_tokens[-1] - timestamp_begin) * time_precision
+            segments.append(
+                segment(time_offset + start, time_offset + end, sliced_tokens)
+            )
+            last_slice = current_slice
+
+        return segments
+
+    duration = segment_duration
+    timestamps = [token for token in tokens if token >= timestamp_begin]
+
+    if timestamps and timestamps[-1] != timestamp_begin:
+        duration = (timestamps[-1] - timestamp_begin) * time_precision
+
+    return [segment(time_offset, time_offset + duration, tokens)]
+
+
+def _window_advance(
+    tokenizer: Tokenizer, result: DecodingResult, segment_size: int, input_stride: int
+) -> int:
+    """
+    The number of frames `whisper.transcribe` seeks forward after a window.
+    The next window starts at the last timestamp that ends a segment, so speech
+    after it is decoded again with more context.
+    """
+    tokens = result.tokens
+    is_timestamp = [token >= tokenizer.timestamp_begin for token in tokens]
+    slices = [
+        i + 1 for i in range(len(tokens) - 1) if is_timestamp[i] and is_timestamp[i + 1]
+    ]
+
+    # a single timestamp at the end means there is no speech after it.
+    if not slices or is_timestamp[-2:] == [False, True]:
+        return segment_size
+
+    advance = (tokens[slices[-1] - 1] - tokenizer.timestamp_begin) * input_stride
+
+    # unlike `whisper.transcribe`, never decode the same window forever.
+    return advance or segment_size
@@ -0,0 +1,162 @@
+import os
+from typing import Any, Literal
+
+import numpy as np
+from faster_whisper import WhisperModel, download_model
+from faster_whisper.transcribe import get_ctranslate2_storage
+
+import app.shared.db.models as models
+from app.shared.logger import logger
+from app.shared.settings import Settings
+from app.worker.audio import HOP_LENGTH, SAMPLE_RATE
+from app.worker.strategies.base import (
+    BaseStrategy,
+    SegmentCallback,
+    TaskReturnValue,
+)
+
+
+class CTranslate2Strategy(BaseStrategy):
+    """
+    Runs whisper with the CTranslate2 inference engine via `faster-whisper`.
+    On CPU, this uses int8 weights by default, which is several times faster
+    than the reference PyTorch implementation used by `LocalStrategy`.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        super().__init__(settings)
+
+        # load the default model eagerly, so the first job does not wait for it.
+        self._select_model(os.environ["WHISPER_MODEL"])
+
+        logger.debug("initialized CTranslate2 strategy.")
+
+    def _load_model(self, name: str) -> tuple[WhisperModel, int]:
+        logger.debug("initializing CTranslate2 model.")
+
+        path = download_model(name, cache_dir="/models")
+
+        model = WhisperModel(
+            path,
+            device="cpu",
+            compute_type=self.settings.CTRANSLATE2_COMPUTE_TYPE,
+            cpu_threads=self.settings.WORKER_THREADS,
+        )
+
+        # the size of the stored weights is an upper bound for int8 weights.
+        return model, os.path.getsize(os.path.join(path, "model.bin"))
+
+    def transcribe(self, job, on_segments=None) -> TaskReturnValue:
+        self._select_model(self._job_model_name(job))
+        result = self._run_whisper_resumable(job, "transcribe", on_segments)
+        return (models.ArtifactType.raw_transcript, result)
+
+    def translate(self, job, on_segments=None) -> TaskReturnValue:
+        self._select_model(self._job_model_name(job))
+        result = self._run_whisper_resumable(job, "translate", on_segments)
+        return (models.ArtifactType.raw_transcript, result)
+
+    def detect_language(self, job) -> TaskReturnValue:
+        result = self.detect_language_batch([job])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def detect_language_batch(self, jobs) -> list[TaskReturnValue | Exception]:
+        results: list[TaskReturnValue | Exception] = []
+        features = []
+
+        # batched jobs are claimed for the model of the first job.
+        if jobs:
+            self._select_model(self._job_model_name(jobs[0]))
+
+        for job in jobs:
+            try:
+                audio = self._load_audio(job, max_samples=30 * SAMPLE_RATE)
+                features.append(self._language_detection_features(audio))
+                results.append((models.ArtifactType.language_detection, None))
+            except Exception as e:
+                results.append(e)
+
+        if not features:
+            return results
+
+        # runs the encoder and language token decoding once for the whole batch.
+        encoder_output = self._encode_batch(np.stack(features))
+        batch_probs = iter(self.model.model.detect_language(encoder_output))
+
+        for i, result in enumerate(results):
+            if not isinstance(result, Exception):
+                # tokens are sorted by probability and formatted as `<|en|>`.
+                token, _ = next(batch_probs)[0]
+                results[i] = (result[0], {"code": token[2:-2]})
+
+        return results
+
+    def _encode_batch(self, features: np.ndarray):
+        """
+        Encode a batch of mel features. `WhisperModel.encode` adds a batch
+        dimension to a single item, so batches go to the CTranslate2 model.
+        """
+        # mirrors `WhisperModel.encode`, outputs are moved off of multiple GPUs.
+        ct2_model = self.model.model
+        to_cpu = ct2_model.device == "cuda" and len(ct2_model.device_index) > 1
+
+        return ct2_model.encode(get_ctranslate2_storage(features), to_cpu=to_cpu)
+
+    def _language_detection_features(self, audio: np.ndarray) -> np.ndarray:
+        """Mel features of the first 30 seconds of `audio`, padded if shorter."""
+        n_frames = self.model.feature_extractor.nb_max_frames
+        features = self.model.feature_extractor(audio)[:, :n_frames]
+        return np.pad(features, [(0, 0), (0, n_frames - features.shape[-1])])
+
+    def _run_whisper(
+        self,
+        audio: np.ndarray,
+        task: Literal["translate", "transcribe"],
+        job,
+        on_segments: SegmentCallback | None = None,
+    ) -> list[dict[str, Any]]:
+        language = models.JobConfig(**job.config).language if job.config else None
+
+        segments, info = self.model.transcribe(
+            audio,
+            task=task,
+            language=language,
+            # mirrors the greedy decoding of `LocalStrategy`.
+            beam_size=1,
+            # turning this off might make the transcription less accurate,
+            # but significantly reduces amount of model halucinations.
+            condition_on_previous_text=False,
+            vad_filter=self.settings.VAD_ENABLED,
+        )
+
+        result: list[dict[str, Any]] = []
+
+        # segments are generated lazily while decoding.
+        for segment in segments:
+            result.append(
+                {
+                    "id": len(result),
+                    "seek": segment.seek,
+                    "start": segment.start,
+                    "end": segment.end,
+                    "text": segment.text,
+                    "tokens": segment.tokens,
+                    "temperature": segment.temperature,
+                    "avg_logprob": segment.avg_logprob,
+                    "compression_ratio": segment.compression_ratio,
+                    "no_speech_prob": segment.no_speech_prob,
+                }
+            )
+
+            if on_segments:
+                on_segments(result[-1:], round(segment.end * SAMPLE_RATE) // HOP_LENGTH)
+
+        if self.settings.VAD_ENABLED and info.duration:
+            job.meta = {
+                **(job.meta or {}),
+                "speech_ratio": round(info.duration_after_vad / info.duration, 4),
+            }
+
+        return result
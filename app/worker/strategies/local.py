@@ -3,61 +3,63 @@ from asyncio.log import logger
 from typing import Any, Literal
 from uuid import UUID
 
+import numpy as np
 import torch
 import whisper
-from pydantic import BaseModel
 
 import app.shared.db.models as models
-from app.worker.strategies.base import BaseStrategy, TaskReturnValue
+from app.shared.settings import Settings
+from app.worker.audio import HOP_LENGTH, detect_speech, remap_sample, remap_segments
+from app.worker.strategies.base import (
+    BaseStrategy,
+    SegmentCallback,
+    TaskReturnValue,
+)
+from app.worker.strategies.parallel import cpu_budget, transcribe_parallel
+from app.worker.strategies.preload import load_mmap_model
+from app.worker.strategies.quantization import load_quantized_model
+from app.worker.strategies.transcription import transcribe_audio
 
 
-class DecodingOptions(BaseModel):
-    """
-    Options passed to the whipser model.
-    This mirrors private type `whisper.DecodingOptions`.
-    """
+class LocalStrategy(BaseStrategy):
+    def __init__(self, settings: Settings) -> None:
+        super().__init__(settings)
 
-    language: str | None = None
-    task: Literal["translate", "transcribe"]
+        # load the default model eagerly, so the first job does not wait for it.
+        self._select_model(os.environ["WHISPER_MODEL"])
 
+        logger.debug("initialized local strategy.")
 
-class LocalStrategy(BaseStrategy):
-    def __init__(self) -> None:
+    def _load_model(self, name: str) -> tuple[whisper.Whisper, int]:
         if torch.cuda.is_available():
             logger.debug("initializing GPU model.")
-            self.model = whisper.load_model(
-                os.environ["WHISPER_MODEL"], download_root="/models"
-            ).cuda()
+            model = whisper.load_model(name, download_root="/models").cuda()
+        elif self.settings.WHISPER_QUANTIZE:
+            logger.debug("initializing quantized CPU model.")
+            model = load_quantized_model(name)
+        elif self.settings.WHISPER_PRELOAD:
+            logger.debug("initializing memory-mapped CPU model.")
+            model = load_mmap_model(name)
         else:
             logger.debug("initializing CPU model.")
-            self.model = whisper.load_model(
-                os.environ["WHISPER_MODEL"], download_root="/models"
-            )
+            model = whisper.load_model(name, download_root="/models")
 
-        logger.debug("initialized local strategy.")
+        return model, _model_size(model)
 
-    def transcribe(self, job):
-        result = self._run_whisper(
-            self._download(job.url, job.id), "transcribe", job.config, job.id
-        )
+    def transcribe(self, job, on_segments=None):
+        self._select_model(self._job_model_name(job))
+        result = self._run_whisper_resumable(job, "transcribe", on_segments)
 
         return (models.ArtifactType.raw_transcript, result)
 
-    def translate(self, job) -> TaskReturnValue:
-        result = self._run_whisper(
-            self._download(job.url, job.id),
-            "translate",
-            job.config,
-            job.id,
-        )
+    def translate(self, job, on_segments=None) -> TaskReturnValue:
+        self._select_model(self._job_model_name(job))
+        result = self._run_whisper_resumable(job, "translate", on_segments)
         return (models.ArtifactType.raw_transcript, result)
 
     def detect_language(self, job) -> TaskReturnValue:
-        file = self._download(job.url, job.id)
-
-        # see: https://github.com/openai/whisper/blob/248b6cb124225dd263bb9bd32d060b6517e067f8/README.md?plain=1#L114
-        audio = whisper.pad_or_trim(whisper.load_audio(file))
-        mel = whisper.log_mel_spectrogram(audio).to(self.model.device)
+        self._select_model(self._job_model_name(job))
+        mel = self._load_language_detection_mel(job).to(self.model.device)
         _, probs = self.model.detect_language(mel)
 
         return (
@@ -65,22 +67,162 @@ class LocalStrategy(BaseStrategy):
             {"code": max(probs, key=probs.get)},
         )
 
+    def detect_language_batch(self, jobs) -> list[TaskReturnValue | Exception]:
+        results: list[TaskReturnValue | Exception] = []
+        mels = []
+
+        # batched jobs are claimed for the model of the first job.
+        if jobs:
+            self._select_model(self._job_model_name(jobs[0]))
+
+        for job in jobs:
+            try:
+                mels.append(self._load_language_detection_mel(job))
+                results.append((models.ArtifactType.language_detection, None))
+            except Exception as e:
+                results.append(e)
+
+        if not mels:
+            return results
+
+        # runs the encoder and language token decoding once for the whole batch.
+        _, batch_probs = self.model.detect_language(
+            torch.stack(mels).to(self.model.device)
+        )
+
+        probs = iter(batch_probs)
+
+        for i, result in enumerate(results):
+            if not isinstance(result, Exception):
+                p = next(probs)
+                results[i] = (result[0], {"code": max(p, key=p.get)})
+
+        return results
+
+    def _load_language_detection_mel(self, job) -> torch.Tensor:
+        """Load the mel spectrogram of the first 30 seconds of a job's media."""
+        # see: https://github.com/openai/whisper/blob/248b6cb124225dd263bb9bd32d060b6517e067f8/README.md?plain=1#L114
+        audio = whisper.pad_or_trim(
+            self._load_audio(job, max_samples=whisper.audio.N_SAMPLES)
+        )
+        return whisper.log_mel_spectrogram(audio)
+
     def _run_whisper(
         self,
-        filepath: str,
+        audio: np.ndarray,
+        task: Literal["translate", "transcribe"],
+        job,
+        on_segments: SegmentCallback | None = None,
+    ) -> list[Any]:
+        language = models.JobConfig(**job.config).language if job.config else None
+
+        if not self.settings.VAD_ENABLED:
+            return self._transcribe(audio, task, language, job.id, on_segments)
+
+        # only pass regions that contain speech to the model.
+        regions = detect_speech(audio, self.settings.VAD_THRESHOLD_DB)
+        speech_ratio = sum(end - start for start, end in regions) / max(len(audio), 1)
+
+        job.meta = {**(job.meta or {}), "speech_ratio": round(speech_ratio, 4)}
+        logger.debug(f"[{job.id}]: detected speech in {speech_ratio:.0%} of audio.")
+
+        if not regions:
+            return []
+
+        def on_speech_segments(segments: list[dict[str, Any]], seek: int) -> None:
+            if on_segments:
+                on_segments(
+                    remap_segments(segments, regions),
+                    remap_sample(seek * HOP_LENGTH, regions) // HOP_LENGTH,
+                )
+
+        segments = self._transcribe(
+            np.concatenate([audio[start:end] for start, end in regions]),
+            task,
+            language,
+            job.id,
+            on_speech_segments if on_segments else None,
+        )
+
+        return remap_segments(segments, regions)
+
+    def _transcribe(
+        self,
+        audio: np.ndarray,
+        task: Literal["translate", "transcribe"],
+        language: str | None,
+        job_id: UUID,
+        on_segments: SegmentCallback | None,
+    ) -> list[Any]:
+        duration = len(audio) / whisper.audio.SAMPLE_RATE
+
+        if (
+            self.settings.LONG_AUDIO_MIN_DURATION
+            and duration >= self.settings.LONG_AUDIO_MIN_DURATION
+            and self.model.device.type == "cpu"
+        ):
+            return self._run_whisper_parallel(
+                audio, task, language, job_id, on_segments
+            )
+
+        return transcribe_audio(
+            self.model,
+            audio,
+            task,
+            language,
+            self.settings.WHISPER_BATCH_SIZE,
+            on_segments,
+        )
+
+    def _run_whisper_parallel(
+        self,
+        audio: np.ndarray,
         task: Literal["translate", "transcribe"],
-        config: dict[str, Any],
+        language: str | None,
         job_id: UUID,
+        on_segments: SegmentCallback | None,
     ) -> list[Any]:
-        result = self.model.transcribe(
-            filepath,
-            # turning this off might make the transcription less accurate,
-            # but significantly reduces amount of model halucinations.
-            condition_on_previous_text=False,
-            **DecodingOptions(
-                task=task,
-                language=models.JobConfig(**config).language if config else None,
-            ).dict(),
+        """Transcribe long audio in chunks, several chunks at once."""
+        workers = self.settings.LONG_AUDIO_PROCESSES or max(1, cpu_budget() // 2)
+
+        # chunks would otherwise detect their language independently.
+        language = language or self._detect_language_code(audio)
+
+        chunk_samples = min(
+            self.settings.LONG_AUDIO_CHUNK_DURATION * whisper.audio.SAMPLE_RATE,
+            -(-len(audio) // workers),
         )
 
-        return result["segments"]
+        logger.debug(f"[{job_id}]: transcribing long audio in {workers} threads.")
+
+        return transcribe_parallel(
+            self.model,
+            audio,
+            task,
+            language,
+            workers,
+            chunk_samples,
+            self.settings.WHISPER_BATCH_SIZE,
+            on_segments,
+        )
+
+    def _detect_language_code(self, audio: np.ndarray) -> str | None:
+        """Detect the language of the first 30 seconds of `audio`."""
+        if not self.model.is_multilingual:
+            return None
+
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio))
+        _, probs = self.model.detect_language(mel.to(self.model.device))
+        return max(probs, key=probs.get)
+
+
+def _model_size(model: whisper.Whisper) -> int:
+    """Estimated memory used by the weights of `model`, in bytes."""
+    tensors = [*model.parameters(), *model.buffers()]
+
+    # dynamically quantized layers keep their int8 weights outside of parameters.
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            tensors.append(module.weight())
+
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
@@ -0,0 +1,92 @@
+import copy
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Literal
+
+import numpy as np
+import torch
+import whisper
+
+from app.worker.audio import HOP_LENGTH, merge_segments, split_on_silence
+from app.worker.strategies.transcription import transcribe_audio
+
+
+def cpu_budget() -> int:
+    """Number of cores this process is allowed to run on."""
+    return len(os.sched_getaffinity(0))
+
+
+def replicate(model: whisper.Whisper, count: int) -> list[whisper.Whisper]:
+    """
+    Copies of `model` that share its weights. Whisper installs its kv-cache
+    hooks on the modules it decodes with, so concurrent decodes need their
+    own modules, but not their own weights.
+    """
+    shared: dict[int, Any] = {
+        id(tensor): tensor for tensor in [*model.parameters(), *model.buffers()]
+    }
+
+    # dynamically quantized layers keep their int8 weights outside of parameters.
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            shared[id(module._packed_params)] = module._packed_params
+
+    return [copy.deepcopy(model, dict(shared)) for _ in range(count)]
+
+
+def transcribe_parallel(
+    model: whisper.Whisper,
+    audio: np.ndarray,
+    task: Literal["translate", "transcribe"],
+    language: str | None,
+    workers: int,
+    chunk_samples: int,
+    batch_size: int = 1,
+    on_segments: Callable[[list[dict[str, Any]], int], None] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Split `audio` at silence and transcribe up to `workers` chunks at once,
+    in threads of this process. Each thread decodes with its own replica of
+    `model`. Torch's intra-op thread count is set once for the process, to an
+    equal share of the available cores per thread. Chunks are not transcribed
+    in child processes, celery's prefork pool runs tasks in daemonic processes,
+    which can not have children. Segments of finished chunks are passed to
+    `on_segments` in order, together with the seek at the end of the chunk.
+    """
+    chunks = split_on_silence(audio, chunk_samples)
+    workers = min(workers, len(chunks))
+    threads = max(1, cpu_budget() // workers)
+
+    replicas = replicate(model, workers)
+    local = threading.local()
+
+    def transcribe_chunk(start: int, end: int) -> list[dict[str, Any]]:
+        if not hasattr(local, "model"):
+            local.model = replicas.pop()
+
+        return transcribe_audio(
+            local.model, audio[start:end], task, language, batch_size
+        )
+
+    # the thread count is shared by the process, threads of the pool pick it up
+    # with their first operation. it is restored once all chunks are done.
+    previous_threads = torch.get_num_threads()
+    torch.set_num_threads(threads)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(transcribe_chunk, start, end) for start, end in chunks
+            ]
+
+            results = []
+
+            for (start, end), future in zip(chunks, futures):
+                results.append((start, future.result()))
+                if on_segments:
+                    on_segments(merge_segments(results[-1:]), end // HOP_LENGTH)
+
+            return merge_segments(results)
+    finally:
+        torch.set_num_threads(previous_threads)
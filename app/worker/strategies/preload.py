@@ -0,0 +1,56 @@
+import os
+
+import torch
+import whisper
+from whisper.model import ModelDimensions, Whisper
+
+from app.shared.logger import logger
+
+
+def load_mmap_model(name: str, download_root: str = "/models") -> Whisper:
+    """
+    Load model `name` on the CPU with its weights memory-mapped from disk.
+
+    Released checkpoints store fp16 weights, which are converted to fp32 when
+    loaded on the CPU. The converted weights are cached in `download_root` once,
+    so they can be mapped directly. Mapped weights live in the page cache and
+    are shared by all processes that load the same model, including forked
+    children, which never write to them.
+    """
+    path = os.path.join(download_root, f"{name}.fp32.pt")
+
+    if not os.path.exists(path):
+        logger.debug(f"converting model {name} to fp32.")
+
+        model = whisper.load_model(name, device="cpu", download_root=download_root)
+
+        # write atomically, other worker processes might load the file.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(
+            {"dims": model.dims.__dict__, "model_state_dict": model.state_dict()},
+            tmp_path,
+        )
+        os.replace(tmp_path, path)
+
+        del model
+
+    _read_file(path)
+
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+
+    model = Whisper(ModelDimensions(**checkpoint["dims"]))
+    # `assign` keeps the mapped tensors instead of copying them into the model.
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+
+    # alignment heads are not part of the state dict.
+    if name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+
+    return model.eval()
+
+
+def _read_file(path: str) -> None:
+    """Read a file once, so its pages are in the page cache before the first job."""
+    with open(path, "rb", buffering=0) as f:
+        while f.read(16 * 1024**2):
+            pass
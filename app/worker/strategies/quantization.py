@@ -0,0 +1,57 @@
+import os
+
+import torch
+import whisper
+from whisper.model import ModelDimensions, Whisper
+
+from app.shared.logger import logger
+
+
+def quantize_model(model: Whisper) -> Whisper:
+    """
+    Apply dynamic int8 quantization to the linear layers of a CPU model.
+    Weights are stored as int8, activations are quantized on the fly.
+    """
+    for module in model.modules():
+        # whisper's subclass only casts weights to the input dtype, which is a
+        # no-op in fp32. torch only quantizes exact `nn.Linear` instances.
+        if isinstance(module, whisper.model.Linear):
+            module.__class__ = torch.nn.Linear
+
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def load_quantized_model(name: str, download_root: str = "/models") -> Whisper:
+    """
+    Load an int8 version of model `name`. The quantized weights are cached in
+    `download_root`, so the fp32 checkpoint is only converted once.
+    """
+    path = os.path.join(download_root, f"{name}.int8.pt")
+
+    if os.path.exists(path):
+        checkpoint = torch.load(path, map_location="cpu")
+        # quantized layers have to exist before their weights can be loaded.
+        model = quantize_model(Whisper(ModelDimensions(**checkpoint["dims"])))
+        model.load_state_dict(checkpoint["model_state_dict"])
+    else:
+        logger.debug(f"quantizing model {name}.")
+
+        model = quantize_model(
+            whisper.load_model(name, device="cpu", download_root=download_root)
+        )
+
+        # write atomically, other worker processes might load the file.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(
+            {"dims": model.dims.__dict__, "model_state_dict": model.state_dict()},
+            tmp_path,
+        )
+        os.replace(tmp_path, path)
+
+    # alignment heads are not part of the state dict.
+    if name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+
+    return model.eval()
@@ -0,0 +1,49 @@
+from typing import Any, Callable, Literal
+
+import numpy as np
+import whisper
+from pydantic import BaseModel
+
+from app.worker.strategies.batched import transcribe_batched, transcribe_sequential
+
+
+class DecodingOptions(BaseModel):
+    """
+    Options passed to the whipser model.
+    This mirrors private type `whisper.DecodingOptions`.
+    """
+
+    language: str | None = None
+    task: Literal["translate", "transcribe"]
+
+
+def transcribe_audio(
+    model: whisper.Whisper,
+    audio: np.ndarray,
+    task: Literal["translate", "transcribe"],
+    language: str | None,
+    batch_size: int = 1,
+    on_segments: Callable[[list[dict[str, Any]], int], None] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Transcribe `audio` with `model` and return whisper's segments.
+    A `batch_size` of 1 uses whisper's sequential transcription loop.
+    The segments of each decoded window are passed to `on_segments`,
+    together with the seek after it.
+    """
+    if batch_size > 1:
+        return transcribe_batched(model, audio, task, language, batch_size, on_segments)
+
+    if on_segments:
+        # the same loop as below, but reports the segments of each window.
+        return transcribe_sequential(model, audio, task, language, on_segments)
+
+    result = model.transcribe(
+        audio,
+        # turning this off might make the transcription less accurate,
+        # but significantly reduces amount of model halucinations.
+        condition_on_previous_text=False,
+        **DecodingOptions(task=task, language=language).dict(),
+    )
+
+    return result["segments"]
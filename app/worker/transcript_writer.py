@@ -0,0 +1,115 @@
+import time
+from typing import Any
+
+from sqlalchemy import LargeBinary, cast, update
+from sqlalchemy.orm import Session
+
+import app.shared.db.models as models
+from app.shared.db.artifact_encoding import ArtifactEncoding, encode_chunk
+
+
+class TranscriptWriter:
+    """
+    Stores the segments of a running job in its transcript artifact as they
+    are transcribed, so they can be read before the job finishes.
+    Commits are throttled to one per `interval` seconds, the first batch of
+    segments is committed immediately.
+
+    Every commit checkpoints the seek up to which the media has been transcribed
+    in the job's meta. If the job has a checkpoint, the segments stored by the
+    previous attempt are kept and new segments are appended to them.
+
+    Until the job finishes, the artifact is stored `chunked`, a commit only
+    encodes and appends the segments that were added since the last one.
+    """
+
+    def __init__(self, session: Session, job: models.Job, interval: float) -> None:
+        self.session = session
+        self.job = job
+        self.interval = interval
+
+        # an artifact might be left over from a previous attempt.
+        artifact = (
+            session.query(models.Artifact)
+            .filter(
+                models.Artifact.job_id == str(job.id),
+                models.Artifact.type == models.ArtifactType.raw_transcript,
+            )
+            .one_or_none()
+        )
+
+        if artifact is None:
+            artifact = models.Artifact(
+                job_id=str(job.id), type=models.ArtifactType.raw_transcript
+            )
+            session.add(artifact)
+
+        self.seek: int | None = (job.meta or {}).get("seek")
+
+        if not self.seek or not isinstance(artifact.data, list):
+            self.seek = None
+            artifact.data = []
+
+        self.artifact = artifact
+        self.segments: list[dict[str, Any]] = list(artifact.data)
+        # segments that were stored by a previous attempt.
+        self.resumed = len(self.segments)
+        # segments that are stored in the artifact's payload.
+        self.stored = len(self.segments)
+        self.committed_at: float | None = None
+
+        if artifact.encoding != ArtifactEncoding.chunked:
+            artifact.encoding = ArtifactEncoding.chunked
+            artifact.payload = encode_chunk(self.segments) if self.segments else b""
+            session.flush()
+
+    def append(self, segments: list[dict[str, Any]], seek: int) -> None:
+        """
+        Add segments that follow the segments appended so far.
+        `seek` is the frame up to which the media has been transcribed.
+        """
+        for segment in segments:
+            self.segments.append({**segment, "id": len(self.segments)})
+
+        self.seek = seek
+
+        if (
+            self.committed_at is None
+            or time.monotonic() - self.committed_at >= self.interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit all appended segments and checkpoint the seek."""
+        if len(self.segments) > self.stored:
+            chunk = encode_chunk(self.segments[self.stored :])
+
+            # appended by the database, stored segments are not sent again.
+            self.session.execute(
+                update(models.Artifact)
+                .where(models.Artifact.id == self.artifact.id)
+                .values(
+                    payload=cast(models.Artifact.payload.concat(chunk), LargeBinary)
+                ),
+                execution_options={"synchronize_session": False},
+            )
+            self.stored = len(self.segments)
+
+        self.job.meta = {**(self.job.meta or {}), "seek": self.seek}
+        self.session.commit()
+        self.committed_at = time.monotonic()
+
+    def finish(self, segments: list[dict[str, Any]]) -> None:
+        """
+        Replace the appended segments with the final transcript, which is
+        encoded as a whole. `segments` excludes segments of a previous attempt.
+        """
+        self.segments = [
+            {**segment, "id": id}
+            for id, segment in enumerate([*self.segments[: self.resumed], *segments])
+        ]
+        self.artifact.data = self.segments
+
+        meta = {**(self.job.meta or {})}
+        meta.pop("seek", None)
+        self.job.meta = meta
@@ -0,0 +1,99 @@
+"""
+Compare job submission throughput of the batch endpoint to the single
+job endpoint.
+
+Submits N jobs to an empty SQLite database, once with one request per job
+from concurrent clients and once in batches, with the in-memory broker.
+
+Usage: python -m scripts.benchmark_batch [jobs] [concurrency] [batch_size]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import httpx
+
+import app.shared.db.models as models
+from app.shared.db.base import make_engine
+from app.shared.settings import Settings
+from app.web.injections.settings import get_settings
+from app.web.main import app_factory
+
+
+def payloads(count: int) -> list[dict[str, str]]:
+    return [
+        {"url": f"https://example.com/media/{i}.mp3", "type": "transcribe"}
+        for i in range(count)
+    ]
+
+
+async def submit_single(
+    client: httpx.AsyncClient, count: int, concurrency: int
+) -> None:
+    items = payloads(count)
+
+    async def worker(items: list[dict[str, str]]) -> None:
+        for item in items:
+            res = await client.post("/api/v1/jobs", json=item)
+            res.raise_for_status()
+
+    await asyncio.gather(*(worker(items[i::concurrency]) for i in range(concurrency)))
+
+
+async def submit_batch(client: httpx.AsyncClient, count: int, batch_size: int) -> None:
+    items = payloads(count)
+
+    for offset in range(0, count, batch_size):
+        res = await client.post(
+            "/api/v1/jobs/batch", json=items[offset : offset + batch_size]
+        )
+        res.raise_for_status()
+
+
+async def run(name: str, count: int, submit: Callable, arg: int) -> None:
+    """Submit `count` jobs to a new database with `submit`."""
+    path = os.path.join(tempfile.mkdtemp(), "whisperbox-benchmark.db")
+    database_uri = f"sqlite:///{path}"
+    models.Base.metadata.create_all(make_engine(database_uri))
+
+    settings = Settings(
+        API_SECRET="benchmark",
+        BROKER_URL="memory://",
+        DATABASE_URI=database_uri,
+        ENVIRONMENT="benchmark",
+    )
+
+    async def get_benchmark_settings() -> Settings:
+        return settings
+
+    app = app_factory()
+    app.dependency_overrides[get_settings] = get_benchmark_settings
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),  # type: ignore
+        base_url="http://benchmark",
+        headers={"Authorization": "Bearer benchmark"},
+        timeout=None,
+    ) as client:
+        start = time.perf_counter()
+        await submit(client, count, arg)
+        duration = time.perf_counter() - start
+
+    print(f"{name:<24}{duration:>10.2f}{count / duration:>10.0f}")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 5_000
+
+    print(f"{count} jobs\n")
+    print(f"{'':<24}{'seconds':>10}{'jobs/s':>10}")
+
+    asyncio.run(
+        run(f"single, {concurrency} clients", count, submit_single, concurrency)
+    )
+    asyncio.run(run(f"batches of {batch_size}", count, submit_batch, batch_size))
@@ -0,0 +1,44 @@
+"""
+Compare the real-time factor of whisper's sequential transcription loop
+with batched decoding of 30 second windows.
+
+Usage: python -m scripts.benchmark_batched <media_file> [model] [batch_sizes...]
+"""
+import sys
+import time
+
+import whisper
+
+from app.worker.strategies.batched import transcribe_batched
+
+if __name__ == "__main__":
+    filepath = sys.argv[1]
+    model_name = sys.argv[2] if len(sys.argv) > 2 else "tiny"
+    batch_sizes = [int(size) for size in sys.argv[3:]] or [2, 4, 8, 16]
+
+    model = whisper.load_model(model_name, download_root="/models")
+    audio = whisper.load_audio(filepath)
+    duration = len(audio) / whisper.audio.SAMPLE_RATE
+
+    # warm up, the first forward pass allocates buffers.
+    transcribe_batched(model, audio[: whisper.audio.N_SAMPLES], "transcribe", None, 1)
+
+    print(f"{model_name}, {duration:.0f}s of audio")
+    print(f"{'mode':<12}{'segments':>10}{'seconds':>10}{'rtf':>8}")
+
+    start = time.perf_counter()
+    result = model.transcribe(audio, condition_on_previous_text=False)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'sequential':<12}{len(result['segments']):>10}"
+        f"{elapsed:>10.1f}{elapsed / duration:>8.3f}"
+    )
+
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        segments = transcribe_batched(model, audio, "transcribe", None, batch_size)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{'batch=' + str(batch_size):<12}{len(segments):>10}"
+            f"{elapsed:>10.1f}{elapsed / duration:>8.3f}"
+        )
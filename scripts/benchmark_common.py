@@ -0,0 +1,79 @@
+"""
+Helpers shared by the benchmark scripts.
+
+A corpus is a directory of media files. Each file may have a reference
+transcript next to it, with the same name and a `.txt` extension.
+"""
+import os
+import re
+import resource
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.worker.audio import SAMPLE_RATE, load_audio
+
+
+@dataclass
+class Sample:
+    name: str
+    audio: np.ndarray
+    reference: str | None
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / SAMPLE_RATE
+
+
+def load_corpus(directory: str) -> list[Sample]:
+    """Load all media files of a corpus directory in alphabetical order."""
+    samples = []
+
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        stem, extension = os.path.splitext(path)
+
+        if extension == ".txt" or not os.path.isfile(path):
+            continue
+
+        reference = None
+        if os.path.exists(stem + ".txt"):
+            with open(stem + ".txt") as f:
+                reference = f.read()
+
+        samples.append(Sample(name, load_audio(path), reference))
+
+    return samples
+
+
+def normalize(text: str) -> list[str]:
+    """Lowercase words without punctuation."""
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level levenshtein distance divided by the length of `reference`."""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+
+    distances = list(range(len(hyp) + 1))
+
+    for i, ref_word in enumerate(ref, 1):
+        previous, distances[0] = distances[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, distances[j] = distances[j], min(
+                distances[j] + 1,
+                distances[j - 1] + 1,
+                previous + (ref_word != hyp_word),
+            )
+
+    return distances[-1] / max(len(ref), 1)
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    # linux reports the value in kilobytes.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def segments_text(segments: list[dict]) -> str:
+    return " ".join(segment["text"].strip() for segment in segments)
@@ -0,0 +1,84 @@
+"""
+Compare the fp32 model with its dynamically quantized int8 version.
+
+Reports the real-time factor, the peak RSS, the WER against reference
+transcripts where the corpus has them, and the drift, which is the WER
+of the int8 output against the fp32 output.
+
+Usage: python -m scripts.benchmark_quantization <corpus_dir> [model]
+"""
+import multiprocessing
+import sys
+import time
+
+import torch
+import whisper
+
+from app.worker.strategies.quantization import load_quantized_model
+from app.worker.strategies.transcription import transcribe_audio
+from scripts.benchmark_common import (
+    load_corpus,
+    peak_rss,
+    segments_text,
+    word_error_rate,
+)
+
+
+def run(
+    corpus_dir: str, model_name: str, quantize: bool
+) -> tuple[float, int, dict[str, str]]:
+    """Transcribe the corpus, runs in a fresh process to isolate peak RSS."""
+    corpus = load_corpus(corpus_dir)
+
+    if quantize:
+        model = load_quantized_model(model_name)
+    else:
+        model = whisper.load_model(model_name, device="cpu", download_root="/models")
+
+    elapsed = 0.0
+    texts = {}
+
+    with torch.inference_mode():
+        for sample in corpus:
+            start = time.perf_counter()
+            segments = transcribe_audio(model, sample.audio, "transcribe", None)
+            elapsed += time.perf_counter() - start
+            texts[sample.name] = segments_text(segments)
+
+    return elapsed, peak_rss(), texts
+
+
+if __name__ == "__main__":
+    corpus_dir = sys.argv[1]
+    model_name = sys.argv[2] if len(sys.argv) > 2 else "tiny"
+
+    corpus = load_corpus(corpus_dir)
+    duration = sum(sample.duration for sample in corpus)
+    references = {s.name: s.reference for s in corpus if s.reference is not None}
+
+    # the first run converts and caches the quantized weights.
+    load_quantized_model(model_name)
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+
+    for mode, quantize in [("fp32", False), ("int8", True)]:
+        with context.Pool(1) as pool:
+            results[mode] = pool.apply(run, (corpus_dir, model_name, quantize))
+
+    print(f"{model_name}, {len(corpus)} files, {duration:.0f}s of audio")
+    print(
+        f"{'mode':<8}{'seconds':>10}{'rtf':>8}{'rss (MiB)':>12}{'wer':>8}{'drift':>8}"
+    )
+
+    for mode, (elapsed, rss, texts) in results.items():
+        errors = [word_error_rate(references[n], texts[n]) for n in references]
+        drift = [word_error_rate(results["fp32"][2][n], texts[n]) for n in texts]
+
+        wer = f"{sum(errors) / len(errors):.3f}" if errors else "-"
+        drift_ = f"{sum(drift) / len(drift):.3f}" if mode != "fp32" and drift else "-"
+
+        print(
+            f"{mode:<8}{elapsed:>10.1f}{elapsed / duration:>8.3f}"
+            f"{rss / 1024**2:>12.0f}{wer:>8}{drift_:>8}"
+        )
@@ -0,0 +1,214 @@
+"""
+Measure the latency of the API's hot queries on a large database.
+
+Seeds a SQLite database with N jobs (one artifact each), then times the
+routes that list jobs and fetch artifacts, first without and then with the
+lookup indexes. Also compares loading ORM objects to selecting columns
+for a page of the job list.
+
+Usage: python -m scripts.benchmark_queries [jobs] [database_file]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, Index, insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+import app.shared.db.models as models
+from app.shared.db.artifact_encoding import encode
+from app.shared.db.base import (
+    make_async_engine,
+    make_async_session_local,
+    make_engine,
+    make_session_local,
+)
+from app.shared.settings import Settings
+from app.web.injections.db import get_session_local
+from app.web.injections.settings import get_settings
+from app.web.main import JOB_COLUMNS, app_factory
+from app.web.pagination import encode_cursor
+
+REPEAT = 20
+BATCH_SIZE = 10_000
+
+INDEXES: list[Index] = [
+    *(i for i in models.Job.__table__.indexes if i.name != "ix_jobs_id"),  # type: ignore
+    *(
+        i
+        for i in models.Artifact.__table__.indexes  # type: ignore
+        if i.name != "ix_artifacts_id"
+    ),
+]
+
+
+def seed(engine: Engine, count: int) -> list[str]:
+    """Insert `count` jobs with one artifact each, returns the job ids."""
+    models.Base.metadata.create_all(engine)
+
+    for index in INDEXES:
+        index.drop(engine)
+
+    random.seed(0)
+    start = datetime(2023, 1, 1)
+    encoding, payload = encode({"language_code": "en"})
+    ids = []
+
+    with engine.begin() as conn:
+        for offset in range(0, count, BATCH_SIZE):
+            jobs = []
+            artifacts = []
+
+            for i in range(offset, min(offset + BATCH_SIZE, count)):
+                id = str(uuid.uuid4())
+                ids.append(id)
+
+                jobs.append(
+                    {
+                        "id": id,
+                        "url": f"https://example.com/media/{i}.mp3",
+                        "status": random.choices(
+                            list(models.JobStatus), weights=[1, 1, 5, 93]
+                        )[0],
+                        "type": random.choice(list(models.JobType)),
+                        "config": {"language": "en"},
+                        "meta": {"attempts": 1, "task_id": str(uuid.uuid4())},
+                        # several jobs per second, so the id breaks ties.
+                        "created_at": start + timedelta(seconds=i // 3),
+                    }
+                )
+                artifacts.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "job_id": id,
+                        "type": models.ArtifactType.language_detection,
+                        "encoding": encoding,
+                        "payload": payload,
+                    }
+                )
+
+            conn.execute(insert(models.Job), jobs)
+            conn.execute(insert(models.Artifact), artifacts)
+
+    return ids
+
+
+def measure(run: Callable[[], object]) -> float:
+    """Median duration of `run` in milliseconds."""
+    run()
+    durations = []
+
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(durations)
+
+
+def routes(
+    client: TestClient, session_local: sessionmaker[Session], ids: list[str]
+) -> dict[str, Callable[[], object]]:
+    headers = {"Authorization": "Bearer benchmark"}
+
+    def get(url: str, **params: str | int) -> Callable[[], object]:
+        return lambda: client.get(url, headers=headers, params=params).json()
+
+    with session_local() as session:
+        middle = (
+            session.query(models.Job.created_at, models.Job.id)
+            .order_by(models.Job.created_at.desc(), models.Job.id.desc())
+            .offset(len(ids) // 2)
+            .first()
+        )
+
+    first_page = client.get("/api/v1/jobs", headers=headers, params={"limit": 100})
+
+    return {
+        "list jobs": get("/api/v1/jobs", limit=100),
+        "list jobs, next page": get(
+            "/api/v1/jobs", limit=100, cursor=first_page.headers["X-Next-Cursor"]
+        ),
+        "list jobs, deep page": get(
+            "/api/v1/jobs", limit=100, cursor=encode_cursor(*middle)  # type: ignore
+        ),
+        "list jobs by status": get("/api/v1/jobs", limit=100, status="error"),
+        "list jobs by type": get("/api/v1/jobs", limit=100, type="detect_language"),
+        "artifacts of a job": get(f"/api/v1/jobs/{ids[len(ids) // 3]}/artifacts"),
+    }
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    path = (
+        sys.argv[2]
+        if len(sys.argv) > 2
+        else os.path.join(tempfile.gettempdir(), "whisperbox-benchmark.db")
+    )
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    database_uri = f"sqlite:///{path}"
+    engine = make_engine(database_uri)
+
+    start = time.perf_counter()
+    ids = seed(engine, count)
+    print(f"seeded {count} jobs in {time.perf_counter() - start:.0f}s")
+
+    settings = Settings(
+        API_SECRET="benchmark",
+        BROKER_URL="memory://",
+        DATABASE_URI=database_uri,
+        ENVIRONMENT="benchmark",
+    )
+    session_local = make_session_local(engine)
+    # the test client runs every request in a new event loop, so no pooling.
+    async_session_local = make_async_session_local(
+        make_async_engine(database_uri, poolclass=NullPool)
+    )
+
+    app = app_factory()
+    app.dependency_overrides[get_settings] = lambda: settings
+    app.dependency_overrides[get_session_local] = lambda: async_session_local
+    client = TestClient(app)
+
+    benchmarks = routes(client, session_local, ids)
+    results: dict[str, list[float]] = {name: [] for name in benchmarks}
+
+    for name, run in benchmarks.items():
+        results[name].append(measure(run))
+
+    for index in INDEXES:
+        index.create(engine)
+
+    for name, run in benchmarks.items():
+        results[name].append(measure(run))
+
+    print(f"\n{'median ms':<24}{'no indexes':>12}{'indexes':>12}")
+    for name, (before, after) in results.items():
+        print(f"{name:<24}{before:>12.1f}{after:>12.1f}")
+
+    def load(*entities: Any) -> Callable[[], object]:
+        def run() -> object:
+            with session_local() as session:
+                return (
+                    session.query(*entities)
+                    .order_by(models.Job.created_at.desc(), models.Job.id.desc())
+                    .limit(1000)
+                    .all()
+                )
+
+        return run
+
+    print(f"\n{'page of 1000 jobs':<24}{'median ms':>12}")
+    print(f"{'orm objects':<24}{measure(load(models.Job)):>12.1f}")
+    print(f"{'columns':<24}{measure(load(*JOB_COLUMNS)):>12.1f}")
@@ -0,0 +1,68 @@
+"""
+Compare the real-time factor and accuracy of the transcription strategies.
+
+WER is computed against reference transcripts where the corpus has them.
+Drift is the WER of a strategy against the output of the `local` strategy.
+
+Usage: python -m scripts.benchmark_strategies <corpus_dir> [model] [strategies...]
+"""
+import os
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+from app.shared.settings import Settings
+from app.worker.strategies import get_strategy
+from scripts.benchmark_common import load_corpus, segments_text, word_error_rate
+
+if __name__ == "__main__":
+    corpus = load_corpus(sys.argv[1])
+    os.environ["WHISPER_MODEL"] = sys.argv[2] if len(sys.argv) > 2 else "tiny"
+    strategies = sys.argv[3:] or ["local", "ctranslate2"]
+
+    duration = sum(sample.duration for sample in corpus)
+    print(f"{os.environ['WHISPER_MODEL']}, {len(corpus)} files, {duration:.0f}s")
+    print(f"{'strategy':<14}{'seconds':>10}{'rtf':>8}{'wer':>8}{'drift':>8}")
+
+    baseline: dict[str, str] = {}
+
+    for name in strategies:
+        settings = Settings(
+            API_SECRET="",
+            BROKER_URL="memory://",
+            DATABASE_URI="sqlite://",
+            ENVIRONMENT="benchmark",
+            WHISPER_STRATEGY=name,  # type: ignore
+        )
+        strategy = get_strategy(settings)
+
+        elapsed = 0.0
+        errors, drift = [], []
+
+        for sample in corpus:
+            job = SimpleNamespace(id=uuid.uuid4(), config=None, meta={})
+
+            start = time.perf_counter()
+            segments = strategy._run_whisper(  # type: ignore
+                sample.audio, "transcribe", job
+            )
+            elapsed += time.perf_counter() - start
+
+            text = segments_text(segments)
+
+            if sample.reference is not None:
+                errors.append(word_error_rate(sample.reference, text))
+
+            if name == "local":
+                baseline[sample.name] = text
+            elif sample.name in baseline:
+                drift.append(word_error_rate(baseline[sample.name], text))
+
+        wer = f"{sum(errors) / len(errors):.3f}" if errors else "-"
+        drift_ = f"{sum(drift) / len(drift):.3f}" if drift else "-"
+
+        print(
+            f"{name:<14}{elapsed:>10.1f}{elapsed / duration:>8.3f}"
+            f"{wer:>8}{drift_:>8}"
+        )
@@ -0,0 +1,208 @@
+"""
+Compare throughput and tail latency of the API with its sync and async
+database drivers (see `DATABASE_ASYNC`) to sync endpoints.
+
+Seeds a SQLite database with N processing jobs, so responses are not
+cached, then sends concurrent job status and job list requests to the app
+and to a reference app that serves the same routes with sync endpoints
+and sync sessions on the thread pool, like the API did before.
+
+Usage: python -m scripts.benchmark_web [jobs] [concurrency] [requests]
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Annotated, Generator
+from uuid import UUID
+
+import httpx
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Path, Query
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import Engine, create_engine, insert
+from sqlalchemy.orm import Session
+
+import app.shared.db.models as models
+import app.web.dtos as dtos
+from app.shared.db.base import make_engine, make_session_local
+from app.shared.settings import Settings
+from app.web.injections.security import validate_credentials
+from app.web.injections.settings import get_settings
+from app.web.main import JOB_COLUMNS, app_factory
+
+BATCH_SIZE = 10_000
+# size of the thread pool that runs sync endpoints.
+THREADS = 40
+
+
+def seed(engine: Engine, count: int) -> list[str]:
+    """Insert `count` processing jobs, returns the job ids."""
+    models.Base.metadata.create_all(engine)
+
+    start = datetime(2023, 1, 1)
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+
+    with engine.begin() as conn:
+        for offset in range(0, count, BATCH_SIZE):
+            conn.execute(
+                insert(models.Job),
+                [
+                    {
+                        "id": id,
+                        "url": f"https://example.com/media/{i}.mp3",
+                        "status": models.JobStatus.processing,
+                        "type": models.JobType.transcript,
+                        "meta": {"attempts": 1, "task_id": str(uuid.uuid4())},
+                        "created_at": start + timedelta(seconds=i),
+                    }
+                    for i, id in enumerate(ids[offset : offset + BATCH_SIZE], offset)
+                ],
+            )
+
+    return ids
+
+
+def sync_app_factory(database_uri: str, settings: Settings) -> FastAPI:
+    """
+    The job routes with sync endpoints and dependencies, each request holds
+    a worker thread.
+    """
+    # a connection per worker thread, smaller pools deadlock under load:
+    # threads wait for connections held by requests waiting for a thread.
+    engine = create_engine(
+        database_uri,
+        connect_args={"check_same_thread": False},
+        pool_size=THREADS,
+        max_overflow=0,
+    )
+    session_local = make_session_local(engine)
+
+    def get_session() -> Generator[Session, None, None]:
+        with session_local() as session:
+            yield session
+
+    def api_key_auth(
+        credentials: Annotated[
+            HTTPAuthorizationCredentials, Depends(HTTPBearer(auto_error=False))
+        ],
+        settings: Annotated[Settings, Depends(lambda: settings)],
+    ) -> None:
+        validate_credentials(credentials, settings.API_SECRET)
+
+    app = FastAPI()
+    api_router = APIRouter(prefix="/api/v1", dependencies=[Depends(api_key_auth)])
+
+    @api_router.get("/jobs", response_model=list[dtos.Job])
+    def get_jobs(
+        session: Annotated[Session, Depends(get_session)],
+        limit: int = Query(default=100, ge=1, le=1000),
+    ):
+        return (
+            session.query(*JOB_COLUMNS)
+            .order_by(models.Job.created_at.desc(), models.Job.id.desc())
+            .limit(limit + 1)
+            .all()[:limit]
+        )
+
+    @api_router.get("/jobs/{id}", response_model=dtos.Job)
+    def get_job(
+        session: Annotated[Session, Depends(get_session)], id: UUID = Path()
+    ) -> models.Job:
+        job = session.get(models.Job, str(id))
+
+        if not job:
+            raise HTTPException(status_code=404)
+
+        return job
+
+    app.include_router(api_router)
+    return app
+
+
+async def load(
+    app: FastAPI, ids: list[str], concurrency: int, requests: int
+) -> tuple[float, list[float]]:
+    """Send `requests` requests from `concurrency` clients, returns rps, latencies."""
+    transport = httpx.ASGITransport(app=app)  # type: ignore
+    headers = {"Authorization": "Bearer benchmark"}
+    latencies: list[float] = []
+    random.seed(0)
+    urls = [
+        "/api/v1/jobs?limit=20" if i % 10 == 0 else f"/api/v1/jobs/{random.choice(ids)}"
+        for i in range(requests)
+    ]
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark", headers=headers
+    ) as client:
+
+        async def worker(urls: list[str]) -> None:
+            for url in urls:
+                start = time.perf_counter()
+                res = await client.get(url)
+                latencies.append((time.perf_counter() - start) * 1000)
+                res.raise_for_status()
+
+        # warm up pools and caches.
+        await asyncio.gather(*(worker(urls[:1]) for _ in range(concurrency)))
+        latencies.clear()
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(worker(urls[i::concurrency]) for i in range(concurrency))
+        )
+        duration = time.perf_counter() - start
+
+    return requests / duration, latencies
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    requests = int(sys.argv[3]) if len(sys.argv) > 3 else 5_000
+
+    path = os.path.join(tempfile.gettempdir(), "whisperbox-benchmark-web.db")
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    database_uri = f"sqlite:///{path}"
+    engine = make_engine(database_uri)
+    ids = seed(engine, count)
+
+    settings = Settings(
+        API_SECRET="benchmark",
+        BROKER_URL="memory://",
+        DATABASE_URI=database_uri,
+        ENVIRONMENT="benchmark",
+        DATABASE_POOL_SIZE=THREADS,
+        DATABASE_MAX_OVERFLOW=0,
+    )
+
+    def api_app(settings: Settings) -> FastAPI:
+        async def get_benchmark_settings() -> Settings:
+            return settings
+
+        app = app_factory()
+        app.dependency_overrides[get_settings] = get_benchmark_settings
+        return app
+
+    apps = (
+        ("sync", sync_app_factory(database_uri, settings)),
+        ("threaded", api_app(settings)),
+        ("async", api_app(settings.model_copy(update={"DATABASE_ASYNC": True}))),
+    )
+
+    print(f"{count} jobs, {concurrency} clients, {requests} requests\n")
+    print(f"{'':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+
+    for name, app in apps:
+        rps, latencies = asyncio.run(load(app, ids, concurrency, requests))
+        p50 = statistics.median(latencies)
+        p99 = statistics.quantiles(latencies, n=100)[98]
+        print(f"{name:<10}{rps:>10.0f}{p50:>10.1f}{p99:>10.1f}")
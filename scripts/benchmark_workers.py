@@ -0,0 +1,84 @@
+"""
+Find the number of worker processes with the best aggregate real-time factor.
+
+For every candidate N, the cores are partitioned like `app.worker.launcher`
+does and N processes transcribe the same file at the same time, each pinned
+to its share. The aggregate real-time factor is the wall time divided by the
+total duration of audio transcribed by all processes.
+
+Usage: python -m scripts.benchmark_workers <media_file> [model] [processes...]
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+from app.worker.launcher import cpu_topology, partition
+
+
+def run(
+    filepath: str, model_name: str, cpus: list[int], threads: int
+) -> tuple[float, float]:
+    """Transcribe a file on `cpus`, runs in a fresh process."""
+    os.sched_setaffinity(0, cpus)
+
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(threads)
+
+    model = whisper.load_model(model_name, device="cpu", download_root="/models")
+    audio = whisper.load_audio(filepath)
+
+    # wall clock time is comparable across processes.
+    start = time.time()
+    model.transcribe(audio, condition_on_previous_text=False)
+    return start, time.time()
+
+
+if __name__ == "__main__":
+    filepath = sys.argv[1]
+    model_name = sys.argv[2] if len(sys.argv) > 2 else os.environ["WHISPER_MODEL"]
+
+    topology = cpu_topology()
+    cores = sum(len(node) for node in topology)
+
+    candidates = [int(n) for n in sys.argv[3:]] or [
+        n for n in range(1, cores + 1) if cores % n == 0
+    ]
+
+    import whisper
+
+    duration = len(whisper.load_audio(filepath)) / whisper.audio.SAMPLE_RATE
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+
+    print(f"{model_name}, {cores} cores in {len(topology)} nodes, {duration:.0f}s")
+    print(f"{'processes':<12}{'threads':>8}{'seconds':>10}{'rtf':>8}")
+
+    for processes in candidates:
+        shares = partition(topology, processes)
+
+        with context.Pool(len(shares)) as pool:
+            times = pool.starmap(
+                run,
+                [
+                    (filepath, model_name, [c for core in s for c in core], len(s))
+                    for s in shares
+                ],
+            )
+
+        # from the first transcription start to the last end, excludes model loading.
+        elapsed = max(end for _, end in times) - min(start for start, _ in times)
+
+        results[processes] = elapsed / (duration * len(shares))
+
+        print(
+            f"{len(shares):<12}{len(shares[0]):>8}"
+            f"{elapsed:>10.1f}{results[processes]:>8.3f}"
+        )
+
+    best = min(results, key=results.__getitem__)
+    print(f"\nbest: WORKER_PROCESSES={best}")
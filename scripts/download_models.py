@@ -5,3 +5,8 @@ from whisper import _download, _MODELS  # type: ignore
 if __name__ == "__main__":
     model_name = sys.argv[1].strip()
     _download(_MODELS[model_name], "/models/", False)
+
+    if os.environ.get("WHISPER_STRATEGY") == "ctranslate2":
+        from faster_whisper import download_model  # type: ignore
+
+        download_model(model_name, cache_dir="/models/")